@@ -1,4 +1,68 @@
-__all__ = ["__version__"]
+__all__ = [
+    "AsyncClient",
+    "BackpressureError",
+    "Dispatcher",
+    "FolderNotFoundError",
+    "FunctionNotFoundError",
+    "IndexNotFoundError",
+    "InputFileNotFoundError",
+    "InspectionError",
+    "InvalidPipelineError",
+    "InvalidTargetError",
+    "QueueFullError",
+    "QueueTimeoutError",
+    "RunError",
+    "RunResult",
+    "RunStream",
+    "Scheduler",
+    "ScriptNotFoundError",
+    "SharedEnv",
+    "SupypowersError",
+    "UsageError",
+    "WorkersUnavailableError",
+    "__version__",
+    "build_index",
+    "docs",
+    "pipeline",
+    "run",
+    "run_stream",
+    "schema",
+    "search",
+    "shared_environment",
+    "stream",
+]
 
 __version__ = "0.1.1"
 
+from supypowers.api import (  # noqa: E402
+    BackpressureError,
+    FolderNotFoundError,
+    FunctionNotFoundError,
+    IndexNotFoundError,
+    InputFileNotFoundError,
+    InspectionError,
+    InvalidPipelineError,
+    InvalidTargetError,
+    QueueFullError,
+    QueueTimeoutError,
+    RunError,
+    RunResult,
+    RunStream,
+    ScriptNotFoundError,
+    SharedEnv,
+    SupypowersError,
+    UsageError,
+    WorkersUnavailableError,
+    build_index,
+    docs,
+    pipeline,
+    run,
+    run_stream,
+    schema,
+    search,
+    shared_environment,
+    stream,
+)
+from supypowers.client import AsyncClient  # noqa: E402
+from supypowers.dispatch import Dispatcher  # noqa: E402
+from supypowers.scheduler import Scheduler  # noqa: E402
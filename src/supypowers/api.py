@@ -0,0 +1,863 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from supypowers.docs import discover_scripts, docs_cache, inspect_scripts
+from supypowers.errors import (  # noqa: F401 (re-exported)
+    BackpressureError,
+    FolderNotFoundError,
+    FunctionNotFoundError,
+    IndexNotFoundError,
+    InputFileNotFoundError,
+    InspectionError,
+    InvalidPipelineError,
+    InvalidTargetError,
+    QueueFullError,
+    QueueTimeoutError,
+    ScriptNotFoundError,
+    SupypowersError,
+    UsageError,
+    WorkersUnavailableError,
+)
+from supypowers.index import FunctionIndex, default_index_path, function_target, schema_hash
+from supypowers.memo import Memo, memo_for
+from supypowers.pipeline import parse_pipeline, run_pipeline
+from supypowers.runner import (
+    ITEM_PREFIX,
+    PROFILE_PREFIX,
+    RUNNER_CODE,
+    STREAM_HEADER,
+    collect_stream,
+    is_result_line,
+    run_output,
+    uv_error_response,
+)
+from supypowers.scheduler import Scheduler, default_scheduler, function_limit
+from supypowers.shared_env import SharedEnv
+from supypowers.shared_env import shared_env as shared_env_for
+from supypowers.uv_exec import UVRunError, uv_stream_python_code
+from supypowers.util import parse_secrets_args, resolve_target  # noqa: F401 (re-exported)
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+from supypowers.wire import WIRE_FORMATS, codec_dependencies, decode_frame, negotiate
+
+# In-process library API.
+#
+# `run` and `docs` do what the CLI commands do, but return Python objects and raise
+# `SupypowersError` subclasses instead of printing JSON and exiting. The CLI commands
+# are thin wrappers around them.
+
+# Enters a scheduler slot for one call; yields the time spent waiting for it (ms).
+Slot = Callable[[], ContextManager[float]]
+
+
+class RunError(SupypowersError):
+    """
+    Raised by `run(..., check=True)` when the call did not succeed; `result` holds the
+    full outcome.
+    """
+
+    def __init__(self, result: "RunResult") -> None:
+        super().__init__(result.error or "run failed")
+        self.result = result
+
+    def to_dict(self) -> dict:
+        return self.result.response
+
+
+@dataclass(frozen=True)
+class RunResult:
+    """
+    The outcome of one call: `response` is exactly the object `supypowers run` prints and
+    `exit_code` the status it exits with. `profile` is the timing breakdown of a call made
+    with `profile=True` (see `run`) and `queue_ms` how long the call waited for a scheduler
+    slot (None if it was answered from the results cache).
+    """
+
+    response: Dict[str, Any]
+    exit_code: int
+    profile: Optional[Dict[str, Any]] = None
+    queue_ms: Optional[float] = field(default=None, compare=False)
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.response.get("ok"))
+
+    @property
+    def data(self) -> Any:
+        return self.response.get("data")
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.response.get("error")
+
+    @classmethod
+    def from_output(cls, out: str | UVRunError) -> "RunResult":
+        """
+        Build the result from raw runner stdout or the error of a failed runner process.
+        """
+        return cls(*run_output(out))
+
+
+def _folder(folder: str | Path) -> Path:
+    folder = Path(folder)
+    if not folder.exists() or not folder.is_dir():
+        raise FolderNotFoundError(folder)
+    return folder
+
+
+def encode_input(input_data: Any) -> str:
+    """
+    `input_data` as the JSON string the runner expects; strings are passed through.
+    """
+    return input_data if isinstance(input_data, str) else json.dumps(input_data)
+
+
+def run_payload(
+    script_path: Path,
+    func_name: str,
+    input_data: Any = None,
+    input_file: str | Path | None = None,
+) -> dict:
+    """
+    The runner payload for one call. A string `input_data` is sent as is, any other value
+    already decoded (so the runner parses it once), and `input_file` by path only: the
+    runner reads it from disk, so large inputs never pass through this process.
+    """
+    payload: Dict[str, Any] = {"script_path": str(script_path), "function_name": func_name}
+    if input_file is not None:
+        if input_data is not None:
+            raise UsageError("provide either input_data or input_file, not both")
+        path = Path(input_file)
+        if not path.is_file():
+            raise InputFileNotFoundError(path)
+        payload["input_path"] = str(path.resolve())
+    elif isinstance(input_data, str):
+        payload["input_data"] = input_data
+    else:
+        payload["input"] = input_data
+    return payload
+
+
+def _memo(script_path: Path, payload: dict, env: Dict[str, str]) -> Optional[Memo]:
+    function_name = payload["function_name"]
+    if "input_path" in payload:
+        return memo_for(script_path, function_name, None, input_path=Path(payload["input_path"]), extra_env=env)
+    return memo_for(script_path, function_name, payload.get("input_data", payload.get("input")), extra_env=env)
+
+
+def run(
+    folder: str | Path,
+    target: str,
+    input_data: Any = None,
+    *,
+    input_file: str | Path | None = None,
+    secrets: Iterable[str] = (),
+    check: bool = False,
+    use_cache: bool = True,
+    profile: bool = False,
+    wire_format: str = "json",
+    priority: int = 0,
+    queue_timeout: Optional[float] = None,
+    scheduler: Optional[Scheduler] = None,
+    shared_env: bool = False,
+) -> RunResult:
+    """
+    Call `script:function` in `folder` with `input_data` (a JSON string or any
+    JSON-serializable value) or the JSON in `input_file`, and return its `RunResult`.
+
+    Functions marked `@superpower(cache=True, ttl=...)` are answered from the results cache
+    when the same script is called with the same input again (unless `use_cache` is false).
+    The items of a generator function are collected into a list; use `stream` to consume
+    them as they are produced. With `profile`, the result carries a per-phase timing
+    breakdown measured in this process and in the runner. `wire_format="msgpack"` has the
+    runner send the result as msgpack (installed into the script's environment for it) when
+    this process has msgpack, else as `marshal`; see `supypowers.wire`.
+
+    The runner process starts once `scheduler` (default: `default_scheduler()`) has a slot
+    for it: calls beyond the global or per-function limit (`@superpower(max_concurrency=N)`)
+    wait in its queue, higher `priority` first, for at most `queue_timeout` seconds. With
+    `shared_env`, the script runs in the folder's shared environment (see
+    `shared_environment`) unless its requirements conflict with it.
+
+    Raises `UsageError` for a missing folder or script or a malformed target, and with
+    `check=True`, `RunError` if the call did not succeed. Raises `BackpressureError`
+    (`QueueFullError`, `QueueTimeoutError`) if the scheduler turned the call away.
+    """
+    lines = _open_run(
+        folder,
+        target,
+        input_data,
+        input_file=input_file,
+        secrets=secrets,
+        use_cache=use_cache,
+        profile=profile,
+        wire_format=wire_format,
+        priority=priority,
+        queue_timeout=queue_timeout,
+        scheduler=scheduler,
+        shared_env=shared_env,
+    )
+    output = list(lines._outputs())
+    final = output[-1] if isinstance(output[-1], dict) else json.loads(output[-1])
+    timing = final.pop("profile", None)
+    response = collect_stream(output) if output[0] == STREAM_HEADER else final
+    response.pop("profile", None)
+
+    result = RunResult(response, lines.exit_code or 0, timing, lines.queue_ms)
+    if check and not result.ok:
+        raise RunError(result)
+    return result
+
+
+class RunStream:
+    """
+    The lines `supypowers run` prints for one call, produced while the function runs.
+
+    Iterate once to get them; afterwards `exit_code` is the status `run` exits with and
+    `stderr` whatever the runner process wrote to stderr if it failed. `queue_ms` is how
+    long the call waited for a scheduler slot (None if it did not need one).
+    """
+
+    def __init__(
+        self,
+        lines: Generator[str | dict, None, Tuple[int, str]],
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._lines = lines
+        self._stats = stats if stats is not None else {}
+        self.exit_code: Optional[int] = None
+        self.stderr = ""
+
+    @property
+    def queue_ms(self) -> Optional[float]:
+        queue_ms = self._stats.get("queue_ms")
+        return None if queue_ms is None else _ms(queue_ms)
+
+    def _outputs(self) -> Iterator[str | dict]:
+        # Lines, except that a result received in a binary wire format arrives decoded.
+        self.exit_code, self.stderr = yield from self._lines
+
+    def __iter__(self) -> Iterator[str]:
+        for output in self._outputs():
+            yield output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, default=str)
+
+
+def _ms(value: float) -> float:
+    return round(value, 3)
+
+
+def _build_profile(started: float, parent: Dict[str, Any], runner: Optional[dict]) -> dict:
+    """
+    Merge the parent's measurements (from `uv_stream_python_code`) with the runner's
+    `{"phases", "child"}` report into the `profile` object `run --profile` prints.
+    """
+    phases = {"resolve_ms": parent["resolve_ms"]}
+    if "queue_ms" in parent:
+        phases["queue_ms"] = parent["queue_ms"]
+    if "environment_ms" in parent:
+        phases["environment_ms"] = parent["environment_ms"]
+    child = dict((runner or {}).get("child") or {})
+    started_at = child.pop("started_at", None)
+    if started_at is not None and "spawned_at" in parent:
+        # Process creation, interpreter startup and (with the `uv run` launcher) dependency resolution.
+        phases["startup_ms"] = max(0.0, (started_at - parent["spawned_at"]) * 1000)
+    phases.update((runner or {}).get("phases") or {})
+    profile: Dict[str, Any] = {
+        "total_ms": _ms((time.perf_counter() - started) * 1000),
+        "cached": parent.get("cached", False),
+        "phases": {name: _ms(value) for name, value in phases.items()},
+    }
+    if "launcher" in parent:
+        profile["launcher"] = parent["launcher"]
+    if "process_ms" in parent:
+        profile["process_ms"] = _ms(parent["process_ms"])
+    if child:
+        profile["child"] = {name: _ms(value) for name, value in child.items()}
+    return profile
+
+
+def _with_profile(line: str, profile: dict) -> str:
+    return json.dumps({**json.loads(line), "profile": profile}, ensure_ascii=False)
+
+
+def _with_profile_spliced(line: str, profile: dict) -> str:
+    # `_with_profile` for a result line (see `is_result_line`), without decoding its data.
+    return f"{line[:-1]}, \"profile\": {json.dumps(profile, ensure_ascii=False)}}}"
+
+
+def _note_queue(queue_ms: float, stats: Dict[str, Any], timings: Optional[Dict[str, Any]]) -> None:
+    stats["queue_ms"] = queue_ms
+    if timings is not None:
+        timings["queue_ms"] = queue_ms
+
+
+def _run_lines(
+    script_path: Path,
+    payload: dict,
+    extra_env: Dict[str, str],
+    memo: Optional[Memo],
+    started: float,
+    timings: Optional[Dict[str, Any]],
+    slot: Slot,
+    stats: Dict[str, Any],
+    deps: Optional[List[str]] = None,
+) -> Generator[str | dict, None, Tuple[int, str]]:
+    cached = memo.get() if memo is not None else None
+    if timings is not None:
+        timings["resolve_ms"] = (time.perf_counter() - started) * 1000
+        timings["cached"] = cached is not None
+    if cached is not None:
+        line = json.dumps(cached, ensure_ascii=False)
+        yield line if timings is None else _with_profile(line, _build_profile(started, timings, None))
+        return 0, ""
+    # The scheduler slot is held for as long as the runner process lives.
+    with slot() as queue_ms:
+        _note_queue(queue_ms, stats, timings)
+        return (yield from _runner_lines(script_path, payload, extra_env, memo, started, timings, deps))
+
+
+def _runner_lines(
+    script_path: Path,
+    payload: dict,
+    extra_env: Dict[str, str],
+    memo: Optional[Memo],
+    started: float,
+    timings: Optional[Dict[str, Any]],
+    deps: Optional[List[str]] = None,
+) -> Generator[str | dict, None, Tuple[int, str]]:
+    # With `timings`, the runner prints a profile line after its output; it is split
+    # off here and merged into the last line this generator yields. A result received
+    # as a binary frame is yielded decoded, as a dict.
+    lines = uv_stream_python_code(
+        script_path=script_path,
+        code=RUNNER_CODE,
+        input_lines=[json.dumps(payload)],
+        extra_env=extra_env,
+        timings=timings,
+        binary_frames="wire_format" in payload,
+        deps=deps,
+    )
+    streaming = False
+    buffered: List[str] = []
+    last = closing = ""
+    frame: Optional[Tuple[str, bytes]] = None
+    runner_profile = None
+    error: Optional[UVRunError] = None
+    try:
+        for line in lines:
+            if isinstance(line, bytes):
+                frame = (buffered.pop(), line)
+                continue
+            if timings is not None and line.startswith(PROFILE_PREFIX):
+                runner_profile = json.loads(line)["profile"]
+                continue
+            if not streaming and not buffered and line == STREAM_HEADER:
+                streaming = True
+            if not streaming:
+                buffered.append(line)
+            elif timings is not None and line != STREAM_HEADER and not line.startswith(ITEM_PREFIX):
+                closing = line  # held back until the runner's profile has arrived
+            else:
+                # Frames are passed through untouched and never held in memory.
+                last = line
+                yield line
+    except UVRunError as e:
+        error = e
+
+    if streaming:
+        if error is not None and not (closing or last).startswith('{"ok": false'):
+            # The runner died without reporting why; close the stream with the error.
+            closing = json.dumps(uv_error_response(error), ensure_ascii=False)
+        if timings is not None:
+            closing = _with_profile(
+                closing or json.dumps({"ok": False, "error": "stream ended before its closing frame"}),
+                _build_profile(started, timings, runner_profile),
+            )
+        if closing:
+            yield closing
+        return (error.exit_code, error.stderr) if error is not None else (0, "")
+
+    if frame is not None and error is None:
+        try:
+            response = decode_frame(*frame)
+        except Exception:
+            response = {"ok": False, "error": "runner did not emit a valid binary frame"}
+        exit_code = 0 if response.get("ok") else 1
+    else:
+        out: str | UVRunError = "\n".join(buffered).strip()
+        if error is None and is_result_line(out):
+            # Already serialized by the runner: passed through without decoding it.
+            if memo is not None:
+                memo.put_line(out)
+            if timings is not None:
+                out = _with_profile_spliced(out, _build_profile(started, timings, runner_profile))
+            yield out
+            return 0, ""
+        if error is not None:
+            out = UVRunError(message=error.message, exit_code=error.exit_code, stdout=out, stderr=error.stderr)
+        response, exit_code = run_output(out)
+    if memo is not None:
+        memo.put(response)
+    if timings is not None:
+        response = {**response, "profile": _build_profile(started, timings, runner_profile)}
+    yield response if frame is not None else json.dumps(response, ensure_ascii=False)
+    return exit_code, error.stderr if error is not None else ""
+
+
+def _last_line(path: Path, chunk: int = 65536) -> str:
+    # The last line of a file of any size, read from its end.
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - chunk))
+        lines = f.read().rstrip(b"\n").rsplit(b"\n", 1)
+    return lines[-1].decode("utf-8", errors="replace")
+
+
+def _run_into(
+    path: Path,
+    script_path: Path,
+    payload: dict,
+    extra_env: Dict[str, str],
+    memo: Optional[Memo],
+    timings: Optional[Dict[str, Any]],
+    deps: Optional[List[str]] = None,
+) -> Tuple[dict, int, str, Optional[dict]]:
+    # Let the runner write its output into `path`; returns the outcome (`{"ok": true}` for a
+    # success, whose result is never loaded here), exit code, stderr and runner profile.
+    runner_profile = None
+    error: Optional[UVRunError] = None
+    try:
+        for line in uv_stream_python_code(
+            script_path=script_path,
+            code=RUNNER_CODE,
+            input_lines=[json.dumps({**payload, "output_path": str(path)})],
+            extra_env=extra_env,
+            timings=timings,
+            deps=deps,
+        ):
+            if line.startswith(PROFILE_PREFIX):
+                runner_profile = json.loads(line)["profile"]
+    except UVRunError as e:
+        error = e
+
+    with path.open("rb") as f:
+        streaming = f.readline().rstrip(b"\n") == STREAM_HEADER.encode()
+    if error is None:
+        if memo is not None and not streaming:
+            memo.put_file(path)
+        return {"ok": True}, 0, "", runner_profile
+    if streaming:
+        last = _last_line(path)
+        if last.startswith('{"ok": false'):
+            return json.loads(last), error.exit_code, error.stderr, runner_profile
+        # The runner died without reporting why; close the stream with the error.
+        response = uv_error_response(error)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(response, ensure_ascii=False) + "\n")
+        return response, error.exit_code, error.stderr, runner_profile
+    out = path.read_text(encoding="utf-8").strip()
+    response, exit_code = run_output(
+        UVRunError(message=error.message, exit_code=error.exit_code, stdout=out, stderr=error.stderr)
+    )
+    path.write_text(json.dumps(response, ensure_ascii=False) + "\n", encoding="utf-8")
+    return response, exit_code, error.stderr, runner_profile
+
+
+def _run_to_file(
+    script_path: Path,
+    payload: dict,
+    extra_env: Dict[str, str],
+    memo: Optional[Memo],
+    started: float,
+    timings: Optional[Dict[str, Any]],
+    output_path: Path,
+    slot: Slot,
+    stats: Dict[str, Any],
+    deps: Optional[List[str]] = None,
+) -> Generator[str, None, Tuple[int, str]]:
+    # The output is written to a temporary file next to `output_path`, which replaces it
+    # only once complete; the result itself never passes through this process.
+    cached = memo.get() if memo is not None else None
+    if timings is not None:
+        timings["resolve_ms"] = (time.perf_counter() - started) * 1000
+        timings["cached"] = cached is not None
+    tmp = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.touch(exist_ok=False)  # created with the usual umask permissions
+    runner_profile = None
+    try:
+        if cached is not None:
+            tmp.write_text(json.dumps(cached, ensure_ascii=False) + "\n", encoding="utf-8")
+            response, exit_code, stderr = cached, 0, ""
+        else:
+            with slot() as queue_ms:
+                _note_queue(queue_ms, stats, timings)
+                response, exit_code, stderr, runner_profile = _run_into(
+                    tmp, script_path, payload, extra_env, memo, timings, deps
+                )
+        os.replace(tmp, output_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    summary: Dict[str, Any] = {"ok": bool(response.get("ok")), "output_file": str(output_path)}
+    if not summary["ok"]:
+        summary["error"] = response.get("error")
+    if timings is not None:
+        summary["profile"] = _build_profile(started, timings, runner_profile)
+    yield json.dumps(summary, ensure_ascii=False)
+    return exit_code, stderr
+
+
+def run_stream(
+    folder: str | Path,
+    target: str,
+    input_data: Any = None,
+    *,
+    input_file: str | Path | None = None,
+    output_file: str | Path | None = None,
+    secrets: Iterable[str] = (),
+    use_cache: bool = True,
+    profile: bool = False,
+    wire_format: str = "json",
+    priority: int = 0,
+    queue_timeout: Optional[float] = None,
+    scheduler: Optional[Scheduler] = None,
+    shared_env: bool | SharedEnv = False,
+) -> RunStream:
+    """
+    Like `run`, but return the output lines as the runner produces them: the single result
+    line of a plain function, or the frames of a generator function (a header, one
+    `{"ok": true, "item": ...}` line per item and a closing `{"ok": true, "done": true,
+    "count": N}` or error line). With `profile`, the last line carries a `profile` object.
+
+    With `output_file`, the runner writes those lines straight into the file instead
+    (replacing it once the call is over) and the only line returned is a summary:
+    `{"ok": ..., "output_file": ..., "error"?: ..., "profile"?: ...}`. `wire_format` is only
+    checked: these are lines, so the runner always answers in JSON and its result line is
+    passed through (a binary format only pays off for `run`, which returns objects). Scheduling is as for
+    `run`; a `BackpressureError` is raised when iteration starts.
+
+    With `shared_env`, the script runs in the folder's shared environment (see
+    `shared_environment`; a `SharedEnv` already computed for `folder` may be passed
+    instead of True) unless its requirements conflict with it.
+
+    Raises `UsageError` immediately for invalid requests.
+    """
+    if wire_format not in WIRE_FORMATS:
+        raise UsageError(f"wire_format must be one of: {', '.join(WIRE_FORMATS)}")
+    return _open_run(
+        folder,
+        target,
+        input_data,
+        input_file=input_file,
+        output_file=output_file,
+        secrets=secrets,
+        use_cache=use_cache,
+        profile=profile,
+        priority=priority,
+        queue_timeout=queue_timeout,
+        scheduler=scheduler,
+        shared_env=shared_env,
+        wire_format="json",
+    )
+
+
+def _open_run(
+    folder: str | Path,
+    target: str,
+    input_data: Any = None,
+    *,
+    input_file: str | Path | None = None,
+    output_file: str | Path | None = None,
+    secrets: Iterable[str] = (),
+    use_cache: bool = True,
+    profile: bool = False,
+    wire_format: str = "json",
+    priority: int = 0,
+    queue_timeout: Optional[float] = None,
+    scheduler: Optional[Scheduler] = None,
+    shared_env: bool | SharedEnv = False,
+) -> RunStream:
+    # `run_stream`, except that a binary `wire_format` is negotiated with the runner and
+    # its result yielded decoded (for `run`).
+    started = time.perf_counter()
+    script_path, func_name = resolve_target(folder, target)
+    payload = run_payload(script_path, func_name, input_data, input_file)
+    if profile:
+        payload["profile"] = True
+    if wire_format not in WIRE_FORMATS:
+        raise UsageError(f"wire_format must be one of: {', '.join(WIRE_FORMATS)}")
+    if output_file is None and negotiate(wire_format) != "json":
+        payload["wire_format"] = negotiate(wire_format)
+    env = parse_secrets_args(secrets)
+    memo = _memo(script_path, payload, env) if use_cache else None
+    if shared_env is True:
+        shared_env = shared_environment(folder)
+    deps = shared_env.dependencies_for(script_path) if shared_env else None
+    if payload.get("wire_format") == "msgpack":
+        if deps is None:
+            deps = normalize_dependencies(read_uv_script_dependencies(script_path))
+        deps = codec_dependencies(deps, "msgpack")
+    timings: Optional[Dict[str, Any]] = {} if profile else None
+    slot = functools.partial(
+        (scheduler or default_scheduler()).slot,
+        (str(script_path), func_name),
+        function_limit(script_path, func_name),
+        priority=priority,
+        timeout=queue_timeout,
+    )
+    stats: Dict[str, Any] = {}
+    if output_file is not None:
+        output_path = Path(output_file).resolve()
+        if not output_path.parent.is_dir():
+            raise UsageError(f"output directory not found: {output_path.parent}")
+        return RunStream(
+            _run_to_file(script_path, payload, env, memo, started, timings, output_path, slot, stats, deps), stats
+        )
+    return RunStream(_run_lines(script_path, payload, env, memo, started, timings, slot, stats, deps), stats)
+
+
+def stream(
+    folder: str | Path,
+    target: str,
+    input_data: Any = None,
+    *,
+    input_file: str | Path | None = None,
+    secrets: Iterable[str] = (),
+    use_cache: bool = True,
+    shared_env: bool = False,
+) -> Iterator[Any]:
+    """
+    Yield the items of a generator function as they are produced (a plain function's
+    result is yielded once).
+
+    Raises `UsageError` for invalid requests and `RunError` if the call fails, including
+    part-way through a stream.
+    """
+    lines = run_stream(
+        folder,
+        target,
+        input_data,
+        input_file=input_file,
+        secrets=secrets,
+        use_cache=use_cache,
+        shared_env=shared_env,
+    )
+
+    def items() -> Iterator[Any]:
+        failed = None
+        for line in lines:
+            if line == STREAM_HEADER:
+                continue
+            frame = json.loads(line)
+            if not frame.get("ok"):
+                failed = frame
+            elif "item" in frame:
+                yield frame["item"]
+            elif not frame.get("done"):
+                yield frame.get("data")
+        if failed is not None:
+            raise RunError(RunResult(failed, lines.exit_code or 1))
+
+    return items()
+
+
+def docs(
+    folder: str | Path,
+    *,
+    recursive: bool = False,
+    require_marker: bool = False,
+    secrets: Iterable[str] = (),
+    jobs: Optional[int] = None,
+    use_cache: bool = True,
+    static: bool = False,
+    shared_env: bool = False,
+) -> List[dict]:
+    """
+    Return the docs entries (`{"script", "functions", "error"?}`) for the scripts in
+    `folder`, as `supypowers docs --format json` prints them. With `shared_env`, scripts
+    are inspected in the folder's shared environment (see `shared_environment`).
+    """
+    return inspect_scripts(
+        discover_scripts(_folder(folder), recursive),
+        require_marker=require_marker,
+        extra_env=parse_secrets_args(secrets),
+        jobs=jobs,
+        cache=docs_cache() if use_cache else None,
+        static=static,
+        shared=shared_environment(folder) if shared_env else None,
+    )
+
+
+def shared_environment(folder: str | Path) -> SharedEnv:
+    """
+    The merged, conflict-checked requirement set of the scripts directly in `folder`
+    that `shared_env=True` (`--shared-env`) runs them with. Scripts whose requirements
+    conflict with it are listed in its `conflicts` and keep their own environment.
+    """
+    return shared_env_for(_folder(folder))
+
+
+def build_index(
+    folder: str | Path,
+    *,
+    recursive: bool = False,
+    require_marker: bool = False,
+    secrets: Iterable[str] = (),
+    jobs: Optional[int] = None,
+    use_cache: bool = True,
+    static: bool = False,
+    index_path: Optional[str | Path] = None,
+) -> dict:
+    """
+    Create or refresh the function index of `folder` (see `search`), inspecting only the
+    scripts added or changed since it was last built. Returns
+    `{"index", "scripts", "functions", "updated", "removed"}`.
+    """
+    folder = _folder(folder)
+    extra_env = parse_secrets_args(secrets)
+
+    def inspect(scripts: List[Path]) -> List[dict]:
+        return inspect_scripts(
+            scripts,
+            require_marker=require_marker,
+            extra_env=extra_env,
+            jobs=jobs,
+            cache=docs_cache() if use_cache else None,
+            static=static,
+        )
+
+    path = Path(index_path) if index_path is not None else default_index_path(folder)
+    with FunctionIndex(path) as idx:
+        return idx.update(
+            folder,
+            recursive=recursive,
+            options={"require_marker": require_marker, "static": static},
+            inspect=inspect,
+        )
+
+
+def search(
+    folder: str | Path,
+    query: str,
+    *,
+    limit: int = 10,
+    index_path: Optional[str | Path] = None,
+) -> List[dict]:
+    """
+    Find functions in `folder` by name or description words (prefixes match too), best
+    match first, as `{"target", "script", "name", "description", "schema_hash", "score"}`.
+
+    Reads only the index built by `build_index`; the scripts are not opened. Raises
+    `IndexNotFoundError` if there is no index yet.
+    """
+    path = Path(index_path) if index_path is not None else default_index_path(_folder(folder))
+    if not path.is_file():
+        raise IndexNotFoundError(path)
+    with FunctionIndex(path) as idx:
+        return idx.search(query, limit=limit)
+
+
+def schema(
+    folder: str | Path,
+    target: str,
+    *,
+    require_marker: bool = False,
+    secrets: Iterable[str] = (),
+    use_cache: bool = True,
+    static: bool = False,
+    index_path: Optional[str | Path] = None,
+) -> dict:
+    """
+    The schemas of one function, as `{"target", "script", "name", "description",
+    "input_schema", "output_schema", "schema_hash", "source"}`.
+
+    Answered from the folder's index when it was built with the same `require_marker` and
+    `static` and holds an up-to-date entry for the script (`source == "index"`), else by inspecting only that script, which the docs cache
+    answers if the script is unchanged (`source == "docs"`). Raises
+    `FunctionNotFoundError` if the script has no such function and `InspectionError` if
+    the script cannot be inspected.
+    """
+    script_path, func_name = resolve_target(folder, target)
+    folder = Path(folder)
+    target = function_target(folder, script_path, func_name)
+
+    entry = None
+    path = Path(index_path) if index_path is not None else default_index_path(folder)
+    if path.is_file():
+        with FunctionIndex(path) as idx:
+            settings = idx.settings()
+            if (settings.get("require_marker"), settings.get("static")) == (require_marker, static):
+                entry = idx.lookup(target)
+    source = "index"
+
+    if entry is None:
+        (docs_entry,) = inspect_scripts(
+            [script_path],
+            require_marker=require_marker,
+            extra_env=parse_secrets_args(secrets),
+            jobs=1,
+            cache=docs_cache() if use_cache else None,
+            static=static,
+        )
+        if docs_entry.get("error"):
+            raise InspectionError(script_path, docs_entry["error"])
+        entry = next((fn for fn in docs_entry.get("functions") or [] if fn.get("name") == func_name), None)
+        if entry is None:
+            raise FunctionNotFoundError(target)
+        source = "docs"
+
+    return {
+        "target": target,
+        "script": str(script_path),
+        "name": func_name,
+        "description": entry.get("description", ""),
+        "input_schema": entry.get("input_schema"),
+        "output_schema": entry.get("output_schema"),
+        "schema_hash": schema_hash(entry),
+        "source": source,
+    }
+
+
+def pipeline(
+    folder: str | Path,
+    spec: Any,
+    *,
+    input: Optional[Dict[str, Any]] = None,
+    secrets: Iterable[str] = (),
+    jobs: Optional[int] = None,
+) -> dict:
+    """
+    Run a DAG of `script:function` steps from `folder` (see `supypowers.pipeline.parse_pipeline`
+    for the spec format; `spec` may also be a path to a JSON file). `input` is merged over the
+    spec's pipeline input.
+
+    Steps that share a dependency set run in the same interpreter and pass their results
+    to each other as Python objects; independent steps run in parallel. Returns
+    `{"ok", "outputs", "steps", "interpreters", "ms"}` (`"error"` and `"failed_step"` instead
+    of `"outputs"` if a step failed). Raises `InvalidPipelineError` for a malformed spec.
+    """
+    folder = _folder(folder)
+    if isinstance(spec, (str, Path)):
+        try:
+            spec = json.loads(Path(spec).read_text(encoding="utf-8"))
+        except OSError as e:
+            raise InvalidPipelineError(f"cannot read pipeline spec: {e}") from None
+        except ValueError as e:
+            raise InvalidPipelineError(f"pipeline spec is not valid JSON: {e}") from None
+    parsed = parse_pipeline(spec)
+    targets = {step.id: resolve_target(folder, step.target) for step in parsed.steps}
+    return run_pipeline(
+        parsed,
+        targets,
+        pipeline_input=input,
+        extra_env=parse_secrets_args(secrets),
+        jobs=jobs,
+    )
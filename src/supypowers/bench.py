@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import platform
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from supypowers import __version__
+from supypowers.api import encode_input, resolve_target
+from supypowers.runner import BATCH_READY, RUNNER_CODE, parse_run_output
+from supypowers.serve import WorkerPool
+from supypowers.uv_exec import UVRunError, uv_run_python_code, uv_stream_python_code
+
+# Latency and throughput benchmarks for each way supypowers executes a function:
+#
+# - `uv_run`:  one `uv run --with ...` process per call (the environment pool disabled)
+# - `run`:     one process per call using the prebuilt environment's interpreter
+# - `current`: one process per call on this interpreter, without uv
+# - `serve`:   requests to a warm `--serve` worker
+# - `fork`:    requests to a `--fork-server` worker (one forked process per call)
+# - `batch`:   records streamed through one `--batch` runner
+#
+# `uv_run` and `run` never use the current interpreter; the other paths pick the
+# interpreter as configured (`SUPYPOWERS_INTERPRETER`).
+
+BENCH_PATHS = ("uv_run", "run", "current", "serve", "fork", "batch")
+BENCH_SUITE = "bench.json"
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    target: str
+    input_data: str
+
+
+def parse_case(spec: str) -> BenchCase:
+    """
+    Parse `script:function[=INPUT]` (INPUT defaults to `{}`).
+    """
+    target, sep, input_data = spec.partition("=")
+    return BenchCase(target=target, input_data=input_data if sep else "{}")
+
+
+def load_suite(path: Path) -> List[BenchCase]:
+    """
+    Read a suite file: `{"targets": [{"target": "script:function", "input_data": ...}]}`.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [BenchCase(t["target"], encode_input(t.get("input_data", {}))) for t in data["targets"]]
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    """
+    The `p`-th percentile (0-100) of `samples`, interpolating between closest ranks.
+    """
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples_ms: Sequence[float]) -> Optional[Dict[str, float]]:
+    if not samples_ms:
+        return None
+    return {
+        "p50": round(percentile(samples_ms, 50), 3),
+        "p95": round(percentile(samples_ms, 95), 3),
+        "p99": round(percentile(samples_ms, 99), 3),
+        "mean": round(sum(samples_ms) / len(samples_ms), 3),
+        "min": round(min(samples_ms), 3),
+        "max": round(max(samples_ms), 3),
+    }
+
+
+def _timed_calls(call: Callable[[], dict], iterations: int) -> dict:
+    # The first call is the cold one; `iterations` warm calls follow.
+    latencies = []
+    errors = 0
+    for _ in range(iterations + 1):
+        start = time.perf_counter()
+        response = call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += not response.get("ok")
+    warm = latencies[1:]
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "cold_ms": round(latencies[0], 3),
+        "warm_ms": summarize(warm),
+        "throughput_per_s": round(len(warm) / (sum(warm) / 1000), 3) if sum(warm) else None,
+    }
+
+
+def _bench_process(
+    script_path: Path,
+    payload: dict,
+    iterations: int,
+    env: Dict[str, str],
+    env_pool: bool,
+    interpreter: str,
+) -> dict:
+    def call() -> dict:
+        try:
+            out: str | UVRunError = uv_run_python_code(
+                script_path=script_path,
+                code=RUNNER_CODE,
+                payload=payload,
+                extra_env=env,
+                env_pool=env_pool,
+                interpreter=interpreter,
+            )
+        except UVRunError as e:
+            out = e
+        return parse_run_output(out)
+
+    return _timed_calls(call, iterations)
+
+
+def _bench_serve(script_path: Path, payload: dict, iterations: int, env: Dict[str, str], fork: bool) -> dict:
+    pool = WorkerPool(extra_env=env, fork=fork)
+    try:
+        return _timed_calls(
+            lambda: json.loads(pool.run(script_path, payload["function_name"], payload["input_data"])[0]),
+            iterations,
+        )
+    finally:
+        pool.close()
+
+
+def _bench_batch(script_path: Path, payload: dict, iterations: int, env: Dict[str, str]) -> dict:
+    # Cold: from spawning the runner to the first result. Warm: the gaps between
+    # consecutive results, with every record already queued on stdin.
+    header = json.dumps({"script_path": payload["script_path"], "function_name": payload["function_name"]})
+    try:
+        record = json.dumps(json.loads(payload["input_data"]))  # one record per line
+    except ValueError:
+        record = payload["input_data"].replace("\n", " ")
+    start = time.perf_counter()
+    arrivals = []
+    errors = 0
+    try:
+        for line in uv_stream_python_code(
+            script_path=script_path,
+            code=RUNNER_CODE,
+            args=["--batch"],
+            input_lines=[header, *([record] * (iterations + 1))],
+            extra_env=env,
+        ):
+            if line == BATCH_READY:
+                continue
+            arrivals.append(time.perf_counter())
+            errors += not line.startswith('{"ok": true')
+    except UVRunError:
+        errors += iterations + 1 - len(arrivals)
+    if not arrivals:
+        return {"calls": iterations + 1, "errors": errors, "cold_ms": None, "warm_ms": None, "throughput_per_s": None}
+    warm = [(b - a) * 1000 for a, b in zip(arrivals, arrivals[1:])]
+    span = arrivals[-1] - arrivals[0]
+    return {
+        "calls": iterations + 1,
+        "errors": errors,
+        "cold_ms": round((arrivals[0] - start) * 1000, 3),
+        "warm_ms": summarize(warm),
+        "throughput_per_s": round(len(warm) / span, 3) if span else None,
+    }
+
+
+def bench_case(
+    folder: Path,
+    case: BenchCase,
+    *,
+    iterations: int,
+    paths: Sequence[str] = BENCH_PATHS,
+    extra_env: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Benchmark one target on each of `paths`; raises `UsageError` for an invalid target.
+    """
+    script_path, func_name = resolve_target(folder, case.target)
+    payload = {"script_path": str(script_path), "function_name": func_name, "input_data": case.input_data}
+    env = extra_env or {}
+    results = {}
+    for path in paths:
+        if path in ("uv_run", "run", "current"):
+            interpreter = "current" if path == "current" else "uv"
+            results[path] = _bench_process(
+                script_path, payload, iterations, env, env_pool=path == "run", interpreter=interpreter
+            )
+        elif path in ("serve", "fork"):
+            results[path] = _bench_serve(script_path, payload, iterations, env, fork=path == "fork")
+        elif path == "batch":
+            results[path] = _bench_batch(script_path, payload, iterations, env)
+    return {"target": case.target, "input_data": case.input_data, "paths": results}
+
+
+def run_bench(
+    folder: Path,
+    cases: Sequence[BenchCase],
+    *,
+    iterations: int,
+    paths: Sequence[str] = BENCH_PATHS,
+    extra_env: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Benchmark every case and return the report `supypowers bench` prints.
+    """
+    return {
+        "ok": True,
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "folder": str(folder),
+        "iterations": iterations,
+        "paths": list(paths),
+        "results": [
+            bench_case(folder, case, iterations=iterations, paths=paths, extra_env=extra_env) for case in cases
+        ],
+    }
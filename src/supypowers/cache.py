@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+def default_cache_dir() -> Path:
+    """
+    Root directory for supypowers' on-disk caches.
+
+    `SUPYPOWERS_CACHE_DIR` wins, then `$XDG_CACHE_HOME/supypowers`, then `~/.cache/supypowers`.
+    """
+    explicit = os.environ.get("SUPYPOWERS_CACHE_DIR")
+    if explicit:
+        return Path(explicit)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg) if xdg else Path.home() / ".cache"
+    return base / "supypowers"
+
+
+def hash_key(parts: Dict[str, Any]) -> str:
+    """
+    Stable sha256 hex digest of a JSON-serializable mapping.
+    """
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def acquire_file_lock(path: Path, *, shared: bool = False, blocking: bool = True) -> Optional[int]:
+    """
+    Take an advisory lock on `path` (created if missing), shared or exclusive, that other
+    processes see. Returns the file descriptor to pass to `release_file_lock`, or None if
+    `blocking` is false and a conflicting lock is held. Without `fcntl` (Windows) nothing
+    is locked and -1 is returned.
+    """
+    if fcntl is None:
+        return -1
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+    try:
+        fcntl.flock(fd, flags)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def release_file_lock(fd: int) -> None:
+    if fd >= 0:
+        os.close(fd)
+
+
+@contextmanager
+def file_lock(path: Path, *, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold `acquire_file_lock(path)` for the duration of the block, yielding whether it
+    was acquired.
+    """
+    fd = acquire_file_lock(path, shared=shared, blocking=blocking)
+    try:
+        yield fd is not None
+    finally:
+        if fd is not None:
+            release_file_lock(fd)
+
+
+class DiskCache:
+    """
+    A directory of JSON entries with least-recently-used eviction by total size.
+
+    Entries live at `<root>/<key[:2]>/<key>.json`; a read refreshes the entry's mtime,
+    which is what eviction orders by. `put` does not evict, so callers storing a batch
+    call `evict()` once afterwards. Hit/miss counters are kept in memory and added to
+    `<root>/stats.json` by `flush_stats()`, safely across processes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _entries(self) -> List[Path]:
+        if not self.root.exists():
+            return []
+        return [p for p in self.root.glob("*/*.json") if p.is_file()]
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            record = None
+
+        expires_at = record.get("expires_at") if isinstance(record, dict) else None
+        if record is None or (expires_at is not None and expires_at < time.time()):
+            if record is not None:
+                path.unlink(missing_ok=True)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return record["value"]
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.put_json(key, json.dumps(value, ensure_ascii=False), ttl=ttl)
+
+    def put_json(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """
+        Like `put`, for a value already serialized as JSON (`value` is stored as is).
+        """
+        self._write(key, ttl, lambda f: f.write(value.encode("utf-8")))
+
+    def put_json_file(self, key: str, source: Path, ttl: Optional[float] = None) -> None:
+        """
+        Like `put_json`, for a value serialized as JSON in the file `source`, which is
+        copied into the entry without being loaded.
+        """
+
+        def copy(f: Any) -> None:
+            with source.open("rb") as src:
+                shutil.copyfileobj(src, f)
+
+        self._write(key, ttl, copy)
+
+    def _write(self, key: str, ttl: Optional[float], write_value: Callable[[Any], Any]) -> None:
+        # Write an entry atomically; `write_value` writes the serialized value to the file.
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        expires_at = json.dumps(time.time() + ttl if ttl is not None else None)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(f'{{"expires_at": {expires_at}, "value": '.encode("utf-8"))
+                write_value(f)
+                f.write(b"}")
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def evict(self) -> None:
+        """
+        Delete least-recently-used entries until the cache fits in `max_bytes`.
+        """
+        entries = []
+        total = 0
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, p in sorted(entries):
+            p.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def flush_stats(self) -> None:
+        """
+        Add this instance's hit/miss counts to the persisted totals and reset them.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            self.hits = self.misses = 0
+        if not hits and not misses:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Other processes flush into the same file: read, add and replace it under a lock.
+        with file_lock(self.root / "stats.lock"):
+            totals = self._persisted_stats()
+            totals["hits"] += hits
+            totals["misses"] += misses
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(totals, f)
+                os.replace(tmp, self.root / "stats.json")
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+
+    def _persisted_stats(self) -> Dict[str, int]:
+        try:
+            data = json.loads((self.root / "stats.json").read_text(encoding="utf-8"))
+            return {"hits": int(data.get("hits", 0)), "misses": int(data.get("misses", 0))}
+        except Exception:
+            return {"hits": 0, "misses": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        totals = self._persisted_stats()
+        with self._lock:
+            totals["hits"] += self.hits
+            totals["misses"] += self.misses
+        entries = self._entries()
+        return {
+            "path": str(self.root),
+            "entries": len(entries),
+            "bytes": sum(p.stat().st_size for p in entries),
+            "max_bytes": self.max_bytes,
+            **totals,
+        }
+
+    def clear(self) -> None:
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        with self._lock:
+            self.hits = self.misses = 0
@@ -2,11 +2,31 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import shutil
+import signal
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-
-from supypowers.uv_exec import UVRunError, uv_run_python_code
-from supypowers.util import parse_secrets_args, resolve_script_path
+from typing import NoReturn
+
+from supypowers import api
+from supypowers.api import InspectionError, SupypowersError
+from supypowers.bench import BENCH_PATHS, BENCH_SUITE, load_suite, parse_case, run_bench
+from supypowers.docs import default_jobs, discover_scripts, docs_cache, inspect_scripts
+from supypowers.envs import INTERPRETER_MODES, default_env_pool, prefetch, wheel_cache_dir
+from supypowers.memo import results_cache
+from supypowers.runner import BATCH_READY, RUNNER_CODE, render_run_output
+from supypowers.serve import WorkerPool, serve_stream, serve_unix_socket
+from supypowers.shared_env import SharedEnv
+from supypowers.uv_exec import UVRunError, uv_stream_python_code
+from supypowers.util import parse_secrets_args
+from supypowers.wire import WIRE_FORMATS
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+from supypowers.watch import FolderWatcher, atomic_write
+from supypowers.worker import WorkerServer, is_loopback, parse_address, serve_worker
 
 
 def app() -> None:
@@ -24,7 +44,72 @@ def app() -> None:
     run_p = sub.add_parser("run", help="Run a function in a script via `uv run`")
     run_p.add_argument("folder", type=Path, help="Folder containing scripts")
     run_p.add_argument("target", type=str, help="script:function (script may omit .py)")
-    run_p.add_argument("input_data", type=str, help="Input data (JSON or Python-literal-ish)")
+    run_p.add_argument(
+        "input_data",
+        type=str,
+        nargs="?",
+        default=None,
+        help="Input data (JSON or Python-literal-ish)",
+    )
+    run_p.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Run once per line of a JSON-lines file (or `-` for stdin) in a single runner "
+        "process, streaming one JSON result per line.",
+    )
+    run_p.add_argument(
+        "--input-file",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Read the input (JSON) from a file, or `-` for stdin, instead of input_data. "
+        "The runner reads the file itself.",
+    )
+    run_p.add_argument(
+        "--output-file",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Have the runner write the result into PATH and print only a summary line.",
+    )
+    run_p.add_argument(
+        "--wire-format",
+        choices=WIRE_FORMATS,
+        default="json",
+        help="Accepted for parity with supypowers.run(wire_format=...). The CLI prints JSON, so the "
+        "runner always answers it in JSON and the result line is passed through; binary formats "
+        "only apply to Python callers.",
+    )
+    run_p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the function, even if it is marked `@superpower(cache=True)`.",
+    )
+    run_p.add_argument(
+        "--profile",
+        action="store_true",
+        help="Add a per-phase timing breakdown (`profile`) to the result.",
+    )
+    run_p.add_argument(
+        "--shared-env",
+        action="store_true",
+        help="Use one environment built from the merged requirements of the folder's scripts; "
+        "scripts that conflict with it keep their own.",
+    )
+    run_p.add_argument(
+        "--interpreter",
+        choices=INTERPRETER_MODES,
+        default=None,
+        help="uv (default): always run scripts through uv; auto: on this Python when it already "
+        "has their dependencies, else through uv; current: always on this Python.",
+    )
+    run_p.add_argument(
+        "--offline",
+        action="store_true",
+        help="Install only from the local wheel cache filled by `supypowers sync`; never use the network.",
+    )
     run_p.add_argument(
         "--secrets",
         action="append",
@@ -53,6 +138,319 @@ def app() -> None:
         help="Only include functions explicitly marked (currently: decorator named `superpower`).",
     )
     docs_p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Maximum number of scripts inspected concurrently (default: CPU count). Given "
+        "explicitly, scripts sharing a dependency set are also split across up to N interpreters.",
+    )
+    docs_p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-inspect every script instead of reusing cached docs for unchanged scripts.",
+    )
+    docs_p.add_argument(
+        "--static",
+        action="store_true",
+        help="Read scripts without executing them where possible; falls back to runtime inspection.",
+    )
+    docs_p.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and update --output whenever scripts are added, changed or removed.",
+    )
+    docs_p.add_argument(
+        "--shared-env",
+        action="store_true",
+        help="Use one environment built from the merged requirements of the folder's scripts; "
+        "scripts that conflict with it keep their own.",
+    )
+    docs_p.add_argument(
+        "--interpreter",
+        choices=INTERPRETER_MODES,
+        default=None,
+        help="uv (default): always run scripts through uv; auto: on this Python when it already "
+        "has their dependencies, else through uv; current: always on this Python.",
+    )
+    docs_p.add_argument(
+        "--offline",
+        action="store_true",
+        help="Install only from the local wheel cache filled by `supypowers sync`; never use the network.",
+    )
+    docs_p.add_argument(
+        "--secrets",
+        action="append",
+        default=[],
+        help="Secrets as a .env path or inline KEY=VAL. May be provided multiple times.",
+    )
+
+    index_p = sub.add_parser(
+        "index",
+        help="Build or refresh the searchable function index of a folder (used by `search`)",
+    )
+    index_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    index_p.add_argument("--recursive", action="store_true", help="Recurse into subfolders")
+    index_p.add_argument(
+        "--require-marker",
+        action="store_true",
+        help="Only include functions explicitly marked (currently: decorator named `superpower`).",
+    )
+    index_p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Maximum number of scripts inspected concurrently (default: CPU count). Given "
+        "explicitly, scripts sharing a dependency set are also split across up to N interpreters.",
+    )
+    index_p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-inspect changed scripts instead of reusing cached docs.",
+    )
+    index_p.add_argument(
+        "--static",
+        action="store_true",
+        help="Read scripts without executing them where possible; falls back to runtime inspection.",
+    )
+    index_p.add_argument(
+        "--index",
+        type=Path,
+        default=None,
+        help="Index file to use (default: one per folder in the supypowers cache directory).",
+    )
+    index_p.add_argument(
+        "--secrets",
+        action="append",
+        default=[],
+        help="Secrets as a .env path or inline KEY=VAL. May be provided multiple times.",
+    )
+
+    search_p = sub.add_parser("search", help="Find functions by name or description in a folder's index")
+    search_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    search_p.add_argument("query", help="Words to look for (prefixes match too)")
+    search_p.add_argument("--limit", type=int, default=10, help="Maximum number of results (default: 10).")
+    search_p.add_argument(
+        "--index",
+        type=Path,
+        default=None,
+        help="Index file to read (default: the folder's index in the supypowers cache directory).",
+    )
+
+    schema_p = sub.add_parser(
+        "schema",
+        help="Print one function's input/output schemas, inspecting only its script",
+    )
+    schema_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    schema_p.add_argument("target", help="Target in the form script:function (script may omit .py)")
+    schema_p.add_argument(
+        "--require-marker",
+        action="store_true",
+        help="Only find functions explicitly marked (currently: decorator named `superpower`).",
+    )
+    schema_p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Inspect the script instead of reusing cached docs.",
+    )
+    schema_p.add_argument(
+        "--static",
+        action="store_true",
+        help="Read the script without executing it where possible; falls back to runtime inspection.",
+    )
+    schema_p.add_argument(
+        "--index",
+        type=Path,
+        default=None,
+        help="Index file to consult first (default: the folder's index in the supypowers cache directory).",
+    )
+    schema_p.add_argument(
+        "--secrets",
+        action="append",
+        default=[],
+        help="Secrets as a .env path or inline KEY=VAL. May be provided multiple times.",
+    )
+
+    pipeline_p = sub.add_parser(
+        "pipeline",
+        help="Run a DAG of script:function steps, passing results between them in memory",
+    )
+    pipeline_p.add_argument("spec", type=Path, help="Pipeline spec (JSON file)")
+    pipeline_p.add_argument(
+        "--folder",
+        type=Path,
+        default=None,
+        help="Folder containing the scripts (default: the folder the spec is in).",
+    )
+    pipeline_p.add_argument(
+        "--input",
+        dest="pipeline_input",
+        default=None,
+        help="Pipeline input as a JSON object, merged over the spec's `input`.",
+    )
+    pipeline_p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Maximum interpreters per dependency set (default: CPU count).",
+    )
+    pipeline_p.add_argument(
+        "--secrets",
+        action="append",
+        default=[],
+        help="Secrets as a .env path or inline KEY=VAL. May be provided multiple times.",
+    )
+
+    cache_p = sub.add_parser("cache", help="Inspect or clear supypowers' on-disk caches")
+    cache_p.add_argument("action", choices=["stats", "clear"], help="What to do with the caches")
+
+    env_p = sub.add_parser("env", help="List or prune prebuilt dependency environments")
+    env_sub = env_p.add_subparsers(dest="env_command", required=True)
+    env_sub.add_parser("list", help="List prebuilt environments, most recently used first")
+    prune_p = env_sub.add_parser("prune", help="Delete least-recently-used environments")
+    prune_p.add_argument(
+        "--max-bytes",
+        type=int,
+        default=None,
+        help="Keep the pool under this many bytes (default: the pool limit, 2 GiB).",
+    )
+    prune_p.add_argument("--all", action="store_true", help="Delete every environment.")
+
+    warm_p = sub.add_parser(
+        "warm",
+        help="Prebuild the environment of every script in a folder ahead of time",
+    )
+    warm_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    warm_p.add_argument("--recursive", action="store_true", help="Recurse into subfolders")
+    warm_p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Maximum number of environments built concurrently (default: CPU count).",
+    )
+
+    sync_p = sub.add_parser(
+        "sync",
+        help="Download and build every script's dependencies into the local wheel cache (for --offline)",
+    )
+    sync_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    sync_p.add_argument("--recursive", action="store_true", help="Recurse into subfolders")
+    sync_p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Maximum number of dependency sets fetched concurrently (default: CPU count).",
+    )
+
+    bench_p = sub.add_parser("bench", help="Measure cold/warm latency and throughput of each execution path")
+    bench_p.add_argument(
+        "folder",
+        type=Path,
+        nargs="?",
+        default=Path("examples"),
+        help="Folder containing scripts (default: ./examples)",
+    )
+    bench_p.add_argument(
+        "targets",
+        nargs="*",
+        metavar="script:function[=INPUT]",
+        help=f"Targets to benchmark (default: the suite in <folder>/{BENCH_SUITE}).",
+    )
+    bench_p.add_argument("--suite", type=Path, default=None, help="Suite file to read targets from.")
+    bench_p.add_argument(
+        "--iterations",
+        "-n",
+        type=int,
+        default=10,
+        help="Warm calls per target and path, after one cold call (default: 10).",
+    )
+    bench_p.add_argument(
+        "--paths",
+        nargs="+",
+        choices=list(BENCH_PATHS),
+        default=list(BENCH_PATHS),
+        help="Execution paths to measure (default: all).",
+    )
+    bench_p.add_argument("--output", type=Path, default=None, help="Write the JSON report to a file.")
+    bench_p.add_argument(
+        "--secrets",
+        action="append",
+        default=[],
+        help="Secrets as a .env path or inline KEY=VAL. May be provided multiple times.",
+    )
+
+    serve_p = sub.add_parser(
+        "serve",
+        help="Keep warm runner interpreters alive and answer JSON-lines run requests",
+    )
+    serve_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    serve_p.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Listen on this Unix socket instead of stdin/stdout.",
+    )
+    serve_p.add_argument(
+        "--fork",
+        action="store_true",
+        help="Run every request in its own process, forked from a worker that has already "
+        "imported the script.",
+    )
+    serve_p.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Maximum number of warm interpreters per dependency set, for concurrent "
+        "requests on --socket (default: 1; ignored with --fork).",
+    )
+    serve_p.add_argument(
+        "--interpreter",
+        choices=INTERPRETER_MODES,
+        default=None,
+        help="uv (default): always run scripts through uv; auto: on this Python when it already "
+        "has their dependencies, else through uv; current: always on this Python.",
+    )
+    serve_p.add_argument(
+        "--shared-env",
+        action="store_true",
+        help="Use one environment built from the merged requirements of the folder's scripts; "
+        "scripts that conflict with it keep their own.",
+    )
+    serve_p.add_argument(
+        "--secrets",
+        action="append",
+        default=[],
+        help="Secrets as a .env path or inline KEY=VAL. May be provided multiple times.",
+    )
+
+    worker_p = sub.add_parser(
+        "worker",
+        help="Serve a folder to remote dispatchers over TCP (see supypowers.Dispatcher)",
+    )
+    worker_p.add_argument("folder", type=Path, help="Folder containing scripts")
+    worker_p.add_argument(
+        "--listen",
+        required=True,
+        metavar="HOST:PORT",
+        help="Address to listen on (port 0 picks a free port). Non-loopback addresses require "
+        "SUPYPOWERS_WORKER_TOKEN.",
+    )
+    worker_p.add_argument(
+        "--fork",
+        action="store_true",
+        help="Run every request in its own process forked from a warm worker (as serve --fork).",
+    )
+    worker_p.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Maximum number of warm interpreters per dependency set (default: 1; ignored with --fork).",
+    )
+    worker_p.add_argument(
         "--secrets",
         action="append",
         default=[],
@@ -61,11 +459,29 @@ def app() -> None:
 
     args = parser.parse_args()
 
+    if getattr(args, "offline", False):
+        # Read by every uv invocation, including those of child processes.
+        os.environ["SUPYPOWERS_OFFLINE"] = "1"
+    if getattr(args, "interpreter", None):
+        os.environ["SUPYPOWERS_INTERPRETER"] = args.interpreter
+
     if args.command == "init":
         _cmd_init(args.folder, force=bool(args.force))
         return
     if args.command == "run":
-        _cmd_run(args.folder, args.target, args.input_data, args.secrets)
+        _cmd_run(
+            args.folder,
+            args.target,
+            args.input_data,
+            args.secrets,
+            batch=args.batch,
+            input_file=args.input_file,
+            output_file=args.output_file,
+            wire_format=args.wire_format,
+            use_cache=not args.no_cache,
+            profile=args.profile,
+            shared_env=args.shared_env,
+        )
         return
     if args.command == "docs":
         _cmd_docs(
@@ -75,9 +491,83 @@ def app() -> None:
             args.secrets,
             args.format,
             args.output,
+            args.jobs,
+            use_cache=not args.no_cache,
+            static=args.static,
+            watch=args.watch,
+            shared_env=args.shared_env,
+        )
+        return
+    if args.command == "index":
+        _cmd_index(
+            args.folder,
+            args.recursive,
+            args.require_marker,
+            args.secrets,
+            args.jobs,
+            use_cache=not args.no_cache,
+            static=args.static,
+            index_path=args.index,
+        )
+        return
+    if args.command == "search":
+        _cmd_search(args.folder, args.query, limit=args.limit, index_path=args.index)
+        return
+    if args.command == "schema":
+        _cmd_schema(
+            args.folder,
+            args.target,
+            args.secrets,
+            require_marker=args.require_marker,
+            use_cache=not args.no_cache,
+            static=args.static,
+            index_path=args.index,
+        )
+        return
+    if args.command == "pipeline":
+        _cmd_pipeline(args.spec, args.folder, args.pipeline_input, args.secrets, args.jobs)
+        return
+    if args.command == "cache":
+        _cmd_cache(args.action)
+        return
+    if args.command == "env":
+        max_bytes = None
+        if args.env_command == "prune":
+            max_bytes = 0 if args.all else args.max_bytes
+        _cmd_env(args.env_command, max_bytes=max_bytes)
+        return
+    if args.command == "warm":
+        _cmd_warm(args.folder, args.recursive, args.jobs)
+        return
+    if args.command == "sync":
+        _cmd_sync(args.folder, args.recursive, args.jobs)
+        return
+    if args.command == "bench":
+        _cmd_bench(
+            args.folder,
+            args.targets,
+            args.suite,
+            args.iterations,
+            args.paths,
+            args.output,
+            args.secrets,
+        )
+        return
+    if args.command == "serve":
+        _cmd_serve(
+            args.folder,
+            args.socket,
+            args.secrets,
+            fork=args.fork,
+            shared_env=args.shared_env,
+            workers=args.workers,
         )
         return
 
+    if args.command == "worker":
+        _cmd_worker(args.folder, args.listen, args.secrets, fork=args.fork, workers=args.workers)
+        return
+
     parser.error("unknown command")
 
 
@@ -119,56 +609,276 @@ def _cmd_init(folder: Path, *, force: bool) -> None:
     )
 
 
-def _cmd_run(folder: Path, target: str, input_data: str, secrets: list[str]) -> None:
-    if not folder.exists() or not folder.is_dir():
-        print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
-        raise SystemExit(2)
+def _exit_with(e: SupypowersError) -> NoReturn:
+    print(json.dumps(e.to_dict()))
+    raise SystemExit(e.exit_status)
 
-    script_name, _, func_name = target.partition(":")
-    if not script_name or not func_name:
-        print(json.dumps({"ok": False, "error": "target must be in the form script:function"}))
-        raise SystemExit(2)
 
-    script_path = resolve_script_path(folder, script_name)
-    env = parse_secrets_args(secrets or [])
+def _shared_env(folder: Path, scripts: list[Path] | None = None) -> SharedEnv:
+    # The folder's shared environment; conflicts (for `scripts`, default: all) go to stderr.
+    shared = api.shared_environment(folder)
+    names = None if scripts is None else {str(p.resolve()) for p in scripts}
+    for conflict in shared.conflicts:
+        if names is not None and conflict["script"] not in names:
+            continue
+        reason = conflict.get("error") or "conflicts with " + ", ".join(conflict["conflicts_with"])
+        sys.stderr.write(
+            f"supypowers: {conflict['script']} uses its own environment ({conflict['requirement']}: {reason})\n"
+        )
+    return shared
+
 
-    payload = {
-        "script_path": str(script_path),
-        "function_name": func_name,
-        "input_data": input_data,
-    }
+def _cmd_run(
+    folder: Path,
+    target: str,
+    input_data: str | None,
+    secrets: list[str],
+    *,
+    batch: str | None = None,
+    input_file: str | None = None,
+    output_file: Path | None = None,
+    wire_format: str = "json",
+    use_cache: bool = True,
+    profile: bool = False,
+    shared_env: bool = False,
+) -> None:
+    if [input_data, batch, input_file].count(None) != 2:
+        print(json.dumps({"ok": False, "error": "provide exactly one of input_data, --input-file or --batch"}))
+        raise SystemExit(2)
+    if batch is not None and (profile or output_file is not None):
+        print(json.dumps({"ok": False, "error": "--profile and --output-file cannot be combined with --batch"}))
+        raise SystemExit(2)
+
+    if input_file == "-":
+        # The runner reads its input from a file; spool stdin into one.
+        with tempfile.NamedTemporaryFile(prefix="supypowers-input-", suffix=".json") as spooled:
+            shutil.copyfileobj(sys.stdin.buffer, spooled)
+            spooled.flush()
+            _cmd_run(
+                folder,
+                target,
+                None,
+                secrets,
+                input_file=spooled.name,
+                output_file=output_file,
+                wire_format=wire_format,
+                use_cache=use_cache,
+                profile=profile,
+                shared_env=shared_env,
+            )
+        return
 
     try:
-        out = uv_run_python_code(
-            script_path=script_path,
-            code=_RUNNER_CODE,
-            payload=payload,
-            extra_env=env,
+        shared = None
+        if shared_env or batch is not None:
+            script_path, func_name = api.resolve_target(folder, target)
+            if shared_env:
+                shared = _shared_env(folder, [script_path])
+        if batch is not None:
+            deps = shared.dependencies_for(script_path) if shared is not None else None
+            _cmd_run_batch(script_path, func_name, batch, parse_secrets_args(secrets or []), deps)
+            return
+        lines = api.run_stream(
+            folder,
+            target,
+            input_data,
+            input_file=input_file,
+            output_file=output_file,
+            secrets=secrets or [],
+            use_cache=use_cache,
+            profile=profile,
+            wire_format=wire_format,
+            shared_env=shared or False,
         )
+    except SupypowersError as e:
+        _exit_with(e)
+
+    # Streamed frames are written as soon as the runner emits them.
+    try:
+        for line in lines:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+    except SupypowersError as e:
+        # Backpressure is only raised once iteration starts.
+        _exit_with(e)
+    if lines.stderr:
+        sys.stderr.write(lines.stderr + "\n")
+    raise SystemExit(lines.exit_code)
+
+
+def _cmd_run_batch(script_path: Path, func_name: str, batch: str, env: dict, deps: list[str] | None = None) -> None:
+    if batch != "-" and not Path(batch).is_file():
+        print(json.dumps({"ok": False, "error": f"batch file not found: {batch}"}))
+        raise SystemExit(2)
+
+    def input_lines():
+        yield json.dumps({"script_path": str(script_path), "function_name": func_name})
+        if batch == "-":
+            yield from sys.stdin
+        else:
+            with open(batch, "r", encoding="utf-8") as f:
+                yield from f
+
+    lines = uv_stream_python_code(
+        script_path=script_path,
+        code=RUNNER_CODE,
+        args=["--batch"],
+        input_lines=input_lines(),
+        extra_env=env,
+        deps=deps,
+    )
+    all_ok = True
+    first = ""
+    try:
+        first = next(lines, "")
+        if first != BATCH_READY:
+            # The function could not be resolved; report it exactly like `run` would.
+            rest = list(lines)
+            rendered, exit_code = render_run_output("\n".join([first, *rest]))
+            print(rendered)
+            raise SystemExit(exit_code)
+        for line in lines:
+            all_ok = all_ok and line.startswith('{"ok": true')
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
     except UVRunError as e:
         if e.stderr:
             sys.stderr.write(e.stderr + "\n")
-        print(
-            json.dumps(
-                {
-                    "ok": False,
-                    "error": e.message,
-                    "exit_code": e.exit_code,
-                    "uv_stdout": e.stdout,
-                    "uv_stderr": e.stderr,
-                }
-            )
+        if first != BATCH_READY:
+            e = UVRunError(message=e.message, exit_code=e.exit_code, stdout=first, stderr=e.stderr)
+        rendered, exit_code = render_run_output(e)
+        print(rendered)
+        raise SystemExit(exit_code)
+
+    raise SystemExit(0 if all_ok else 1)
+
+
+def _cmd_bench(
+    folder: Path,
+    targets: list[str],
+    suite: Path | None,
+    iterations: int,
+    paths: list[str],
+    output_path: Path | None,
+    secrets: list[str],
+) -> None:
+    if not folder.exists() or not folder.is_dir():
+        print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
+        raise SystemExit(2)
+    if iterations < 1:
+        print(json.dumps({"ok": False, "error": "--iterations must be at least 1"}))
+        raise SystemExit(2)
+
+    if targets:
+        cases = [parse_case(spec) for spec in targets]
+    else:
+        suite = suite or folder / BENCH_SUITE
+        try:
+            cases = load_suite(suite)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(json.dumps({"ok": False, "error": f"cannot read benchmark suite {suite}: {e}"}))
+            raise SystemExit(2)
+
+    try:
+        report = run_bench(
+            folder,
+            cases,
+            iterations=iterations,
+            paths=paths,
+            extra_env=parse_secrets_args(secrets or []),
         )
-        raise SystemExit(e.exit_code)
+    except SupypowersError as e:
+        _exit_with(e)
+
+    rendered = json.dumps(report, ensure_ascii=False)
+    if output_path is not None:
+        output_path.write_text(rendered + "\n", encoding="utf-8")
+    else:
+        print(rendered)
+
 
+def _cmd_serve(
+    folder: Path,
+    socket_path: Path | None,
+    secrets: list[str],
+    *,
+    fork: bool = False,
+    shared_env: bool = False,
+    workers: int = 1,
+) -> None:
+    if not folder.exists() or not folder.is_dir():
+        print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
+        raise SystemExit(2)
+    if workers < 1:
+        print(json.dumps({"ok": False, "error": "--workers must be at least 1"}))
+        raise SystemExit(2)
+
+    # The shared environment is merged once, from the scripts present at startup.
+    shared = _shared_env(folder) if shared_env else None
     try:
-        parsed = json.loads(out)
-    except Exception:
-        print(json.dumps({"ok": False, "error": "runner did not emit valid JSON", "raw": out}))
-        raise SystemExit(1)
+        pool = WorkerPool(
+            extra_env=parse_secrets_args(secrets or []), fork=fork, shared=shared, size=workers
+        )
+    except OSError as e:
+        print(json.dumps({"ok": False, "error": str(e)}))
+        raise SystemExit(2)
+    # Treat SIGTERM like Ctrl-C so workers and the socket file are cleaned up.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if socket_path is not None:
+            serve_unix_socket(pool, folder, socket_path)
+        else:
+            serve_stream(pool, folder, sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
 
-    print(json.dumps(parsed, ensure_ascii=False))
-    raise SystemExit(0 if parsed.get("ok") else 1)
+
+def _cmd_worker(
+    folder: Path,
+    listen: str,
+    secrets: list[str],
+    *,
+    fork: bool = False,
+    workers: int = 1,
+) -> None:
+    if not folder.exists() or not folder.is_dir():
+        print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
+        raise SystemExit(2)
+    if workers < 1:
+        print(json.dumps({"ok": False, "error": "--workers must be at least 1"}))
+        raise SystemExit(2)
+    extra_env = parse_secrets_args(secrets or [])
+    token = os.environ.get("SUPYPOWERS_WORKER_TOKEN") or None
+    try:
+        address = parse_address(listen)
+    except ValueError as e:
+        print(json.dumps({"ok": False, "error": str(e)}))
+        raise SystemExit(2)
+    if token is None and not is_loopback(address[0]):
+        # Anyone who can reach the port could run the folder's scripts.
+        error = f"refusing to listen on {address[0]} without SUPYPOWERS_WORKER_TOKEN; set it or listen on 127.0.0.1"
+        print(json.dumps({"ok": False, "error": error}))
+        raise SystemExit(2)
+    try:
+        pool = WorkerPool(extra_env=extra_env, fork=fork, size=workers)
+    except OSError as e:
+        print(json.dumps({"ok": False, "error": str(e)}))
+        raise SystemExit(2)
+    try:
+        server = WorkerServer(address, pool, folder, extra_env=extra_env, token=token)
+    except OSError as e:
+        pool.close()
+        print(json.dumps({"ok": False, "error": f"cannot listen on {listen}: {e}"}))
+        raise SystemExit(2)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        serve_worker(server)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
 
 
 def _cmd_docs(
@@ -178,273 +888,317 @@ def _cmd_docs(
     secrets: list[str],
     out_format: str,
     output_path: Path | None,
+    jobs: int | None = None,
+    *,
+    use_cache: bool = True,
+    static: bool = False,
+    watch: bool = False,
+    shared_env: bool = False,
 ) -> None:
+    if watch:
+        _cmd_docs_watch(
+            folder, recursive, require_marker, secrets, out_format, output_path, jobs, use_cache, static, shared_env
+        )
+        return
+    try:
+        if shared_env:
+            _shared_env(folder)
+        docs_out = api.docs(
+            folder,
+            recursive=recursive,
+            require_marker=require_marker,
+            secrets=secrets or [],
+            jobs=jobs,
+            use_cache=use_cache,
+            static=static,
+            shared_env=shared_env,
+        )
+    except SupypowersError as e:
+        _exit_with(e)
+
+    rendered = _render_docs([_render_entry(entry, out_format) for entry in docs_out], out_format)
+    if output_path is not None:
+        atomic_write(output_path, rendered + "\n")
+    else:
+        print(rendered)
+
+
+def _cmd_docs_watch(
+    folder: Path,
+    recursive: bool,
+    require_marker: bool,
+    secrets: list[str],
+    out_format: str,
+    output_path: Path | None,
+    jobs: int | None,
+    use_cache: bool,
+    static: bool,
+    shared_env: bool = False,
+) -> None:
+    if output_path is None:
+        print(json.dumps({"ok": False, "error": "--watch requires --output"}))
+        raise SystemExit(2)
     if not folder.exists() or not folder.is_dir():
         print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
         raise SystemExit(2)
 
     env = parse_secrets_args(secrets or [])
 
-    scripts = (
-        sorted(p for p in folder.rglob("*.py") if p.is_file())
-        if recursive
-        else sorted(p for p in folder.glob("*.py") if p.is_file())
-    )
+    def inspect(scripts: list[Path], shared: SharedEnv | None) -> dict[Path, str]:
+        if not scripts:
+            return {}
+        entries = inspect_scripts(
+            scripts,
+            require_marker=require_marker,
+            extra_env=env,
+            jobs=jobs,
+            cache=docs_cache() if use_cache else None,
+            static=static,
+            shared=shared,
+        )
+        return {path: _render_entry(entry, out_format) for path, entry in zip(scripts, entries)}
 
-    docs_out: list[dict] = []
-    for script_path in scripts:
-        payload = {"script_path": str(script_path), "require_marker": require_marker}
-        try:
-            out = uv_run_python_code(
-                script_path=script_path,
-                code=_DOCS_CODE,
-                payload=payload,
-                extra_env=env,
-            )
-            docs_out.append(json.loads(out))
-        except Exception as e:
-            docs_out.append({"script": str(script_path), "error": str(e), "functions": []})
+    # One rendered entry per script; a change re-inspects and re-renders only its own. The
+    # merged requirements can change with any batch of changes, and are worked out once per batch.
+    watcher = FolderWatcher(folder, recursive)
+    shared = api.shared_environment(folder) if shared_env else None
+    fragments = inspect(sorted(watcher.snapshot), shared)
+    atomic_write(output_path, _render_docs([fragments[p] for p in sorted(fragments)], out_format) + "\n")
+    sys.stderr.write(f"supypowers: watching {folder} ({watcher.method}), writing {output_path}\n")
 
-    if out_format == "json":
-        rendered = json.dumps(docs_out, ensure_ascii=False)
-    else:
-        rendered = _docs_to_markdown(docs_out)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for changed, removed in watcher:
+            for path in removed:
+                fragments.pop(path, None)
+            shared = api.shared_environment(folder) if shared_env and changed else None
+            fragments.update(inspect(changed, shared))
+            atomic_write(output_path, _render_docs([fragments[p] for p in sorted(fragments)], out_format) + "\n")
+            sys.stderr.write(
+                json.dumps({"updated": [str(p) for p in changed], "removed": [str(p) for p in removed]}) + "\n"
+            )
+            sys.stderr.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
-    if output_path is not None:
-        output_path.write_text(rendered + "\n", encoding="utf-8")
-    else:
-        print(rendered)
 
+def _cmd_index(
+    folder: Path,
+    recursive: bool,
+    require_marker: bool,
+    secrets: list[str],
+    jobs: int | None = None,
+    *,
+    use_cache: bool = True,
+    static: bool = False,
+    index_path: Path | None = None,
+) -> None:
+    try:
+        stats = api.build_index(
+            folder,
+            recursive=recursive,
+            require_marker=require_marker,
+            secrets=secrets or [],
+            jobs=jobs,
+            use_cache=use_cache,
+            static=static,
+            index_path=index_path,
+        )
+    except SupypowersError as e:
+        _exit_with(e)
+    print(json.dumps({"ok": True, **stats}))
 
-def _docs_to_markdown(docs_out: list[dict]) -> str:
-    lines: list[str] = []
-    lines.append("## Supypowers\n")
-    for item in docs_out:
-        script = item.get("script", "")
-        err = item.get("error")
-        lines.append(f"### `{script}`\n")
-        if err:
-            lines.append(f"**Error:** `{err}`\n")
-            continue
-        fns = item.get("functions") or []
-        if not fns:
-            lines.append("_No supypowers found._\n")
-            continue
-        for fn in fns:
-            name = fn.get("name", "")
-            desc = (fn.get("description") or "").strip()
-            lines.append(f"#### `{name}`\n")
-            if desc:
-                lines.append(desc + "\n")
-            in_schema = fn.get("input_schema")
-            out_schema = fn.get("output_schema")
-            lines.append("**Input schema**\n")
-            lines.append("```json")
-            lines.append(json.dumps(in_schema, ensure_ascii=False, indent=2))
-            lines.append("```\n")
-            lines.append("**Output schema**\n")
-            lines.append("```json")
-            lines.append(json.dumps(out_schema, ensure_ascii=False, indent=2))
-            lines.append("```\n")
-    return "\n".join(lines).rstrip() + "\n"
-
-
-_RUNNER_CODE = r"""
-import ast
-import importlib.util
-import inspect
-import json
-import sys
-import typing
 
-def _parse_input(s):
-    s = s.strip()
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-    # "YAML-ish" best-effort: accept Python literals (e.g. {'x': 1}, [1,2], True, None).
+def _cmd_search(folder: Path, query: str, *, limit: int = 10, index_path: Path | None = None) -> None:
     try:
-        return ast.literal_eval(s)
-    except Exception:
-        raise ValueError("input_data must be valid JSON or a Python-literal-ish value")
+        results = api.search(folder, query, limit=limit, index_path=index_path)
+    except SupypowersError as e:
+        _exit_with(e)
+    print(json.dumps({"ok": True, "results": results}))
 
-def _load_module_from_path(path):
-    spec = importlib.util.spec_from_file_location("__supypowers_target__", path)
-    mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    return mod
 
-def _is_pydantic_model(cls):
+def _cmd_schema(
+    folder: Path,
+    target: str,
+    secrets: list[str],
+    *,
+    require_marker: bool = False,
+    use_cache: bool = True,
+    static: bool = False,
+    index_path: Path | None = None,
+) -> None:
     try:
-        from pydantic import BaseModel
-        return isinstance(cls, type) and issubclass(cls, BaseModel)
-    except Exception:
-        return False
+        result = api.schema(
+            folder,
+            target,
+            require_marker=require_marker,
+            secrets=secrets or [],
+            use_cache=use_cache,
+            static=static,
+            index_path=index_path,
+        )
+    except InspectionError as e:
+        print(json.dumps(e.to_dict()))
+        raise SystemExit(1)
+    except SupypowersError as e:
+        _exit_with(e)
+    print(json.dumps({"ok": True, **result}))
 
-def _resolved_type_hints(fn, mod):
+
+def _cmd_pipeline(
+    spec: Path,
+    folder: Path | None,
+    pipeline_input: str | None,
+    secrets: list[str],
+    jobs: int | None = None,
+) -> None:
+    try:
+        parsed_input = json.loads(pipeline_input) if pipeline_input is not None else None
+    except ValueError:
+        parsed_input = None
+    if pipeline_input is not None and not isinstance(parsed_input, dict):
+        print(json.dumps({"ok": False, "error": "--input must be a JSON object"}))
+        raise SystemExit(2)
     try:
-        return typing.get_type_hints(fn, globalns=vars(mod), localns=vars(mod))
-    except Exception:
-        return {}
+        result = api.pipeline(
+            folder if folder is not None else spec.parent,
+            spec,
+            input=parsed_input,
+            secrets=secrets or [],
+            jobs=jobs,
+        )
+    except SupypowersError as e:
+        _exit_with(e)
+    print(json.dumps(result, ensure_ascii=False))
+    raise SystemExit(0 if result["ok"] else 1)
+
+
+def _cmd_cache(action: str) -> None:
+    caches = {"docs": docs_cache(), "results": results_cache()}
+    if action == "clear":
+        for cache in caches.values():
+            cache.clear()
+        print(json.dumps({"ok": True, "cleared": [str(cache.root) for cache in caches.values()]}))
+        return
+    print(json.dumps({"ok": True, **{name: cache.stats() for name, cache in caches.items()}}))
 
-def _model_to_jsonable(obj):
-    # Pydantic v2: model_dump(); v1: dict()
-    if hasattr(obj, "model_dump"):
-        try:
-            return obj.model_dump(mode="json")
-        except Exception:
-            return obj.model_dump()
-    if hasattr(obj, "dict"):
-        return obj.dict()
-    return obj
-
-def main():
-    payload = json.loads(sys.stdin.read())
-    script_path = payload["script_path"]
-    fn_name = payload["function_name"]
-    input_data = payload["input_data"]
-
-    mod = _load_module_from_path(script_path)
-    fn = getattr(mod, fn_name, None)
-    if fn is None or not callable(fn):
-        print(json.dumps({"ok": False, "error": f"function not found: {fn_name}"}))
-        return 2
-
-    sig = inspect.signature(fn)
-    params = list(sig.parameters.values())
-    if len(params) != 1:
-        print(json.dumps({"ok": False, "error": "function must accept exactly one parameter named `input`"}))
-        return 2
-
-    param = params[0]
-    if param.name != "input":
-        print(json.dumps({"ok": False, "error": "function parameter must be named `input`"}))
-        return 2
-
-    hints = _resolved_type_hints(fn, mod)
-    ann = hints.get(param.name, param.annotation)
-    raw = _parse_input(input_data)
 
-    try:
-        if not _is_pydantic_model(ann):
-            print(json.dumps({"ok": False, "error": "input must be a Pydantic BaseModel type annotation"}))
-            return 2
-        if not isinstance(raw, dict):
-            print(json.dumps({"ok": False, "error": "input_data must be an object mapping for the input model"}))
-            return 2
-        inp = ann.model_validate(raw) if hasattr(ann, "model_validate") else ann.parse_obj(raw)
-        result = fn(inp)
-        out = _model_to_jsonable(result)
+def _cmd_env(action: str, *, max_bytes: int | None = None) -> None:
+    pool = default_env_pool()
+    if action == "prune":
+        removed = pool.prune(max_bytes)
+        print(json.dumps({"ok": True, "removed": removed}))
+        return
+    print(json.dumps({"ok": True, "environments": pool.list()}))
+
+
+def _cmd_warm(folder: Path, recursive: bool, jobs: int | None) -> None:
+    if not folder.exists() or not folder.is_dir():
+        print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
+        raise SystemExit(2)
+
+    dep_sets: dict[tuple[str, ...], list[str]] = {}
+    for script_path in discover_scripts(folder, recursive):
+        deps = tuple(normalize_dependencies(read_uv_script_dependencies(script_path)))
+        dep_sets.setdefault(deps, []).append(str(script_path))
+
+    pool = default_env_pool()
+
+    def build(deps: tuple[str, ...]) -> dict:
         try:
-            json.dumps(out)
-        except Exception:
-            out = str(out)
-        print(json.dumps({"ok": True, "data": out}, ensure_ascii=False))
-        return 0
-    except Exception as e:
-        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
-        return 1
+            python = pool.ensure(deps)
+            return {"dependencies": list(deps), "python": str(python), "scripts": dep_sets[deps]}
+        except Exception as e:
+            return {"dependencies": list(deps), "error": str(e), "scripts": dep_sets[deps]}
 
-if __name__ == "__main__":
-    sys.exit(main())
-"""
+    with ThreadPoolExecutor(max_workers=max(1, jobs or default_jobs())) as executor:
+        envs = list(executor.map(build, dep_sets))
 
+    ok = all("error" not in e for e in envs)
+    print(json.dumps({"ok": ok, "environments": envs}))
+    raise SystemExit(0 if ok else 1)
 
-_DOCS_CODE = r"""
-import ast
-import importlib.util
-import inspect
-import json
-import sys
-import typing
 
-def _load_module_from_path(path):
-    spec = importlib.util.spec_from_file_location("__supypowers_target__", path)
-    mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    return mod
+def _cmd_sync(folder: Path, recursive: bool, jobs: int | None) -> None:
+    if not folder.exists() or not folder.is_dir():
+        print(json.dumps({"ok": False, "error": f"folder not found: {folder}"}))
+        raise SystemExit(2)
 
-def _is_pydantic_model(cls):
-    try:
-        from pydantic import BaseModel
-        return isinstance(cls, type) and issubclass(cls, BaseModel)
-    except Exception:
-        return False
+    dep_sets: dict[tuple[str, ...], list[str]] = {}
+    for script_path in discover_scripts(folder, recursive):
+        deps = tuple(normalize_dependencies(read_uv_script_dependencies(script_path)))
+        dep_sets.setdefault(deps, []).append(str(script_path))
+    requirements = sorted({dep for deps in dep_sets for dep in deps})
 
-def _resolved_type_hints(fn, mod):
-    try:
-        return typing.get_type_hints(fn, globalns=vars(mod), localns=vars(mod))
-    except Exception:
-        return {}
+    pool = default_env_pool()
 
-def _schema_for_model(model_cls):
-    try:
-        return model_cls.model_json_schema()
-    except Exception:
+    def fetch(deps: tuple[str, ...]) -> dict:
+        # Each set is resolved the way its scripts will be run, so the cache holds exactly
+        # the wheels they need; building the pooled environment offline afterwards proves it.
         try:
-            return model_cls.schema()
-        except Exception:
-            return None
+            prefetch(deps)
+            python = pool.ensure(deps, offline=True)
+            return {"dependencies": list(deps), "python": str(python), "scripts": dep_sets[deps]}
+        except subprocess.CalledProcessError as e:
+            detail = (e.stderr or b"").decode("utf-8", errors="replace").strip()
+            return {"dependencies": list(deps), "error": detail or str(e), "scripts": dep_sets[deps]}
+        except Exception as e:
+            return {"dependencies": list(deps), "error": str(e), "scripts": dep_sets[deps]}
 
-def _has_superpower_decorator(script_path, fn_name):
-    try:
-        src = open(script_path, "r", encoding="utf-8").read()
-        tree = ast.parse(src)
-        for node in tree.body:
-            if isinstance(node, ast.FunctionDef) and node.name == fn_name:
-                for dec in node.decorator_list:
-                    if isinstance(dec, ast.Name) and dec.id == "superpower":
-                        return True
-                    if isinstance(dec, ast.Attribute) and dec.attr == "superpower":
-                        return True
-        return False
-    except Exception:
-        return False
-
-def main():
-    payload = json.loads(sys.stdin.read())
-    script_path = payload["script_path"]
-    require_marker = bool(payload.get("require_marker"))
-
-    mod = _load_module_from_path(script_path)
-
-    fns = []
-    for name, obj in sorted(vars(mod).items()):
-        if name.startswith("_"):
-            continue
-        if not callable(obj):
-            continue
-        try:
-            sig = inspect.signature(obj)
-        except Exception:
-            continue
-        params = list(sig.parameters.values())
-        if len(params) != 1:
-            continue
-        if params[0].name != "input":
-            continue
-        hints = _resolved_type_hints(obj, mod)
-        ann_in = hints.get(params[0].name, params[0].annotation)
-        if require_marker and not _has_superpower_decorator(script_path, name):
-            continue
-        if not _is_pydantic_model(ann_in):
-            continue
+    with ThreadPoolExecutor(max_workers=max(1, jobs or default_jobs())) as executor:
+        envs = list(executor.map(fetch, dep_sets))
 
-        ann_out = hints.get("return", sig.return_annotation)
-        fns.append({
-            "name": name,
-            "description": inspect.getdoc(obj) or "",
-            "input_schema": _schema_for_model(ann_in) if _is_pydantic_model(ann_in) else None,
-            "output_schema": _schema_for_model(ann_out) if _is_pydantic_model(ann_out) else None,
-        })
+    ok = all("error" not in e for e in envs)
+    print(
+        json.dumps(
+            {"ok": ok, "cache": str(wheel_cache_dir()), "requirements": requirements, "environments": envs}
+        )
+    )
+    raise SystemExit(0 if ok else 1)
 
-    print(json.dumps({"script": script_path, "functions": fns}, ensure_ascii=False))
-    return 0
 
-if __name__ == "__main__":
-    sys.exit(main())
-"""
+def _markdown_entry(item: dict) -> str:
+    lines: list[str] = []
+    script = item.get("script", "")
+    err = item.get("error")
+    lines.append(f"### `{script}`\n")
+    if err:
+        lines.append(f"**Error:** `{err}`\n")
+        return "\n".join(lines)
+    fns = item.get("functions") or []
+    if not fns:
+        lines.append("_No supypowers found._\n")
+        return "\n".join(lines)
+    for fn in fns:
+        name = fn.get("name", "")
+        desc = (fn.get("description") or "").strip()
+        lines.append(f"#### `{name}`\n")
+        if desc:
+            lines.append(desc + "\n")
+        in_schema = fn.get("input_schema")
+        out_schema = fn.get("output_schema")
+        lines.append("**Input schema**\n")
+        lines.append("```json")
+        lines.append(json.dumps(in_schema, ensure_ascii=False, indent=2))
+        lines.append("```\n")
+        lines.append("**Output schema**\n")
+        lines.append("```json")
+        lines.append(json.dumps(out_schema, ensure_ascii=False, indent=2))
+        lines.append("```\n")
+    return "\n".join(lines)
+
+
+def _render_entry(item: dict, out_format: str) -> str:
+    return json.dumps(item, ensure_ascii=False) if out_format == "json" else _markdown_entry(item)
+
+
+def _render_docs(fragments: list[str], out_format: str) -> str:
+    # Assembles entries rendered by `_render_entry` exactly as rendering the whole list would.
+    if out_format == "json":
+        return "[" + ", ".join(fragments) + "]"
+    return "\n".join(["## Supypowers\n", *fragments]).rstrip() + "\n"
 
 
 _HELLO_PY = """# /// script
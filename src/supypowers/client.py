@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Iterable, List, Optional
+
+from supypowers.api import FolderNotFoundError, RunResult, resolve_target, run_payload
+from supypowers.docs import DocsPlan, default_jobs, discover_scripts, docs_cache, parse_group_output
+from supypowers.memo import memo_for
+from supypowers.runner import DOCS_CODE, RUNNER_CODE, is_stream_output, run_output
+from supypowers.scheduler import Scheduler, function_limit
+from supypowers.uv_exec import UVRunError, uv_run_python_code_async
+from supypowers.util import parse_secrets_args
+
+
+class AsyncClient:
+    """
+    Run and document superpowers from asyncio code.
+
+    Every call starts its child processes with asyncio subprocesses, and at most
+    `max_concurrency` children (default: CPU count) run at once across all calls made
+    through the client, with per-function limits from `@superpower(max_concurrency=N)`.
+    The rest wait in the client's `Scheduler` queue (higher `priority` first) without
+    occupying a thread; with `max_queue`, calls beyond that many waiting ones raise
+    `QueueFullError`.
+
+        client = AsyncClient(max_concurrency=8)
+        result = await client.run("examples", "exponents:compute_sqrt", {"x": 9})
+        docs = await client.docs("examples")
+
+    `secrets` are the same `.env` paths or inline `KEY=VAL` values the CLI accepts and are
+    passed to every child.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        *,
+        secrets: Iterable[str] = (),
+        max_queue: Optional[int] = None,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency or default_jobs())
+        self.extra_env = parse_secrets_args(secrets)
+        self.scheduler = Scheduler(self.max_concurrency, max_queue=max_queue)
+
+    async def _run_code(self, script_path: Path, code: str, payload: dict, **kwargs: Any) -> str:
+        async with self.scheduler.slot_async():
+            return await uv_run_python_code_async(
+                script_path=script_path,
+                code=code,
+                payload=payload,
+                extra_env=self.extra_env,
+                **kwargs,
+            )
+
+    async def run(
+        self,
+        folder: str | Path,
+        target: str,
+        input_data: Any,
+        *,
+        use_cache: bool = True,
+        priority: int = 0,
+        queue_timeout: Optional[float] = None,
+    ) -> RunResult:
+        """
+        Call `script:function` in `folder`; see `supypowers.run`.
+
+        `input_data` may be a JSON string or any JSON-serializable value. The result's
+        `queue_ms` is how long the call waited for a slot.
+        """
+        script_path, func_name = resolve_target(folder, target)
+        payload = run_payload(script_path, func_name, input_data)
+        memo = None
+        if use_cache:
+            memo = await asyncio.to_thread(memo_for, script_path, func_name, input_data, extra_env=self.extra_env)
+        cached = await asyncio.to_thread(memo.get) if memo is not None else None
+        if cached is not None:
+            return RunResult(cached, 0)
+
+        limit = await asyncio.to_thread(function_limit, script_path, func_name)
+        slot = self.scheduler.slot_async(
+            (str(script_path), func_name), limit, priority=priority, timeout=queue_timeout
+        )
+        async with slot as queue_ms:
+            try:
+                out: str | UVRunError = await uv_run_python_code_async(
+                    script_path=script_path,
+                    code=RUNNER_CODE,
+                    payload=payload,
+                    extra_env=self.extra_env,
+                )
+            except UVRunError as e:
+                out = e
+        result = RunResult(*run_output(out), queue_ms=round(queue_ms, 3))
+        if memo is not None and not is_stream_output(out):
+            await asyncio.to_thread(memo.put, result.response)
+        return result
+
+    async def _inspect_script(
+        self, script_path: Path, require_marker: bool, deps: Optional[List[str]] = None
+    ) -> dict:
+        payload = {"script_path": str(script_path), "require_marker": require_marker}
+        try:
+            return json.loads(await self._run_code(script_path, DOCS_CODE, payload, deps=deps))
+        except Exception as e:
+            return {"script": str(script_path), "error": str(e), "functions": []}
+
+    async def _inspect_group(self, deps: List[str], scripts: List[Path], require_marker: bool) -> List[dict]:
+        if len(scripts) > 1:
+            payload = {"script_paths": [str(p) for p in scripts], "require_marker": require_marker}
+            try:
+                out = await self._run_code(scripts[0], DOCS_CODE, payload, deps=deps)
+                entries = parse_group_output(out, scripts)
+                if entries is not None:
+                    return entries
+            except Exception:
+                pass
+        return list(await asyncio.gather(*(self._inspect_script(p, require_marker, deps) for p in scripts)))
+
+    async def docs(
+        self,
+        folder: str | Path,
+        *,
+        recursive: bool = False,
+        require_marker: bool = False,
+        use_cache: bool = True,
+        static: bool = False,
+        jobs: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Return the entries `supypowers docs` prints for `folder`, inspecting every
+        dependency group concurrently (subject to the client's concurrency limit). As with
+        `supypowers.docs`, each group gets one interpreter unless `jobs` asks for groups to
+        be split into up to `jobs` pieces.
+        """
+        folder = Path(folder)
+        if not folder.is_dir():
+            raise FolderNotFoundError(folder)
+
+        # Cache lookups and static extraction touch the disk; keep them off the event loop.
+        plan = await asyncio.to_thread(
+            DocsPlan,
+            discover_scripts(folder, recursive),
+            require_marker=require_marker,
+            cache=docs_cache() if use_cache else None,
+            static=static,
+            chunks=jobs or 1,
+        )
+        fresh = await asyncio.gather(
+            *(self._inspect_group(deps, scripts, require_marker) for deps, scripts in plan.groups)
+        )
+        return await asyncio.to_thread(plan.finish, list(fresh))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from supypowers.api import RunError, RunResult, encode_input
+from supypowers.errors import InvalidTargetError, SupypowersError, WorkersUnavailableError
+from supypowers.runner import STREAM_HEADER, collect_stream
+from supypowers.worker import parse_address
+
+# Client side of `supypowers worker`: routes run and docs requests to a set of workers.
+#
+# Workers are ranked per request by rendezvous hashing on the dependency set of the
+# target's script (learned from the workers' health reports), so every call for one
+# environment goes to the same worker while it is healthy, and its warm interpreter is
+# reused. When a worker cannot be reached the request moves on to the next worker in the
+# ranking, and the failed worker is skipped until a health check finds it up again.
+
+
+class Dispatcher:
+    """
+    Send `run` and `docs` requests to the workers at `workers` (`host:port` addresses).
+
+    Health checks run every `health_interval` seconds in a background thread (and once
+    when the dispatcher is created). A request that fails to reach a worker is retried on
+    up to `retries` other workers; since a worker may have died after starting the call,
+    a retried call can run twice. `token` (default: `$SUPYPOWERS_WORKER_TOKEN`) is sent
+    with every request, for workers started with that variable set.
+    """
+
+    def __init__(
+        self,
+        workers: Sequence[str],
+        *,
+        health_interval: float = 5.0,
+        timeout: Optional[float] = 300.0,
+        connect_timeout: float = 2.0,
+        retries: int = 2,
+        token: Optional[str] = None,
+    ) -> None:
+        if not workers:
+            raise ValueError("a dispatcher needs at least one worker")
+        for address in workers:
+            parse_address(address)
+        self.workers = list(dict.fromkeys(workers))
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = max(0, retries)
+        self.token = token if token is not None else os.environ.get("SUPYPOWERS_WORKER_TOKEN") or None
+        self._lock = threading.Lock()
+        self._healthy: Dict[str, bool] = {w: True for w in self.workers}
+        self._reports: Dict[str, dict] = {}
+        self._closed = threading.Event()
+        self.check_health()
+        self._thread: Optional[threading.Thread] = None
+        if health_interval > 0:
+            self._thread = threading.Thread(target=self._health_loop, args=(health_interval,), daemon=True)
+            self._thread.start()
+
+    def _request(self, address: str, req: dict, timeout: Optional[float]) -> dict:
+        if self.token is not None:
+            req = {**req, "token": self.token}
+        with socket.create_connection(parse_address(address), timeout=self.connect_timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(req) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+                if line.decode("utf-8").rstrip("\n") == STREAM_HEADER:
+                    # A generator's frames, up to the closing (or error) frame.
+                    frames = []
+                    for raw in reader:
+                        frame = json.loads(raw)
+                        frames.append(raw.decode("utf-8"))
+                        if frame.get("done") or not frame.get("ok"):
+                            break
+                    return collect_stream(frames)
+        if not line:
+            raise ConnectionError(f"worker {address} closed the connection without answering")
+        return json.loads(line)
+
+    def _check(self, address: str) -> None:
+        try:
+            report = self._request(address, {"op": "health"}, self.connect_timeout)
+            healthy = bool(report.get("ok"))
+        except (OSError, ValueError):
+            report, healthy = {}, False
+        with self._lock:
+            self._healthy[address] = healthy
+            if healthy:
+                self._reports[address] = report
+
+    def check_health(self) -> Dict[str, bool]:
+        """
+        Check every worker now; returns whether each one is up.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as pool:
+            list(pool.map(self._check, self.workers))
+        with self._lock:
+            return dict(self._healthy)
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.check_health()
+
+    def affinity_key(self, target: str) -> str:
+        """
+        What requests for `target` are routed by: its script's dependency-set hash as
+        reported by the workers, else the script name.
+        """
+        script = target.partition(":")[0]
+        script = script[:-3] if script.endswith(".py") else script
+        with self._lock:
+            for report in self._reports.values():
+                deps = report.get("scripts", {}).get(script)
+                if deps is not None:
+                    return f"deps:{deps}"
+        return f"script:{script}"
+
+    def ranking(self, key: str) -> List[str]:
+        """
+        Workers in the order a request with affinity `key` tries them: healthy ones first,
+        each group by rendezvous hash.
+        """
+
+        def weight(address: str) -> bytes:
+            return hashlib.sha256(f"{key}|{address}".encode("utf-8")).digest()
+
+        with self._lock:
+            healthy = dict(self._healthy)
+        ordered = sorted(self.workers, key=weight, reverse=True)
+        return [w for w in ordered if healthy[w]] + [w for w in ordered if not healthy[w]]
+
+    def _dispatch(self, key: str, req: dict) -> dict:
+        tried = []
+        for address in self.ranking(key)[: self.retries + 1]:
+            tried.append(address)
+            try:
+                return self._request(address, req, self.timeout)
+            except (OSError, ValueError):
+                with self._lock:
+                    self._healthy[address] = False
+        raise WorkersUnavailableError(tried)
+
+    def run(self, target: str, input_data: Any = None, *, check: bool = False) -> RunResult:
+        """
+        Run `target` (`script:function`) on a worker, like `supypowers.run`.
+        """
+        script_name, _, func_name = target.partition(":")
+        if not script_name or not func_name:
+            raise InvalidTargetError(target)
+        req = {"op": "run", "target": target, "input_data": encode_input({} if input_data is None else input_data)}
+        response = self._dispatch(self.affinity_key(target), req)
+        result = RunResult(response, 0 if response.get("ok") else int(response.get("exit_code") or 1))
+        if check and not result.ok:
+            raise RunError(result)
+        return result
+
+    def docs(self, *, recursive: bool = False, require_marker: bool = False, static: bool = False) -> List[dict]:
+        """
+        The docs entries of the workers' folder, like `supypowers.docs`.
+        """
+        req = {"op": "docs", "recursive": recursive, "require_marker": require_marker, "static": static}
+        response = self._dispatch("docs", req)
+        if not response.get("ok"):
+            raise SupypowersError(response.get("error") or "docs request failed")
+        return response["docs"]
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "Dispatcher":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
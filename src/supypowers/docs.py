@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from supypowers import __version__
+from supypowers.cache import DiskCache, default_cache_dir, hash_key
+from supypowers.runner import DOCS_CODE
+from supypowers.shared_env import SharedEnv
+from supypowers.static_docs import inspect_script_static
+from supypowers.uv_exec import uv_run_python_code
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+
+DOCS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def docs_cache(root: Optional[Path] = None, max_bytes: int = DOCS_CACHE_MAX_BYTES) -> DiskCache:
+    """
+    The persistent cache of per-script docs entries (default: `<cache dir>/docs`).
+    """
+    return DiskCache(root or default_cache_dir() / "docs", max_bytes)
+
+
+def docs_cache_key(script_path: Path, require_marker: bool, deps: Optional[List[str]] = None) -> str:
+    """
+    Key a script's docs on everything that can change them: its content, the dependency
+    set it is inspected with (`deps`, default: its own normalized dependencies), the
+    marker filter and the supypowers version.
+    """
+    if deps is None:
+        deps = normalize_dependencies(read_uv_script_dependencies(script_path))
+    return hash_key(
+        {
+            "sha256": hashlib.sha256(script_path.read_bytes()).hexdigest(),
+            "dependencies": list(deps),
+            "require_marker": require_marker,
+            "version": __version__,
+        }
+    )
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def discover_scripts(folder: Path, recursive: bool) -> List[Path]:
+    """
+    The `*.py` files documented for `folder`, sorted by path.
+    """
+    pattern = folder.rglob("*.py") if recursive else folder.glob("*.py")
+    return sorted(p for p in pattern if p.is_file())
+
+
+def inspect_script(
+    script_path: Path,
+    *,
+    require_marker: bool,
+    extra_env: Optional[Dict[str, str]] = None,
+    deps: Optional[List[str]] = None,
+) -> dict:
+    """
+    Run the docs inspector for one script in its uv environment (or the one for `deps`).
+
+    Failures are reported in the returned entry rather than raised.
+    """
+    payload = {"script_path": str(script_path), "require_marker": require_marker}
+    try:
+        out = uv_run_python_code(
+            script_path=script_path,
+            code=DOCS_CODE,
+            payload=payload,
+            extra_env=extra_env,
+            deps=deps,
+        )
+        return json.loads(out)
+    except Exception as e:
+        return {"script": str(script_path), "error": str(e), "functions": []}
+
+
+def parse_group_output(out: str, scripts: List[Path]) -> Optional[List[dict]]:
+    """
+    The per-script entries printed by a grouped inspector run, or None if the output
+    does not cover exactly `scripts`.
+    """
+    try:
+        entries = json.loads(out)
+    except Exception:
+        return None
+    if isinstance(entries, list) and len(entries) == len(scripts):
+        return entries
+    return None
+
+
+def inspect_script_group(
+    scripts: List[Path],
+    deps: List[str],
+    *,
+    require_marker: bool,
+    extra_env: Optional[Dict[str, str]] = None,
+) -> List[dict]:
+    """
+    Inspect scripts that share the dependency set `deps` inside a single interpreter.
+
+    A script that fails to import gets its own error entry. If the shared process dies
+    altogether, each script is retried in its own environment.
+    """
+    if len(scripts) == 1:
+        return [inspect_script(scripts[0], require_marker=require_marker, extra_env=extra_env, deps=deps)]
+
+    payload = {"script_paths": [str(p) for p in scripts], "require_marker": require_marker}
+    try:
+        out = uv_run_python_code(
+            script_path=scripts[0],
+            code=DOCS_CODE,
+            payload=payload,
+            extra_env=extra_env,
+            deps=deps,
+        )
+        entries = parse_group_output(out, scripts)
+        if entries is not None:
+            return entries
+    except Exception:
+        pass
+    return [inspect_script(p, require_marker=require_marker, extra_env=extra_env, deps=deps) for p in scripts]
+
+
+class DocsPlan:
+    """
+    The work `inspect_scripts` has to do for a list of scripts: entries already answered
+    statically or from the cache, and the remaining scripts grouped by dependency set
+    (with `shared`, the set each script runs with in that shared environment). While there
+    are fewer than `chunks` groups, the largest is split in two, so a folder whose scripts
+    share one environment is still inspected by several interpreters.
+
+    Shared by the blocking and asyncio front ends, which only differ in how they run
+    the groups.
+    """
+
+    def __init__(
+        self,
+        scripts: List[Path],
+        *,
+        require_marker: bool,
+        cache: Optional[DiskCache] = None,
+        static: bool = False,
+        shared: Optional[SharedEnv] = None,
+        chunks: int = 1,
+    ) -> None:
+        self.scripts = scripts
+        self.cache = cache
+        self.results: List[Optional[dict]] = [None] * len(scripts)
+        if static:
+            for i, script_path in enumerate(scripts):
+                self.results[i] = inspect_script_static(script_path, require_marker=require_marker)
+
+        def deps_for(script_path: Path) -> List[str]:
+            if shared is not None:
+                return shared.dependencies_for(script_path)
+            return normalize_dependencies(read_uv_script_dependencies(script_path))
+
+        # Under a shared environment a script is inspected with (and its docs keyed on)
+        # the merged set, so entries cached for its own environment are not reused.
+        deps_of: Dict[int, List[str]] = {}
+        self.keys: Dict[int, str] = {}
+        if cache is not None:
+            for i, script_path in enumerate(scripts):
+                if self.results[i] is not None:
+                    continue
+                try:
+                    deps_of[i] = deps_for(script_path)
+                    self.keys[i] = docs_cache_key(script_path, require_marker, deps_of[i])
+                except OSError:
+                    continue
+                cached = cache.get(self.keys[i])
+                if cached is not None:
+                    self.results[i] = {"script": str(script_path), **cached}
+
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for i, entry in enumerate(self.results):
+            if entry is None:
+                deps = deps_of[i] if i in deps_of else deps_for(scripts[i])
+                groups.setdefault(tuple(deps), []).append(i)
+        pieces = [(deps, indices) for deps, indices in groups.items()]
+        while len(pieces) < chunks:
+            largest = max(range(len(pieces)), key=lambda n: len(pieces[n][1]), default=None)
+            if largest is None or len(pieces[largest][1]) < 2:
+                break
+            deps, indices = pieces[largest]
+            half = len(indices) // 2
+            pieces[largest : largest + 1] = [(deps, indices[:half]), (deps, indices[half:])]
+        self.groups: List[Tuple[List[str], List[Path]]] = [
+            (list(deps), [scripts[i] for i in indices]) for deps, indices in pieces
+        ]
+        self._indices = [indices for _, indices in pieces]
+
+    def finish(self, fresh: List[List[dict]]) -> List[dict]:
+        """
+        Merge the entries inspected for each of `groups` (in order), store them in the
+        cache and return all entries in script order.
+        """
+        for indices, entries in zip(self._indices, fresh):
+            for i, entry in zip(indices, entries):
+                self.results[i] = entry
+                if self.cache is not None and i in self.keys and "error" not in entry:
+                    self.cache.put(self.keys[i], {"functions": entry.get("functions", [])})
+
+        if self.cache is not None:
+            self.cache.evict()
+            self.cache.flush_stats()
+        return [entry for entry in self.results if entry is not None]
+
+
+def inspect_scripts(
+    scripts: List[Path],
+    *,
+    require_marker: bool,
+    extra_env: Optional[Dict[str, str]] = None,
+    jobs: Optional[int] = None,
+    cache: Optional[DiskCache] = None,
+    static: bool = False,
+    shared: Optional[SharedEnv] = None,
+) -> List[dict]:
+    """
+    Inspect `scripts` with at most `jobs` concurrent `uv run` processes (default: CPU count).
+
+    Scripts are grouped by their normalized dependency list and each group is inspected in
+    one interpreter, so a folder whose scripts all share a dependency set starts a single
+    process. Only with an explicit `jobs` are groups split (see `DocsPlan`) so that up to
+    `jobs` interpreters work.
+
+    With a `cache`, unchanged scripts are answered from it without starting a process, and
+    successful inspections are stored. With `static`, scripts are first read without being
+    executed (see `static_docs`) and only those the static extractor cannot resolve reach the
+    cache or an interpreter. With `shared`, scripts are grouped by the dependency set they
+    run with in that shared environment. Entries are returned in the same order as `scripts`.
+    """
+    # Splitting a group trades cold starts for parallelism; only do it when asked to.
+    chunks = jobs or 1
+    jobs = max(1, jobs or default_jobs())
+    plan = DocsPlan(scripts, require_marker=require_marker, cache=cache, static=static, shared=shared, chunks=chunks)
+
+    def inspect(group: Tuple[List[str], List[Path]]) -> List[dict]:
+        deps, group_scripts = group
+        return inspect_script_group(
+            group_scripts,
+            deps,
+            require_marker=require_marker,
+            extra_env=extra_env,
+        )
+
+    if jobs == 1 or len(plan.groups) <= 1:
+        fresh = [inspect(group) for group in plan.groups]
+    else:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(plan.groups))) as pool:
+            fresh = list(pool.map(inspect, plan.groups))
+
+    return plan.finish(fresh)
@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from supypowers.cache import acquire_file_lock, default_cache_dir, file_lock, hash_key, release_file_lock
+from supypowers.requirements import installed_satisfies
+from supypowers.uv_script_metadata import normalize_dependencies
+
+ENV_POOL_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Automatic pruning leaves environments used this recently alone.
+ENV_POOL_GRACE_SECONDS = 10 * 60
+# Environments are rebuilt (and unpinned dependencies re-resolved) after this long.
+ENV_POOL_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+_METADATA = "supypowers-env.json"
+_LOCK = "supypowers-env.lock"
+
+
+def env_pool_enabled() -> bool:
+    """
+    The pool is used unless `SUPYPOWERS_ENV_POOL` is set to `0`, `false` or `no`.
+    """
+    return os.environ.get("SUPYPOWERS_ENV_POOL", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def env_max_age() -> int:
+    """
+    Seconds a pooled environment is used before it is rebuilt, from `SUPYPOWERS_ENV_MAX_AGE`
+    (default: `ENV_POOL_MAX_AGE_SECONDS`; `0` keeps environments until they are pruned).
+    """
+    try:
+        return max(0, int(os.environ.get("SUPYPOWERS_ENV_MAX_AGE", ENV_POOL_MAX_AGE_SECONDS)))
+    except ValueError:
+        return ENV_POOL_MAX_AGE_SECONDS
+
+
+def offline_enabled() -> bool:
+    """
+    Offline mode is on when `SUPYPOWERS_OFFLINE` is set to `1`, `true` or `yes`.
+    """
+    return os.environ.get("SUPYPOWERS_OFFLINE", "").strip().lower() in {"1", "true", "yes"}
+
+
+INTERPRETER_MODES = ("auto", "current", "uv")
+
+
+def interpreter_mode() -> str:
+    """
+    How interpreters are picked, from `SUPYPOWERS_INTERPRETER`: `uv` (the default) always
+    runs a script in an environment of its own, `auto` runs it with this interpreter when
+    that already satisfies the script's dependencies, and `current` always does.
+    """
+    mode = os.environ.get("SUPYPOWERS_INTERPRETER", "uv").strip().lower()
+    return mode if mode in INTERPRETER_MODES else "uv"
+
+
+_SATISFIED: Dict[Tuple[str, ...], bool] = {}
+
+
+def current_interpreter_satisfies(deps: Sequence[str]) -> bool:
+    """
+    Whether `sys.executable` already has everything in `deps` installed (see
+    `requirements.installed_satisfies`). Answers are kept for the life of the process.
+    """
+    key = tuple(normalize_dependencies(list(deps)))
+    satisfied = _SATISFIED.get(key)
+    if satisfied is None:
+        try:
+            satisfied = installed_satisfies(key)
+        except Exception:
+            satisfied = False
+        _SATISFIED[key] = satisfied
+    return satisfied
+
+
+def wheel_cache_dir() -> Path:
+    """
+    The uv cache `supypowers sync` fills and offline mode installs from.
+    """
+    return default_cache_dir() / "wheels"
+
+
+def uv_environ(extra_env: Optional[Dict[str, str]] = None, *, offline: Optional[bool] = None) -> Dict[str, str]:
+    """
+    The environment for `uv` (and the interpreters it starts): this process's environment
+    plus `extra_env`. In offline mode (default: `offline_enabled()`), uv is pointed at the
+    wheel cache and may not use the network.
+    """
+    env = os.environ.copy()
+    if extra_env:
+        env.update(extra_env)
+    if offline_enabled() if offline is None else offline:
+        env["UV_OFFLINE"] = "1"
+        env["UV_CACHE_DIR"] = str(wheel_cache_dir())
+    return env
+
+
+def _env_python(env_dir: Path) -> Path:
+    if sys.platform == "win32":
+        return env_dir / "Scripts" / "python.exe"
+    return env_dir / "bin" / "python"
+
+
+def prefetch(deps: Sequence[str], *, quiet: bool = True) -> None:
+    """
+    Download (and build, for sdists) every wheel `deps` resolve to into the wheel cache,
+    by installing them into a throwaway environment.
+
+    Raises `subprocess.CalledProcessError` if `uv` cannot install them.
+    """
+    env = uv_environ(offline=False)
+    env["UV_CACHE_DIR"] = str(wheel_cache_dir())
+    flags = ["-q"] if quiet else []
+    scratch = Path(tempfile.mkdtemp(prefix="supypowers-sync-"))
+    try:
+        subprocess.run(["uv", "venv", *flags, str(scratch)], check=True, capture_output=quiet, env=env)
+        if deps:
+            subprocess.run(
+                ["uv", "pip", "install", *flags, "--python", str(_env_python(scratch)), *deps],
+                check=True,
+                capture_output=quiet,
+                env=env,
+            )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class EnvPool:
+    """
+    Prebuilt virtual environments, one per normalized dependency list, whose interpreters
+    can be called directly instead of going through `uv run --with ...` resolution.
+
+    Each environment lives at `<root>/<key>/` with a `supypowers-env.json` metadata file
+    whose mtime records when the environment was last used and which holds its size, as
+    measured once it was built. A process that has used an environment holds a shared lock
+    on its `supypowers-env.lock` until it exits, and `prune` never deletes a locked one.
+
+    Keys include a generation that advances every `env_max_age()` seconds (at a different
+    moment for each dependency list), so an unpinned dependency list gets a freshly resolved
+    environment once a generation ends. The old one is left for `prune` to collect.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: int = ENV_POOL_MAX_BYTES) -> None:
+        self.root = root or default_cache_dir() / "envs"
+        self.max_bytes = max_bytes
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._held: Dict[str, int] = {}
+
+    @staticmethod
+    def key(deps: Sequence[str], *, now: Optional[float] = None) -> str:
+        data: Dict[str, object] = {"dependencies": normalize_dependencies(list(deps))}
+        max_age = env_max_age()
+        if max_age:
+            offset = int(hash_key(data)[:8], 16) % max_age
+            data["generation"] = int((time.time() if now is None else now) + offset) // max_age
+        return hash_key(data)[:32]
+
+    def python_for(self, deps: Sequence[str]) -> Optional[Path]:
+        """
+        The interpreter of an already built environment for `deps`, or None.
+        """
+        key = self.key(deps)
+        env_dir = self.root / key
+        meta = env_dir / _METADATA
+        python = _env_python(env_dir)
+        if not meta.exists() or not python.exists() or not self._hold(key):
+            return None
+        try:
+            os.utime(meta)
+        except OSError:
+            pass
+        return python
+
+    def _hold(self, key: str) -> bool:
+        # Take this process's shared lock on an environment, unless it already holds it.
+        # The lock may only be granted after a prune deleted the environment; check again.
+        with self._locks_guard:
+            if key in self._held:
+                return True
+            env_dir = self.root / key
+            try:
+                fd = acquire_file_lock(env_dir / _LOCK, shared=True)
+            except OSError:
+                return False
+            if fd is None or not (env_dir / _METADATA).exists():
+                if fd is not None:
+                    release_file_lock(fd)
+                return False
+            self._held[key] = fd
+            return True
+
+    def ensure(self, deps: Sequence[str], *, quiet: bool = True, offline: Optional[bool] = None) -> Path:
+        """
+        Return the interpreter for `deps`, building the environment first if needed (from
+        the wheel cache only, in offline mode; see `uv_environ`).
+
+        Raises `subprocess.CalledProcessError` if `uv` cannot build it.
+        """
+        python = self.python_for(deps)
+        if python is not None:
+            return python
+
+        key = self.key(deps)
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            python = self.python_for(deps)
+            if python is None:
+                python = self._build(key, normalize_dependencies(list(deps)), quiet=quiet, offline=offline)
+                self._hold(key)
+                self.prune(grace=ENV_POOL_GRACE_SECONDS)
+        return python
+
+    def _build(self, key: str, deps: List[str], *, quiet: bool, offline: Optional[bool]) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.root))
+        flags = ["-q"] if quiet else []
+        env = uv_environ(offline=offline)
+        try:
+            subprocess.run(["uv", "venv", *flags, str(tmp)], check=True, capture_output=quiet, env=env)
+            if deps:
+                subprocess.run(
+                    ["uv", "pip", "install", *flags, "--python", str(_env_python(tmp)), *deps],
+                    check=True,
+                    capture_output=quiet,
+                    env=env,
+                )
+            (tmp / _METADATA).write_text(
+                json.dumps({"key": key, "dependencies": deps, "created": time.time(), "bytes": _dir_size(tmp)}),
+                encoding="utf-8",
+            )
+            final = self.root / key
+            try:
+                os.rename(tmp, final)
+            except OSError:
+                # Another process finished building the same environment first.
+                if not (final / _METADATA).exists():
+                    raise
+                shutil.rmtree(tmp, ignore_errors=True)
+            return _env_python(final)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def list(self) -> List[dict]:
+        """
+        Metadata for every built environment, most recently used first.
+        """
+        envs = []
+        if not self.root.exists():
+            return envs
+        for env_dir in self.root.iterdir():
+            meta = env_dir / _METADATA
+            if env_dir.name.startswith(".") or not meta.exists():
+                continue
+            try:
+                info = json.loads(meta.read_text(encoding="utf-8"))
+                last_used = meta.stat().st_mtime
+            except Exception:
+                continue
+            size = info.get("bytes")
+            envs.append(
+                {
+                    "key": env_dir.name,
+                    "path": str(env_dir),
+                    "dependencies": info.get("dependencies", []),
+                    "bytes": size if isinstance(size, int) else _dir_size(env_dir),
+                    "created": info.get("created"),
+                    "last_used": last_used,
+                }
+            )
+        return sorted(envs, key=lambda e: e["last_used"], reverse=True)
+
+    def prune(self, max_bytes: Optional[int] = None, *, grace: float = 0) -> List[dict]:
+        """
+        Delete least-recently-used environments until the pool fits in `max_bytes`
+        (default: the pool's limit). Environments in use by a running process, or used
+        less than `grace` seconds ago, are kept. Returns the removed environments.
+
+        Runs after every build with a grace of `ENV_POOL_GRACE_SECONDS`; sizes come from
+        the metadata, so this only walks the pool directory itself.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        envs = self.list()
+        total = sum(e["bytes"] for e in envs)
+        removed = []
+        now = time.time()
+        for env in reversed(envs):
+            if total <= limit:
+                break
+            if now - env["last_used"] < grace:
+                continue
+            with file_lock(Path(env["path"]) / _LOCK, blocking=False) as unused:
+                if not unused:
+                    continue
+                shutil.rmtree(env["path"], ignore_errors=True)
+            total -= env["bytes"]
+            removed.append(env)
+        return removed
+
+
+_POOLS: Dict[Path, EnvPool] = {}
+_POOLS_GUARD = threading.Lock()
+
+
+def default_env_pool() -> EnvPool:
+    """
+    The process-wide pool for the current cache directory.
+    """
+    root = default_cache_dir() / "envs"
+    with _POOLS_GUARD:
+        pool = _POOLS.get(root)
+        if pool is None:
+            pool = _POOLS[root] = EnvPool(root)
+        return pool
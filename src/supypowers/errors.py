@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+# Errors raised by the library API (`RunError`, which carries a `RunResult`, is defined in
+# `supypowers.api`).
+
+
+class SupypowersError(Exception):
+    """
+    Base class of the errors raised by the library API.
+    """
+
+    # The status the CLI exits with after printing the error.
+    exit_status = 2
+
+    def to_dict(self) -> dict:
+        """
+        The JSON object the CLI prints for this error.
+        """
+        return {"ok": False, "error": str(self)}
+
+
+class UsageError(SupypowersError):
+    """
+    The request itself is invalid (the CLI exits with status 2).
+    """
+
+
+class FolderNotFoundError(UsageError, FileNotFoundError):
+    def __init__(self, folder: Path) -> None:
+        super().__init__(f"folder not found: {folder}")
+        self.folder = folder
+
+
+class ScriptNotFoundError(UsageError, FileNotFoundError):
+    def __init__(self, script_path: Path) -> None:
+        super().__init__(f"script not found: {script_path}")
+        self.script_path = script_path
+
+
+class InvalidTargetError(UsageError, ValueError):
+    def __init__(self, target: str) -> None:
+        super().__init__("target must be in the form script:function")
+        self.target = target
+
+
+class InputFileNotFoundError(UsageError, FileNotFoundError):
+    def __init__(self, input_file: Path) -> None:
+        super().__init__(f"input file not found: {input_file}")
+        self.input_file = input_file
+
+
+class FunctionNotFoundError(UsageError, LookupError):
+    def __init__(self, target: str) -> None:
+        super().__init__(f"function not found: {target}")
+        self.target = target
+
+
+class IndexNotFoundError(UsageError, FileNotFoundError):
+    def __init__(self, index_path: Path) -> None:
+        super().__init__(f"no function index at {index_path} (build it with `supypowers index`)")
+        self.index_path = index_path
+
+
+class InvalidPipelineError(UsageError, ValueError):
+    """
+    A pipeline spec is malformed (unknown step, bad reference, cycle, ...).
+    """
+
+
+class InspectionError(SupypowersError):
+    """
+    A script could not be inspected (it failed to import, or its environment failed to build).
+    """
+
+    def __init__(self, script_path: Path, error: str) -> None:
+        super().__init__(f"could not inspect {script_path}: {error}")
+        self.script_path = script_path
+
+
+class WorkersUnavailableError(SupypowersError):
+    def __init__(self, tried: List[str]) -> None:
+        super().__init__(f"no worker could be reached (tried: {', '.join(tried) or 'none'})")
+        self.tried = tried
+
+
+class BackpressureError(SupypowersError):
+    """
+    A call was turned away by the scheduler instead of being run (the CLI exits with
+    status 75, EX_TEMPFAIL: retrying later may succeed).
+    """
+
+    exit_status = 75
+
+
+class QueueFullError(BackpressureError):
+    def __init__(self, max_queue: int) -> None:
+        super().__init__(f"scheduler queue is full ({max_queue} calls waiting)")
+        self.max_queue = max_queue
+
+
+class QueueTimeoutError(BackpressureError):
+    def __init__(self, waited_ms: float) -> None:
+        super().__init__(f"timed out after waiting {waited_ms:.0f} ms in the scheduler queue")
+        self.waited_ms = waited_ms
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "queue_ms": round(self.waited_ms, 3)}
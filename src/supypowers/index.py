@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from supypowers.cache import default_cache_dir, hash_key
+from supypowers.watch import Snapshot, diff, snapshot
+
+# A persistent, searchable index of the functions in a folder.
+#
+# One SQLite file per folder holds every function's docs entry, a schema hash and its
+# search tokens, plus the (mtime, size) each script had when it was indexed, so refreshing
+# it re-inspects only scripts that changed. Lookups read the index only; scripts are never
+# opened or imported.
+
+INDEX_VERSION = 2
+
+# Token weights: where a query word was found.
+_NAME, _SCRIPT, _DESCRIPTION = 3, 2, 1
+_EXACT_NAME_BONUS = 100
+
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to with".split()
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS scripts (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, error TEXT
+);
+CREATE TABLE IF NOT EXISTS functions (
+    id INTEGER PRIMARY KEY,
+    script TEXT NOT NULL,
+    target TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    description TEXT NOT NULL,
+    schema_hash TEXT NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS functions_name ON functions (name_lower);
+CREATE INDEX IF NOT EXISTS functions_script ON functions (script);
+CREATE INDEX IF NOT EXISTS functions_target ON functions (target);
+CREATE TABLE IF NOT EXISTS tokens (token TEXT NOT NULL, function_id INTEGER NOT NULL, weight INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS tokens_token ON tokens (token);
+CREATE INDEX IF NOT EXISTS tokens_function ON tokens (function_id);
+"""
+
+
+def default_index_path(folder: Path) -> Path:
+    """
+    Where the index of `folder` is kept: `<cache dir>/index/<hash of its absolute path>.sqlite`.
+    """
+    return default_cache_dir() / "index" / f"{hash_key({'folder': str(folder.resolve())})[:32]}.sqlite"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase search tokens of `text`: words split on non-alphanumerics, underscores and
+    camelCase boundaries, without stop words and single characters.
+    """
+    words = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return [w for w in re.findall(r"[a-z0-9]+", words.lower()) if len(w) > 1 and w not in _STOP_WORDS]
+
+
+def schema_hash(fn: dict) -> str:
+    """
+    A short hash of a function's input and output schemas.
+    """
+    return hash_key({"input": fn.get("input_schema"), "output": fn.get("output_schema")})[:16]
+
+
+def function_target(folder: Path, script: Path, name: str) -> str:
+    """
+    `name` in `script` as a `script:function` target relative to `folder`.
+    """
+    try:
+        rel = script.resolve().relative_to(folder.resolve())
+    except ValueError:
+        rel = Path(script.name)
+    return f"{rel.with_suffix('').as_posix()}:{name}"
+
+
+class FunctionIndex:
+    """
+    The index file of one folder. Open it with `FunctionIndex(path)`; it is created on
+    first use of `update`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "FunctionIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _meta(self) -> Dict[str, str]:
+        return dict(self._db().execute("SELECT key, value FROM meta"))
+
+    def stamps(self) -> Snapshot:
+        """
+        `(mtime_ns, size)` of every indexed script, except scripts that failed to inspect
+        (so they are retried on the next update).
+        """
+        rows = self._db().execute("SELECT path, mtime_ns, size FROM scripts WHERE error IS NULL")
+        return {Path(path): (mtime_ns, size) for path, mtime_ns, size in rows}
+
+    def update(
+        self,
+        folder: Path,
+        *,
+        recursive: bool,
+        options: Dict[str, Any],
+        inspect: Callable[[List[Path]], List[dict]],
+    ) -> Dict[str, Any]:
+        """
+        Bring the index up to date with `folder`: scripts added or changed since the last
+        update are inspected with `inspect` (which returns their docs entries in order) and
+        re-indexed, and removed scripts are dropped. A change of `options` (anything that
+        affects the docs entries) re-indexes everything.
+        """
+        db = self._db()
+        settings = json.dumps({"version": INDEX_VERSION, "recursive": recursive, **options}, sort_keys=True)
+        # Scripts are stored by absolute path, so lookups work from any working directory.
+        current = {path.resolve(): stamp for path, stamp in snapshot(folder, recursive).items()}
+        known = self.stamps() if self._meta().get("settings") == settings else {}
+        changed, removed = diff(known, current)
+        removed += [Path(p) for (p,) in db.execute("SELECT path FROM scripts") if Path(p) not in current]
+        entries = inspect(changed) if changed else []
+
+        with db:
+            if not known:
+                db.execute("DELETE FROM scripts")
+                db.execute("DELETE FROM functions")
+                db.execute("DELETE FROM tokens")
+            self._drop(db, [str(p) for p in [*changed, *removed]])
+            for path, entry in zip(changed, entries):
+                mtime_ns, size = current[path]
+                db.execute(
+                    "INSERT INTO scripts (path, mtime_ns, size, error) VALUES (?, ?, ?, ?)",
+                    (str(path), mtime_ns, size, entry.get("error")),
+                )
+                for fn in entry.get("functions") or []:
+                    self._insert(db, folder, path, fn)
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('settings', ?)", (settings,))
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('folder', ?)", (str(folder.resolve()),))
+
+        (functions,) = db.execute("SELECT COUNT(*) FROM functions").fetchone()
+        return {
+            "index": str(self.path),
+            "scripts": len(current),
+            "functions": functions,
+            "updated": [str(p) for p in changed],
+            "removed": sorted({str(p) for p in removed}),
+        }
+
+    @staticmethod
+    def _drop(db: sqlite3.Connection, scripts: Sequence[str]) -> None:
+        for script in scripts:
+            db.execute(
+                "DELETE FROM tokens WHERE function_id IN (SELECT id FROM functions WHERE script = ?)", (script,)
+            )
+            db.execute("DELETE FROM functions WHERE script = ?", (script,))
+            db.execute("DELETE FROM scripts WHERE path = ?", (script,))
+
+    @staticmethod
+    def _insert(db: sqlite3.Connection, folder: Path, script: Path, fn: dict) -> None:
+        name = fn.get("name", "")
+        description = (fn.get("description") or "").strip()
+        cur = db.execute(
+            "INSERT INTO functions (script, target, name, name_lower, description, schema_hash, entry) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(script),
+                function_target(folder, script, name),
+                name,
+                name.lower(),
+                description,
+                schema_hash(fn),
+                json.dumps(fn, ensure_ascii=False),
+            ),
+        )
+        weights: Dict[str, int] = {}
+        for text, weight in ((name, _NAME), (script.stem, _SCRIPT), (description, _DESCRIPTION)):
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0), weight)
+        db.executemany(
+            "INSERT INTO tokens (token, function_id, weight) VALUES (?, ?, ?)",
+            [(token, cur.lastrowid, weight) for token, weight in weights.items()],
+        )
+
+    def search(self, query: str, *, limit: int = 10) -> List[dict]:
+        """
+        The functions best matching `query`, best first: an exact function name ranks
+        highest, then functions matching more of the query's words, weighted by where they
+        match (name, script name, description) and whether the whole word or only a
+        prefix matched.
+        """
+        db = self._db()
+        scores: Dict[int, List[int]] = {}  # function id -> [exact name, words matched, score]
+        for (function_id,) in db.execute("SELECT id FROM functions WHERE name_lower = ?", (query.strip().lower(),)):
+            scores[function_id] = [1, 0, _EXACT_NAME_BONUS]
+        for word in dict.fromkeys(tokenize(query)):
+            # Prefix match through the token index: every token in [word, word + U+FFFF).
+            rows = db.execute(
+                "SELECT function_id, MAX(CASE WHEN token = ? THEN weight * 2 ELSE weight END) "
+                "FROM tokens WHERE token >= ? AND token < ? GROUP BY function_id",
+                (word, word, word + "\uffff"),
+            )
+            for function_id, score in rows:
+                hit = scores.setdefault(function_id, [0, 0, 0])
+                hit[1] += 1
+                hit[2] += score
+
+        best = sorted(scores.items(), key=lambda item: ([-x for x in item[1]], item[0]))
+        results = []
+        for function_id, (_, _, score) in best[:limit]:
+            target, script, name, description, digest = db.execute(
+                "SELECT target, script, name, description, schema_hash FROM functions WHERE id = ?", (function_id,)
+            ).fetchone()
+            results.append(
+                {
+                    "target": target,
+                    "script": script,
+                    "name": name,
+                    "description": description,
+                    "schema_hash": digest,
+                    "score": score,
+                }
+            )
+        return results
+
+    def settings(self) -> Dict[str, Any]:
+        """
+        The options the index was last built with (`recursive`, `require_marker`, `static`).
+        """
+        return json.loads(self._meta().get("settings", "{}"))
+
+    def lookup(self, target: str) -> Optional[dict]:
+        """
+        The docs entry indexed for the function `target` (`script:function`), or None if
+        it is not indexed or its script changed since it was indexed.
+        """
+        row = self._db().execute(
+            "SELECT f.entry, s.path, s.mtime_ns, s.size FROM functions f JOIN scripts s ON s.path = f.script "
+            "WHERE f.target = ?",
+            (target,),
+        ).fetchone()
+        if row is None:
+            return None
+        entry, script, mtime_ns, size = row
+        try:
+            st = Path(script).stat()
+        except OSError:
+            return None
+        if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+            return None
+        return json.loads(entry)
+
+    def functions(self) -> Iterable[Tuple[str, str]]:
+        return self._db().execute("SELECT target, schema_hash FROM functions ORDER BY target")
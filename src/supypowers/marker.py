@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import ast
+from typing import Any, Dict, Optional
+
+# Options declared through the `@superpower(...)` marker, read from a script's source so
+# they are known without importing the script.
+
+# The value of an option that is not a literal (e.g. `ttl=TTL`).
+NOT_LITERAL = object()
+
+
+def _options_from_decorator(dec: ast.expr) -> Optional[Dict[str, Any]]:
+    if not isinstance(dec, ast.Call):
+        return None
+    func = dec.func
+    name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+    if name != "superpower":
+        return None
+    options = {}
+    for kw in dec.keywords:
+        if not kw.arg:
+            continue
+        try:
+            options[kw.arg] = ast.literal_eval(kw.value)
+        except ValueError:
+            options[kw.arg] = NOT_LITERAL
+    return options
+
+
+def superpower_options(source: str, function_name: str) -> Dict[str, Any]:
+    """
+    The keyword options of the `@superpower(...)` marker on the top-level function
+    `function_name` in `source` (empty if it has none, or the source does not parse).
+    Options whose value is not a literal are mapped to `NOT_LITERAL`.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+    options: Dict[str, Any] = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == function_name:
+            options = next(filter(None, map(_options_from_decorator, node.decorator_list)), {})
+    return options
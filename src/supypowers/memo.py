@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from supypowers import __version__
+from supypowers.cache import DiskCache, default_cache_dir, hash_key
+from supypowers.marker import superpower_options
+
+# Result memoization for functions marked `@superpower(cache=True, ttl=...)`.
+#
+# The marker is read from the script's source, so a cached result is served without
+# starting uv or importing the script.
+
+RESULTS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# How a successful response the runner serialized starts (see `runner.is_result_line`).
+RESULT_PREFIX = b'{"ok": true, "data": '
+
+
+def results_cache(root: Optional[Path] = None, max_bytes: int = RESULTS_CACHE_MAX_BYTES) -> DiskCache:
+    """
+    The persistent cache of memoized run results (default: `<cache dir>/results`).
+    """
+    return DiskCache(root or default_cache_dir() / "results", max_bytes)
+
+
+@dataclass(frozen=True)
+class MemoPolicy:
+    """
+    How long results of a memoized function stay valid (`ttl` in seconds, None: until evicted).
+    """
+
+    ttl: Optional[float] = None
+
+
+def memo_policy(source: str, function_name: str) -> Optional[MemoPolicy]:
+    """
+    The memoization policy declared on the top-level function `function_name` in `source`,
+    or None if it is not marked `@superpower(cache=True, ...)` with literal options.
+    """
+    options = superpower_options(source, function_name)
+    if options.get("cache") is not True:
+        return None
+    ttl = options.get("ttl")
+    if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float))):
+        return None
+    return MemoPolicy(ttl=None if ttl is None else float(ttl))
+
+
+def canonical_input(input_data: Any) -> Optional[str]:
+    """
+    A canonical JSON form of `input_data` (a string is parsed the way the runner parses
+    it; any other value is taken as already decoded; keys sorted), or None if it is not
+    an object the runner would accept.
+    """
+    raw = input_data
+    if isinstance(input_data, (str, bytes)):
+        try:
+            raw = json.loads(input_data)
+        except ValueError:
+            try:
+                text = input_data.decode("utf-8") if isinstance(input_data, bytes) else input_data
+                raw = ast.literal_eval(text.strip())
+            except Exception:
+                return None
+    if not isinstance(raw, dict):
+        return None
+    try:
+        return json.dumps(raw, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class Memo:
+    """
+    The cache slot for one call of a memoized function.
+    """
+
+    cache: DiskCache
+    key: str
+    policy: MemoPolicy
+
+    def get(self) -> Optional[dict]:
+        response = self.cache.get(self.key)
+        if response is not None:
+            self.cache.flush_stats()
+        return response
+
+    def put(self, response: dict) -> None:
+        """
+        Store `response` if the call succeeded, then apply the cache's size limit.
+        """
+        if response.get("ok"):
+            try:
+                self.cache.put(self.key, response, ttl=self.policy.ttl)
+            except (TypeError, ValueError):
+                pass  # e.g. bytes from a binary wire format; not cached
+            self.cache.evict()
+        self.cache.flush_stats()
+
+    def put_line(self, line: str) -> None:
+        """
+        Store a successful response the runner already serialized as one JSON line, as is.
+        """
+        self.cache.put_json(self.key, line, ttl=self.policy.ttl)
+        self.cache.evict()
+        self.cache.flush_stats()
+
+    def put_file(self, path: Path) -> None:
+        """
+        Store a successful response the runner wrote to `path`, copied without being parsed.
+        A response larger than the whole cache is not stored.
+        """
+        try:
+            if path.stat().st_size <= self.cache.max_bytes:
+                with path.open("rb") as f:
+                    ok = f.read(len(RESULT_PREFIX)) == RESULT_PREFIX
+                if ok:
+                    self.cache.put_json_file(self.key, path, ttl=self.policy.ttl)
+                    self.cache.evict()
+        except OSError:
+            pass
+        self.cache.flush_stats()
+
+
+def memo_for(
+    script_path: Path,
+    function_name: str,
+    input_data: Any,
+    cache: Optional[DiskCache] = None,
+    *,
+    input_path: Optional[Path] = None,
+    extra_env: Optional[Dict[str, str]] = None,
+) -> Optional[Memo]:
+    """
+    The `Memo` for calling `function_name` in `script_path` with `input_data` (or the
+    contents of `input_path`, read only if the function is memoized) and `extra_env` (the
+    secrets), or None if the function is not memoized (or the input cannot be
+    canonicalized).
+
+    Results are keyed on the script's content hash, the function, the canonical input, a
+    hash of `extra_env` and the supypowers version, so editing the script or changing a
+    secret invalidates them. The input is keyed as sent, not as the function's input model
+    would validate it: this runs in the caller's process, which cannot import the model, so
+    inputs the model would coerce to the same value (`{"x": 9}` and `{"x": "9"}`, or an
+    omitted default) are cached separately.
+    """
+    try:
+        source = script_path.read_bytes()
+    except OSError:
+        return None
+    policy = memo_policy(source.decode("utf-8", errors="replace"), function_name)
+    if policy is None:
+        return None
+    if input_path is not None:
+        try:
+            input_data = input_path.read_bytes()
+        except OSError:
+            return None
+    canonical = canonical_input(input_data)
+    if canonical is None:
+        return None
+    key = hash_key(
+        {
+            "sha256": hashlib.sha256(source).hexdigest(),
+            "function": function_name,
+            "input": canonical,
+            "env": hash_key(dict(extra_env or {})),
+            "version": __version__,
+        }
+    )
+    return Memo(cache=cache or results_cache(), key=key, policy=policy)
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from supypowers.docs import default_jobs
+from supypowers.envs import uv_environ
+from supypowers.errors import InvalidPipelineError
+from supypowers.runner import RUNNER_CODE, parse_run_output, run_output
+from supypowers.serve import RunnerProcess
+from supypowers.uv_exec import UVRunError, failure_message, uv_python_command
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+
+# DAGs of `script:function` steps.
+#
+# Steps run in warm `--serve` runner interpreters, one pool per dependency set. A step is
+# placed on the interpreter that holds the results it reads whenever it can, and its own
+# result is kept there as the Python object the function returned: a chain of steps with
+# the same dependencies hands Pydantic objects straight to each other without any JSON in
+# between. A result is serialized only when a step in another interpreter, or the caller,
+# needs it. Steps whose inputs are ready run at the same time, each dependency set getting
+# up to `jobs` interpreters.
+
+INPUT_REF = "$input"
+_STEP_ID = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+
+Ref = Tuple[str, Tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class PipelineStep:
+    id: str
+    target: str
+    input: Dict[str, Any]
+    # Input field (or `*` for all fields) -> (step id or `$input`, path inside its value).
+    map: Dict[str, Ref]
+    after: Tuple[str, ...] = ()
+
+    @property
+    def depends_on(self) -> Tuple[str, ...]:
+        sources = [source for source, _ in self.map.values() if source != INPUT_REF]
+        return tuple(dict.fromkeys([*sources, *self.after]))
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    steps: Tuple[PipelineStep, ...]
+    outputs: Tuple[str, ...]
+    input: Dict[str, Any]
+
+
+def parse_ref(ref: Any) -> Ref:
+    """
+    Split a reference such as `later.result` or `$input.start` into its source and path.
+    """
+    if not isinstance(ref, str) or not ref:
+        raise InvalidPipelineError(f"reference must be a non-empty string: {ref!r}")
+    source, *path = ref.split(".")
+    return source, tuple(path)
+
+
+def parse_pipeline(spec: Any) -> Pipeline:
+    """
+    Validate a pipeline spec:
+
+        {"input": {...},
+         "steps": [{"id": "later", "target": "dates:add_days",
+                    "input": {"days": 30}, "map": {"d": "$input.start"}},
+                   {"id": "delta", "target": "dates:days_between",
+                    "map": {"start": "$input.start", "end": "later.result"}}],
+         "outputs": ["delta"]}
+
+    `input` holds a step's literal input fields; `map` fills fields from earlier steps'
+    results (`step` or `step.field.sub`) or from the pipeline input (`$input...`), and
+    `"*"` as a field takes every field of the referenced value. `after` adds ordering-only
+    dependencies. `outputs` defaults to the steps nothing else depends on.
+    """
+    if not isinstance(spec, dict):
+        raise InvalidPipelineError("pipeline spec must be a JSON object")
+    raw_steps = spec.get("steps")
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise InvalidPipelineError("pipeline spec needs a non-empty `steps` list")
+    pipeline_input = spec.get("input", {})
+    if not isinstance(pipeline_input, dict):
+        raise InvalidPipelineError("pipeline `input` must be an object")
+
+    steps: List[PipelineStep] = []
+    for raw in raw_steps:
+        if not isinstance(raw, dict):
+            raise InvalidPipelineError("every step must be an object")
+        step_id = raw.get("id")
+        if not isinstance(step_id, str) or not _STEP_ID.match(step_id):
+            raise InvalidPipelineError(f"invalid step id: {step_id!r}")
+        if any(step.id == step_id for step in steps):
+            raise InvalidPipelineError(f"duplicate step id: {step_id}")
+        target = raw.get("target")
+        script, _, function = str(target or "").partition(":")
+        if not script or not function:
+            raise InvalidPipelineError(f"step {step_id}: target must be in the form script:function")
+        literal = raw.get("input", {})
+        mapping = raw.get("map", {})
+        after = raw.get("after", [])
+        if not isinstance(literal, dict) or not isinstance(mapping, dict) or not isinstance(after, list):
+            raise InvalidPipelineError(f"step {step_id}: `input` and `map` must be objects and `after` a list")
+        steps.append(
+            PipelineStep(
+                id=step_id,
+                target=target,
+                input=literal,
+                map={str(field): parse_ref(ref) for field, ref in mapping.items()},
+                after=tuple(str(a) for a in after),
+            )
+        )
+
+    ids = {step.id for step in steps}
+    for step in steps:
+        for source in step.depends_on:
+            if source not in ids:
+                raise InvalidPipelineError(f"step {step.id} refers to unknown step: {source}")
+            if source == step.id:
+                raise InvalidPipelineError(f"step {step.id} refers to itself")
+    _check_acyclic(steps)
+
+    outputs = spec.get("outputs")
+    if outputs is None:
+        needed = {source for step in steps for source in step.depends_on}
+        outputs = [step.id for step in steps if step.id not in needed]
+    if not isinstance(outputs, list) or any(o not in ids for o in outputs):
+        raise InvalidPipelineError("`outputs` must list step ids")
+    return Pipeline(steps=tuple(steps), outputs=tuple(outputs), input=pipeline_input)
+
+
+def _check_acyclic(steps: List[PipelineStep]) -> None:
+    remaining = {step.id: set(step.depends_on) for step in steps}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise InvalidPipelineError(f"pipeline has a cycle through: {', '.join(sorted(remaining))}")
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _walk(value: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        value = value[int(key)] if isinstance(value, list) else value[key]
+    return value
+
+
+class _StepFailed(Exception):
+    pass
+
+
+class _PipelineRun:
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        targets: Dict[str, Tuple[Path, str]],
+        pipeline_input: Dict[str, Any],
+        extra_env: Optional[Dict[str, str]],
+        jobs: Optional[int],
+    ) -> None:
+        self.pipeline = pipeline
+        self.targets = targets
+        self.input = pipeline_input
+        self.env = uv_environ(extra_env)
+        self.jobs = max(1, jobs or default_jobs())
+        self.steps = {step.id: step for step in pipeline.steps}
+        self.groups = {
+            step.id: tuple(normalize_dependencies(read_uv_script_dependencies(targets[step.id][0])))
+            for step in pipeline.steps
+        }
+        self.dependents: Dict[str, List[str]] = {step.id: [] for step in pipeline.steps}
+        for step in pipeline.steps:
+            for source in step.depends_on:
+                self.dependents[source].append(step.id)
+
+        self.lock = threading.Lock()
+        self.pools: Dict[Tuple[str, ...], List[RunnerProcess]] = {}
+        self.busy: Dict[RunnerProcess, int] = {}
+        self.numbers: Dict[RunnerProcess, int] = {}
+        self.holder: Dict[str, RunnerProcess] = {}
+        self.exported: Dict[str, Any] = {}
+
+    def _spawn(self, key: Tuple[str, ...]) -> RunnerProcess:
+        worker = RunnerProcess(uv_python_command(key, RUNNER_CODE, args=["--serve"]), self.env)
+        self.pools[key].append(worker)
+        self.busy[worker] = 0
+        self.numbers[worker] = len(self.numbers) + 1
+        return worker
+
+    def _place(self, step: PipelineStep) -> RunnerProcess:
+        # Prefer an idle interpreter that holds this step's same-environment inputs; move
+        # to another one only if those inputs have already been serialized anyway.
+        key = self.groups[step.id]
+        with self.lock:
+            pool = self.pools.setdefault(key, [])
+            local = [self.holder[source] for source in step.depends_on if self.groups[source] == key]
+            worker = next((w for w in local if not self.busy[w]), None)
+            if worker is None and all(source in self.exported for source in step.depends_on if self.groups[source] == key):
+                idle = [w for w in pool if not self.busy[w]]
+                worker = idle[0] if idle else self._spawn(key) if len(pool) < self.jobs else None
+            if worker is None:
+                worker = local[0] if local else min(pool, key=self.busy.__getitem__)
+            self.busy[worker] += 1
+            return worker
+
+    def _request(self, worker: RunnerProcess, payload: dict) -> dict:
+        returncode, stdout, stderr = worker.request(payload)
+        if returncode != 0:
+            out: Any = UVRunError(
+                message=failure_message(worker.cmd, returncode),
+                exit_code=returncode,
+                stdout=stdout,
+                stderr=stderr,
+            )
+        else:
+            out = stdout
+        response, _ = run_output(out)
+        if not response.get("ok"):
+            error = response.get("error")
+            if returncode != 0 and stdout.strip():
+                # The runner's own error line (e.g. a validation error) says more than its exit code.
+                error = parse_run_output(stdout).get("error") or error
+            raise _StepFailed(error or "step failed")
+        return response
+
+    def _export(self, step_id: str) -> Any:
+        with self.lock:
+            if step_id in self.exported:
+                return self.exported[step_id]
+        data = self._request(self.holder[step_id], {"export": step_id}).get("data")
+        with self.lock:
+            self.exported[step_id] = data
+        return data
+
+    def _needs_export(self, step_id: str) -> bool:
+        children = self.dependents[step_id]
+        return (
+            step_id in self.pipeline.outputs
+            or len(children) > 1
+            or any(self.groups[child] != self.groups[step_id] for child in children)
+        )
+
+    def _run_step(self, step: PipelineStep) -> dict:
+        started = time.perf_counter()
+        worker = self._place(step)
+        try:
+            script_path, function_name = self.targets[step.id]
+            payload_input = dict(step.input)
+            refs = []
+            for field, (source, path) in step.map.items():
+                if source != INPUT_REF and self.holder[source] is worker:
+                    refs.append([field, source, list(path)])
+                    continue
+                value = self.input if source == INPUT_REF else self._export(source)
+                try:
+                    value = _walk(value, path)
+                except (LookupError, TypeError, ValueError):
+                    raise _StepFailed(f"no value at {'.'.join([source, *path])}") from None
+                if field == "*":
+                    if not isinstance(value, dict):
+                        raise _StepFailed(f"{'.'.join([source, *path])} is not an object")
+                    payload_input.update(value)
+                else:
+                    payload_input[field] = value
+            self._request(
+                worker,
+                {
+                    "script_path": str(script_path),
+                    "function_name": function_name,
+                    "input": payload_input,
+                    "refs": refs,
+                    "keep": step.id,
+                },
+            )
+            with self.lock:
+                self.holder[step.id] = worker
+            if self._needs_export(step.id):
+                self._export(step.id)
+            record: dict = {"ok": True}
+        except _StepFailed as e:
+            record = {"ok": False, "error": str(e)}
+        finally:
+            with self.lock:
+                self.busy[worker] -= 1
+        record["interpreter"] = self.numbers[worker]
+        record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return record
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        pending = {step.id: set(step.depends_on) for step in self.pipeline.steps}
+        records: Dict[str, dict] = {}
+        failed: Optional[str] = None
+        try:
+            # No more steps run at once than the interpreters they may be given.
+            threads = min(len(pending), self.jobs * len(set(self.groups.values())))
+            with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+                running = {}
+
+                def submit_ready() -> None:
+                    for step_id in [s for s, deps in pending.items() if not deps]:
+                        del pending[step_id]
+                        running[executor.submit(self._run_step, self.steps[step_id])] = step_id
+
+                submit_ready()
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        step_id = running.pop(future)
+                        try:
+                            records[step_id] = future.result()
+                        except Exception as e:  # e.g. the step's environment could not be built
+                            records[step_id] = {"ok": False, "error": str(e)}
+                        if records[step_id]["ok"]:
+                            for child in self.dependents[step_id]:
+                                pending[child].discard(step_id)
+                        elif failed is None:
+                            failed = step_id
+                    if failed is None:
+                        submit_ready()
+        finally:
+            for pool in self.pools.values():
+                for worker in pool:
+                    worker.close()
+
+        result: Dict[str, Any] = {"ok": failed is None}
+        if failed is not None:
+            result["error"] = f"step {failed} failed: {records[failed]['error']}"
+            result["failed_step"] = failed
+        else:
+            result["outputs"] = {step_id: self.exported[step_id] for step_id in self.pipeline.outputs}
+        result["steps"] = {
+            step.id: records.get(step.id, {"ok": False, "skipped": True}) for step in self.pipeline.steps
+        }
+        result["interpreters"] = len(self.numbers)
+        result["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+
+def run_pipeline(
+    pipeline: Pipeline,
+    targets: Dict[str, Tuple[Path, str]],
+    *,
+    pipeline_input: Optional[Dict[str, Any]] = None,
+    extra_env: Optional[Dict[str, str]] = None,
+    jobs: Optional[int] = None,
+) -> dict:
+    """
+    Run `pipeline`, whose step targets are resolved to `(script path, function)` in
+    `targets`. `pipeline_input` is merged over the spec's own `input`.
+
+    Returns `{"ok": true, "outputs": {step: result}, "steps": {step: {"ok", "interpreter",
+    "ms"}}, "interpreters", "ms"}`; on the first failing step, the steps still running
+    finish, nothing new starts and `{"ok": false, "error", "failed_step", "steps", ...}`
+    is returned, with the steps that never ran marked `"skipped"`.
+    """
+    merged = {**pipeline.input, **(pipeline_input or {})}
+    return _PipelineRun(pipeline, targets, merged, extra_env, jobs).run()
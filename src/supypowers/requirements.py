@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+# Just enough of PEP 508 to compare the requirements scripts declare.
+#
+# With `packaging` installed, requirements are parsed and version specifiers evaluated
+# properly. Without it, the project name is parsed and the version specifiers are only
+# checked for their shape, then compared as text, so two requirements for one project are
+# compatible only if they are identical (or one has no constraint at all).
+
+_NAME = re.compile(r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(\[[^\]]*\])?\s*(.*?)\s*$")
+_SPECIFIER = r"(?:~=|===|==|!=|<=|>=|<|>)\s*[A-Za-z0-9][A-Za-z0-9.*+!_-]*"
+_SPECIFIER_LIST = re.compile(rf"^(?:\(\s*)?(?:{_SPECIFIER}(?:\s*,\s*{_SPECIFIER})*)?(?:\s*\))?$")
+
+
+def packaging_available() -> bool:
+    try:
+        import packaging.requirements  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def canonical_name(name: str) -> str:
+    """
+    The PEP 503 normalized form of a project name.
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+@dataclass(frozen=True)
+class ParsedRequirement:
+    text: str
+    name: str
+    extras: Tuple[str, ...]
+    specifier: str
+    url: Optional[str]
+    marker: Optional[str]
+
+
+def parse_requirement(text: str) -> Optional[ParsedRequirement]:
+    """
+    Parse one dependency string, or return None if it is not a valid requirement.
+    """
+    if packaging_available():
+        from packaging.requirements import InvalidRequirement, Requirement
+
+        try:
+            req = Requirement(text)
+        except InvalidRequirement:
+            return None
+        return ParsedRequirement(
+            text=text,
+            name=canonical_name(req.name),
+            extras=tuple(sorted(req.extras)),
+            specifier=str(req.specifier),
+            url=req.url,
+            marker=str(req.marker) if req.marker is not None else None,
+        )
+
+    match = _NAME.match(text)
+    if match is None:
+        return None
+    name, extras, rest = match.groups()
+    url = None
+    marker = None
+    if ";" in rest:
+        rest, _, marker = (part.strip() for part in rest.partition(";"))
+    if rest.startswith("@"):
+        url, rest = rest[1:].strip(), ""
+    elif not _SPECIFIER_LIST.match(rest):
+        return None
+    return ParsedRequirement(
+        text=text,
+        name=canonical_name(name),
+        extras=tuple(sorted(e.strip() for e in (extras or "[]")[1:-1].split(",") if e.strip())),
+        specifier="".join(rest.split()).strip("()"),
+        url=url,
+        marker=marker,
+    )
+
+
+def _candidate_versions(specifier: str) -> List[Any]:
+    from packaging.specifiers import SpecifierSet
+    from packaging.version import InvalidVersion, Version
+
+    # Any non-empty intersection of version ranges contains one of its bounds, or a
+    # version just above its lower bound; plus one very low and one very high version.
+    candidates = [Version("0"), Version("999999")]
+    for spec in SpecifierSet(specifier):
+        text = spec.version[:-2] if spec.version.endswith(".*") else spec.version
+        try:
+            version = Version(text)
+        except InvalidVersion:
+            continue
+        candidates.append(version)
+        candidates.append(Version(".".join(str(n) for n in (*version.release, 0, 0, 0, 1))))
+    return candidates
+
+
+def specifiers_compatible(specifiers: Sequence[str]) -> bool:
+    """
+    Whether some version satisfies every one of `specifiers` (each like `>=2,<3`).
+
+    Without `packaging`, only identical specifiers are compatible.
+    """
+    constrained = sorted({s for s in specifiers if s})
+    if len(constrained) <= 1:
+        return True
+    if not packaging_available():
+        return False
+
+    from packaging.specifiers import InvalidSpecifier, SpecifierSet
+
+    try:
+        combined = SpecifierSet(",".join(constrained))
+    except InvalidSpecifier:
+        return False
+    if any(spec.operator == "===" for spec in combined):
+        return len({spec.version for spec in combined if spec.operator == "==="}) == 1
+    return any(combined.contains(v, prereleases=True) for v in _candidate_versions(str(combined)))
+
+
+def conflicts(requirement: ParsedRequirement, others: Sequence[ParsedRequirement]) -> bool:
+    """
+    Whether `requirement` cannot be installed together with `others` (requirements for
+    the same project). Requirements with an environment marker are never considered to
+    conflict, since they may not apply at all.
+    """
+    others = [o for o in others if o.marker is None]
+    if requirement.marker is not None or not others:
+        return False
+    urls = {r.url for r in (requirement, *others) if r.url is not None}
+    if urls:
+        # A direct reference only agrees with the same reference and unconstrained requirements.
+        return len(urls) > 1 or any(r.url is None and r.specifier for r in (requirement, *others))
+    return not specifiers_compatible([requirement.specifier, *(o.specifier for o in others)])
+
+
+def installed_satisfies(deps: Sequence[str]) -> bool:
+    """
+    Whether the distributions installed for this interpreter satisfy every one of `deps`,
+    judged from their metadata, together with everything those distributions require in
+    turn. Requirements whose environment marker does not apply here are ignored; direct
+    references (`name @ url`) are never considered satisfied.
+
+    Without `packaging`, only requirements with no version constraint, marker or extras can
+    be satisfied, and what the distributions require is not checked.
+    """
+    return all(_installed_satisfies(dep, set()) for dep in deps)
+
+
+def _installed_satisfies(dep: str, seen: Set[Tuple[str, str]]) -> bool:
+    from importlib import metadata
+
+    req = parse_requirement(dep)
+    if req is None or req.url is not None:
+        return False
+    if req.marker is not None or req.specifier:
+        if not packaging_available():
+            return False
+        from packaging.markers import Marker
+
+        if req.marker is not None and not Marker(req.marker).evaluate():
+            return True
+    try:
+        dist = metadata.distribution(req.name)
+    except metadata.PackageNotFoundError:
+        return False
+    if req.specifier:
+        from packaging.specifiers import SpecifierSet
+
+        if not SpecifierSet(req.specifier).contains(dist.version, prereleases=True):
+            return False
+    if not packaging_available():
+        return not req.extras
+
+    # A distribution is only usable if what it requires is installed too: its base
+    # requirements, plus the ones each requested extra adds.
+    from packaging.requirements import InvalidRequirement, Requirement
+
+    for extra in ("", *req.extras):
+        if (req.name, extra) in seen:
+            continue
+        seen.add((req.name, extra))
+        for text in dist.requires or []:
+            try:
+                sub = Requirement(text)
+            except InvalidRequirement:
+                return False
+            if extra:
+                if sub.marker is None or not sub.marker.evaluate({"extra": extra}):
+                    continue
+                if sub.marker.evaluate({"extra": ""}):
+                    continue  # not specific to this extra; checked with the base requirements
+            elif sub.marker is not None and not sub.marker.evaluate({"extra": ""}):
+                continue  # only for an extra, or not for this platform
+            sub.marker = None
+            if not _installed_satisfies(str(sub), seen):
+                return False
+    return True
@@ -0,0 +1,716 @@
+from __future__ import annotations
+
+import json
+from typing import Iterable, Tuple, Union
+
+from supypowers.uv_exec import UVRunError
+
+
+def uv_error_response(e: UVRunError) -> dict:
+    """
+    The JSON object `supypowers run` prints when the runner process exits non-zero.
+    """
+    return {
+        "ok": False,
+        "error": e.message,
+        "exit_code": e.exit_code,
+        "uv_stdout": e.stdout,
+        "uv_stderr": e.stderr,
+    }
+
+
+def is_stream_output(out: Union[str, UVRunError]) -> bool:
+    """
+    Whether runner stdout (or the stdout of a failed runner) is a stream of frames.
+    """
+    text = out.stdout if isinstance(out, UVRunError) else out
+    return text.startswith(STREAM_HEADER)
+
+
+def collect_stream(lines: Iterable[str]) -> dict:
+    """
+    Fold the frames of a streamed result into one result object: `{"ok": true, "data":
+    [items...]}`, or the stream's error frame.
+    """
+    items = []
+    for line in lines:
+        if line == STREAM_HEADER or not line.strip():
+            continue
+        try:
+            frame = json.loads(line)
+        except Exception:
+            return {"ok": False, "error": "runner did not emit valid JSON", "raw": line}
+        if not frame.get("ok"):
+            return frame
+        if frame.get("done"):
+            return {"ok": True, "data": items}
+        items.append(frame.get("item"))
+    return {"ok": False, "error": "stream ended before its closing frame"}
+
+
+def parse_run_output(out: Union[str, UVRunError]) -> dict:
+    """
+    Turn raw runner stdout (or the error of a failed runner process) into the result
+    object `supypowers run` prints. Streamed results are collected into a list.
+    """
+    if is_stream_output(out):
+        return collect_stream((out.stdout if isinstance(out, UVRunError) else out).splitlines())
+    if isinstance(out, UVRunError):
+        return uv_error_response(out)
+
+    try:
+        parsed = json.loads(out)
+    except Exception:
+        return {"ok": False, "error": "runner did not emit valid JSON", "raw": out}
+    if not isinstance(parsed, dict):
+        return {"ok": False, "error": "runner did not emit valid JSON", "raw": out}
+    return parsed
+
+
+def is_result_line(out: str) -> bool:
+    """
+    Whether `out` is a single successful result line as the runner serializes it, which
+    can be printed as is.
+    """
+    return out.startswith('{"ok": true, "data": ') and "\n" not in out
+
+
+def run_output(out: Union[str, UVRunError]) -> Tuple[dict, int]:
+    """
+    The result object `supypowers run` prints for `out`, plus its exit code.
+    """
+    parsed = parse_run_output(out)
+    if isinstance(out, UVRunError):
+        return parsed, out.exit_code
+    return parsed, 0 if parsed.get("ok") else 1
+
+
+def render_run_output(out: Union[str, UVRunError]) -> Tuple[str, int]:
+    """
+    The exact line `supypowers run` prints for `out`, plus its exit code.
+    """
+    if isinstance(out, str) and is_result_line(out):
+        return out, 0
+    parsed, exit_code = run_output(out)
+    return json.dumps(parsed, ensure_ascii=False), exit_code
+
+
+# Executed inside the script's uv environment.
+#
+# Default mode reads one JSON payload from stdin and prints one JSON result (or writes
+# it to the payload's `output_path`).
+# With `--serve` it stays alive and answers one payload per stdin line, reusing
+# imported modules and resolved functions between requests; `--fork-server` answers the
+# same requests, each in a child forked from a process that has already imported the
+# script. With `--batch` it
+# resolves one function and calls it once per stdin line.
+#
+# In the default mode, a function returning a generator or iterator streams NDJSON
+# frames as items are produced: STREAM_HEADER, one `{"ok": true, "item": ...}` frame
+# per item, then `{"ok": true, "done": true, "count": N}` (or an error frame). The
+# serve modes answer with the same frames once the generator is exhausted; in the batch
+# mode the items are collected into a list instead.
+BATCH_READY = '{"batch": "ready"}'
+STREAM_HEADER = '{"ok": true, "stream": true}'
+ITEM_PREFIX = '{"ok": true, "item": '
+# With `"wire_format": "msgpack"` or `"marshal"` in the payload, the default mode sends a
+# plain function's result as a binary frame instead; see `supypowers.wire`.
+# With `"profile": true` in the payload, the default mode prints one more line after
+# its output with the runner's phase timings and resource usage.
+# For pipelines (`supypowers.pipeline`), a `--serve` payload may carry `"keep": <step id>`
+# to keep the result in the interpreter instead of returning it, `"refs"` to build the
+# input from kept results, and `{"export": <step id>}` asks for a kept result.
+PROFILE_PREFIX = '{"profile": '
+
+RUNNER_CODE = r"""
+import time
+
+_STARTED_AT = time.time()
+_T0 = time.perf_counter()
+
+import ast
+import collections.abc
+import importlib.util
+import inspect
+import io
+import json
+import os
+import sys
+import traceback
+import typing
+
+BATCH_READY = '{"batch": "ready"}'
+STREAM_HEADER = '{"ok": true, "stream": true}'
+
+_MODULES = {}
+_FUNCTIONS = {}
+# Results kept in memory for later pipeline steps, by step id (see `keep` and `refs`).
+_OUTPUTS = {}
+# Phase durations in milliseconds, collected only when the payload asks for a profile.
+_TIMINGS = None
+# `(format, encode)` for the binary wire format the payload asks for, if any.
+_WIRE = None
+
+def _lap(phase, start):
+    now = time.perf_counter()
+    if _TIMINGS is not None:
+        _TIMINGS[phase] = _TIMINGS.get(phase, 0.0) + (now - start) * 1000
+    return now
+
+def _parse_input(s):
+    s = s.strip()
+    try:
+        return json.loads(s)
+    except Exception:
+        pass
+    # "YAML-ish" best-effort: accept Python literals (e.g. {'x': 1}, [1,2], True, None).
+    try:
+        return ast.literal_eval(s)
+    except Exception:
+        raise ValueError("input_data must be valid JSON or a Python-literal-ish value")
+
+def _load_module_from_path(path):
+    # Cached by modification time so a long-lived runner picks up edited scripts.
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except OSError:
+        stamp = None
+    cached = _MODULES.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    spec = importlib.util.spec_from_file_location("__supypowers_target__", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    _MODULES[path] = (stamp, mod)
+    return mod
+
+def _is_pydantic_model(cls):
+    try:
+        from pydantic import BaseModel
+        return isinstance(cls, type) and issubclass(cls, BaseModel)
+    except Exception:
+        return False
+
+def _resolved_type_hints(fn, mod):
+    try:
+        return typing.get_type_hints(fn, globalns=vars(mod), localns=vars(mod))
+    except Exception:
+        return {}
+
+def _model_to_jsonable(obj):
+    # Pydantic v2: model_dump(); v1: dict()
+    if hasattr(obj, "model_dump"):
+        try:
+            return obj.model_dump(mode="json")
+        except Exception:
+            return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    return obj
+
+def _resolve_function(script_path, fn_name):
+    # Returns (fn, input annotation, None) or (None, None, (exit code, output line)).
+    start = time.perf_counter()
+    mod = _load_module_from_path(script_path)
+    start = _lap("import_ms", start)
+    cached = _FUNCTIONS.get((script_path, fn_name))
+    if cached is not None and cached[0] is mod:
+        return cached[1]
+
+    fn = getattr(mod, fn_name, None)
+    if fn is None or not callable(fn):
+        return None, None, (2, json.dumps({"ok": False, "error": f"function not found: {fn_name}"}))
+
+    sig = inspect.signature(fn)
+    params = list(sig.parameters.values())
+    if len(params) != 1:
+        return None, None, (2, json.dumps({"ok": False, "error": "function must accept exactly one parameter named `input`"}))
+
+    param = params[0]
+    if param.name != "input":
+        return None, None, (2, json.dumps({"ok": False, "error": "function parameter must be named `input`"}))
+
+    hints = _resolved_type_hints(fn, mod)
+    resolved = (fn, hints.get(param.name, param.annotation), None)
+    _FUNCTIONS[(script_path, fn_name)] = (mod, resolved)
+    _lap("type_hints_ms", start)
+    return resolved
+
+def _ok_line(key, value):
+    # `{"ok": true, key: value}`, falling back to str(value) if it is not JSON-serializable.
+    # A result (`data`) is returned as bytes instead when a binary wire format is on.
+    out = _model_to_jsonable(value)
+    if _WIRE is not None and key == "data":
+        try:
+            return _WIRE[1]({"ok": True, key: out})
+        except Exception:
+            pass
+    try:
+        return json.dumps({"ok": True, key: out}, ensure_ascii=False)
+    except Exception:
+        return json.dumps({"ok": True, key: str(out)}, ensure_ascii=False)
+
+def _is_stream(result):
+    return inspect.isgenerator(result) or (
+        isinstance(result, collections.abc.Iterator) and not isinstance(result, (str, bytes))
+    )
+
+def _stream(result, emit):
+    # Emits the header and one frame per item; returns (exit code, closing frame).
+    emit(STREAM_HEADER)
+    count = 0
+    items = iter(result)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                _lap("function_ms", start)
+                break
+            start = _lap("function_ms", start)
+            line = _ok_line("item", item)
+            start = _lap("serialization_ms", start)
+            emit(line)
+            _lap("output_ms", start)
+            count += 1
+    except Exception as e:
+        return 1, json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False)
+    return 0, json.dumps({"ok": True, "done": True, "count": count})
+
+def _read_input(payload):
+    # The input is a file (`input_path`, decoded once, straight from disk), an already
+    # decoded JSON value (`input`) or a JSON / Python-literal string (`input_data`).
+    path = payload.get("input_path")
+    if path is not None:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            return json.loads(data)
+        except Exception:
+            return _parse_input(data.decode("utf-8"))
+    if "input" in payload:
+        return payload["input"]
+    return _parse_input(payload["input_data"])
+
+def _ref_value(step, path):
+    # A kept result, or a field / item inside it, as the Python object itself.
+    value = _OUTPUTS[step]
+    for key in path:
+        if isinstance(value, (list, tuple)):
+            value = value[int(key)]
+        elif isinstance(value, dict):
+            value = value[key]
+        else:
+            value = getattr(value, key)
+    return value
+
+def _model_fields(value):
+    fields = getattr(type(value), "model_fields", None) or getattr(type(value), "__fields__", None)
+    if fields is not None:
+        return {name: getattr(value, name) for name in fields}
+    return dict(value)
+
+def _with_refs(raw, refs):
+    # Fill input fields from kept results: `[field, step, path]`, where the field `*`
+    # takes every field of the referenced value.
+    raw = dict(raw)
+    for field, step, path in refs:
+        value = _ref_value(step, path)
+        if field == "*":
+            raw.update(_model_fields(value))
+        else:
+            raw[field] = value
+    return raw
+
+def _call(fn, ann, raw, emit=None, keep=None):
+    # Returns (exit code, output line) for the parsed input `raw`. With `emit`, iterator
+    # results are streamed through it and the returned line is the closing frame. With
+    # `keep`, the result is kept in memory under that step id instead of being serialized.
+    start = time.perf_counter()
+    try:
+        if not _is_pydantic_model(ann):
+            return 2, json.dumps({"ok": False, "error": "input must be a Pydantic BaseModel type annotation"})
+        if not isinstance(raw, dict):
+            return 2, json.dumps({"ok": False, "error": "input_data must be an object mapping for the input model"})
+        inp = ann.model_validate(raw) if hasattr(ann, "model_validate") else ann.parse_obj(raw)
+        start = _lap("validation_ms", start)
+        result = fn(inp)
+        start = _lap("function_ms", start)
+        if keep is not None:
+            _OUTPUTS[keep] = list(result) if _is_stream(result) else result
+            _lap("function_ms", start)
+            return 0, json.dumps({"ok": True, "kept": keep})
+        if _is_stream(result):
+            if emit is not None:
+                return _stream(result, emit)
+            return 0, _ok_line("data", [_model_to_jsonable(item) for item in result])
+        line = _ok_line("data", result)
+        _lap("serialization_ms", start)
+        return 0, line
+    except Exception as e:
+        return 1, json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False)
+
+def _execute(payload, emit=None):
+    # Returns (exit code, output line).
+    if "export" in payload:
+        # A result kept by an earlier pipeline step, serialized now that it is needed.
+        if payload["export"] not in _OUTPUTS:
+            return 1, json.dumps({"ok": False, "error": f"no kept result for step: {payload['export']}"})
+        return 0, _ok_line("data", _OUTPUTS[payload["export"]])
+    fn, ann, err = _resolve_function(payload["script_path"], payload["function_name"])
+    if err is not None:
+        return err
+    start = time.perf_counter()
+    raw = _read_input(payload)
+    if payload.get("refs"):
+        if not isinstance(raw, dict):
+            return 2, json.dumps({"ok": False, "error": "input_data must be an object mapping for the input model"})
+        try:
+            raw = _with_refs(raw, payload["refs"])
+        except (LookupError, AttributeError, TypeError, ValueError) as e:
+            return 1, json.dumps({"ok": False, "error": f"could not resolve step reference: {e!r}"}, ensure_ascii=False)
+    _lap("validation_ms", start)
+    return _call(fn, ann, raw, emit, keep=payload.get("keep"))
+
+def _private_stdout():
+    # Keep a private copy of stdout for protocol output and point fd 1 at stderr, so
+    # anything the scripts print cannot corrupt it.
+    channel = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    return channel
+
+def _serve_request(line, captured=None):
+    # One serve request, answered the way a one-shot runner would have exited. Anything
+    # the script prints is captured and reported the way `uv run` would report stderr.
+    # A generator's frames are answered together, as the lines a one-shot runner prints.
+    captured = captured or io.StringIO()
+    frames = []
+    saved = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = captured
+    try:
+        code, out = _execute(json.loads(line), frames.append)
+        if frames:
+            out = "\n".join([*frames, out])
+    except SystemExit as e:
+        code = 0 if e.code is None else e.code if isinstance(e.code, int) else 1
+        out = ""
+    except Exception:
+        code, out = 1, ""
+        traceback.print_exc()
+    finally:
+        sys.stdout, sys.stderr = saved
+    return json.dumps({"returncode": code, "stdout": out.strip(), "stderr": captured.getvalue().strip()})
+
+def _serve():
+    channel = _private_stdout()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        channel.write(_serve_request(line) + "\n")
+        channel.flush()
+    return 0
+
+def _fork_server():
+    # The `--serve` protocol, but every request runs in its own child forked from this
+    # process: calls are isolated from each other, while pydantic and the scripts are
+    # imported here once and inherited by every child. Requests are forked as soon as
+    # they arrive and answered as their children finish, so responses may come back out
+    # of order; a request's `"id"` is copied into its response to match them up.
+    import selectors
+
+    channel = _private_stdout()
+    try:
+        import pydantic  # noqa: F401
+    except ImportError:
+        pass
+    selector = selectors.DefaultSelector()
+    stdin_fd = sys.stdin.fileno()
+    selector.register(stdin_fd, selectors.EVENT_READ)
+    replies = {}  # read end of a child's pipe -> (pid, request id, chunks read so far)
+    pending = b""
+    reading = True
+    while reading or replies:
+        for key, _ in selector.select():
+            fd = key.fd
+            if fd != stdin_fd:
+                chunk = os.read(fd, 65536)
+                if chunk:
+                    replies[fd][2].append(chunk)
+                    continue
+                selector.unregister(fd)
+                os.close(fd)
+                pid, request_id, chunks = replies.pop(fd)
+                channel.write(_fork_reply(pid, request_id, b"".join(chunks)) + "\n")
+                channel.flush()
+                continue
+            data = os.read(fd, 65536)
+            if data:
+                pending += data
+                *lines, pending = pending.split(b"\n")
+            else:
+                selector.unregister(fd)
+                reading = False
+                lines, pending = [pending], b""
+            for raw in lines:
+                line = raw.decode("utf-8", errors="replace")
+                if line.strip():
+                    read_fd, pid, request_id = _fork_request(line, selector)
+                    replies[read_fd] = (pid, request_id, [])
+    return 0
+
+def _fork_request(line, selector):
+    # Fork a child for one request and return the read end of its reply pipe, its pid
+    # and the request's id. The script is imported and the function resolved before
+    # forking; a failure here is not cached, so the child runs into it again and reports it.
+    import selectors
+
+    captured = io.StringIO()
+    saved = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = captured
+    request_id = None
+    try:
+        payload = json.loads(line)
+        request_id = payload.get("id")
+        _resolve_function(payload["script_path"], payload["function_name"])
+    except (Exception, SystemExit):
+        pass
+    finally:
+        sys.stdout, sys.stderr = saved
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        selector.close()
+        try:
+            with os.fdopen(write_fd, "w", encoding="utf-8") as reply:
+                reply.write(_serve_request(line, captured))
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    selector.register(read_fd, selectors.EVENT_READ)
+    return read_fd, pid, request_id
+
+def _fork_reply(pid, request_id, response):
+    # Reap the child and build the response line for its request.
+    _, status = os.waitpid(pid, 0)
+    response = response.decode("utf-8", errors="replace")
+    if not response:
+        # The child died before answering (e.g. os._exit or a crash in the script).
+        code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 128 + os.WTERMSIG(status)
+        response = json.dumps({"returncode": code or 1, "stdout": "", "stderr": "supypowers: forked runner exited unexpectedly"})
+    if request_id is not None:
+        response = response[:-1] + ", \"id\": " + json.dumps(request_id) + "}"
+    return response
+
+def _batch():
+    # The first stdin line is the payload; every further line is one input_data record,
+    # answered by one output line in order (a blank line is answered with an error).
+    channel = _private_stdout()
+    payload = json.loads(sys.stdin.readline())
+    fn, ann, err = _resolve_function(payload["script_path"], payload["function_name"])
+    if err is not None:
+        channel.write(err[1] + "\n")
+        channel.flush()
+        return err[0]
+    channel.write(BATCH_READY + "\n")
+    channel.flush()
+    for line in sys.stdin:
+        if not line.strip():
+            channel.write(json.dumps({"ok": False, "error": "empty input line"}) + "\n")
+            channel.flush()
+            continue
+        try:
+            _, out = _call(fn, ann, _parse_input(line))
+        except (Exception, SystemExit) as e:
+            out = json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False)
+        channel.write(out + "\n")
+        channel.flush()
+    return 0
+
+def main():
+    if "--serve" in sys.argv[1:]:
+        return _serve()
+    if "--fork-server" in sys.argv[1:]:
+        return _fork_server()
+    if "--batch" in sys.argv[1:]:
+        return _batch()
+    global _TIMINGS, _WIRE
+    payload = json.loads(sys.stdin.read())
+    if payload.get("profile"):
+        _TIMINGS = {}
+    wire_format = None if payload.get("output_path") else payload.get("wire_format")
+    if wire_format == "msgpack":
+        try:
+            import msgpack
+            _WIRE = ("msgpack", lambda value: msgpack.packb(value, use_bin_type=True))
+        except ImportError:
+            wire_format = "marshal"  # the standard library's codec is always there
+    if wire_format == "marshal":
+        import marshal
+        _WIRE = ("marshal", lambda value: marshal.dumps(value, 4))
+    # The result goes to `output_path` if given, else to a private copy of stdout;
+    # either way, whatever the script prints ends up on stderr.
+    channel = _private_stdout()
+    output_path = payload.get("output_path")
+    output = open(output_path, "w", encoding="utf-8") if output_path else channel
+
+    def emit(line):
+        output.write(line + "\n")
+        if output is channel:
+            # Flush every frame so consumers see items as soon as they are produced.
+            output.flush()
+
+    code, out = _execute(payload, emit)
+    if isinstance(out, bytes):
+        output.write(json.dumps({"wire": _WIRE[0], "length": len(out)}) + "\n")
+        output.flush()
+        output.buffer.write(out)
+        output.buffer.flush()
+        out = ""  # the newline closing the frame
+    output.write(out + "\n")
+    if output is not channel:
+        output.close()
+    if _TIMINGS is not None:
+        # Written last, after the result, so the parent can split it off.
+        channel.write(json.dumps({"profile": _profile()}) + "\n")
+    channel.flush()
+    return code
+
+def _profile():
+    child = {"started_at": _STARTED_AT, "runner_ms": (time.perf_counter() - _T0) * 1000}
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        child["max_rss_bytes"] = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        child["user_cpu_ms"] = usage.ru_utime * 1000
+        child["system_cpu_ms"] = usage.ru_stime * 1000
+    except ImportError:
+        pass
+    return {"phases": _TIMINGS, "child": child}
+
+if __name__ == "__main__":
+    sys.exit(main())
+"""
+
+
+# Executed inside a uv environment to document scripts. The payload names either one
+# `script_path` (prints one entry) or several `script_paths` that share the
+# environment's dependency set (prints a list of entries, one per script).
+DOCS_CODE = r"""
+import ast
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import typing
+
+def _load_module_from_path(path):
+    spec = importlib.util.spec_from_file_location("__supypowers_target__", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def _is_pydantic_model(cls):
+    try:
+        from pydantic import BaseModel
+        return isinstance(cls, type) and issubclass(cls, BaseModel)
+    except Exception:
+        return False
+
+def _resolved_type_hints(fn, mod):
+    try:
+        return typing.get_type_hints(fn, globalns=vars(mod), localns=vars(mod))
+    except Exception:
+        return {}
+
+def _schema_for_model(model_cls):
+    try:
+        return model_cls.model_json_schema()
+    except Exception:
+        try:
+            return model_cls.schema()
+        except Exception:
+            return None
+
+def _has_superpower_decorator(script_path, fn_name):
+    try:
+        src = open(script_path, "r", encoding="utf-8").read()
+        tree = ast.parse(src)
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name == fn_name:
+                for dec in node.decorator_list:
+                    if isinstance(dec, ast.Call):
+                        dec = dec.func  # @superpower(cache=True, ...)
+                    if isinstance(dec, ast.Name) and dec.id == "superpower":
+                        return True
+                    if isinstance(dec, ast.Attribute) and dec.attr == "superpower":
+                        return True
+        return False
+    except Exception:
+        return False
+
+def _inspect(script_path, require_marker):
+    mod = _load_module_from_path(script_path)
+
+    fns = []
+    for name, obj in sorted(vars(mod).items()):
+        if name.startswith("_"):
+            continue
+        if not callable(obj):
+            continue
+        try:
+            sig = inspect.signature(obj)
+        except Exception:
+            continue
+        params = list(sig.parameters.values())
+        if len(params) != 1:
+            continue
+        if params[0].name != "input":
+            continue
+        hints = _resolved_type_hints(obj, mod)
+        ann_in = hints.get(params[0].name, params[0].annotation)
+        if require_marker and not _has_superpower_decorator(script_path, name):
+            continue
+        if not _is_pydantic_model(ann_in):
+            continue
+
+        ann_out = hints.get("return", sig.return_annotation)
+        fns.append({
+            "name": name,
+            "description": inspect.getdoc(obj) or "",
+            "input_schema": _schema_for_model(ann_in) if _is_pydantic_model(ann_in) else None,
+            "output_schema": _schema_for_model(ann_out) if _is_pydantic_model(ann_out) else None,
+        })
+
+    return {"script": script_path, "functions": fns}
+
+def main():
+    payload = json.loads(sys.stdin.read())
+    require_marker = bool(payload.get("require_marker"))
+
+    if "script_paths" not in payload:
+        entry = _inspect(payload["script_path"], require_marker)
+        print(json.dumps(entry, ensure_ascii=False))
+        return 0
+
+    # Several scripts sharing one environment: a failure (even SystemExit) while
+    # importing one of them is recorded in its own entry. Output goes to a private
+    # copy of stdout so module-level prints cannot corrupt it.
+    channel = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    entries = []
+    for script_path in payload["script_paths"]:
+        try:
+            entries.append(_inspect(script_path, require_marker))
+        except (Exception, SystemExit) as e:
+            entries.append({"script": script_path, "error": f"{type(e).__name__}: {e}", "functions": []})
+    channel.write(json.dumps(entries, ensure_ascii=False) + "\n")
+    channel.flush()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+"""
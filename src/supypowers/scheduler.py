@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from supypowers.cache import acquire_file_lock, default_cache_dir, release_file_lock
+from supypowers.docs import default_jobs
+from supypowers.errors import QueueFullError, QueueTimeoutError
+from supypowers.marker import superpower_options
+
+# Admission control for runner processes.
+#
+# Every call takes a slot before its child process starts: at most `max_concurrency`
+# calls run at once overall, and at most `max_concurrency` per function for functions
+# marked `@superpower(max_concurrency=N)`. Calls that cannot start wait in one queue,
+# ordered by priority (higher first) and then arrival; when a slot frees up, the first
+# waiting call whose function is under its own limit starts. Under overload the number
+# of children stays flat and the excess waits (or is turned away with `max_queue` or a
+# queue timeout) instead of thrashing the machine.
+#
+# With a `slot_dir`, the limits also hold across processes: once admitted here, a call
+# must also lock one of `max_concurrency` slot files in that directory (and one of
+# `limit` files for its function), polling until one is free. The default scheduler
+# uses `<cache dir>/slots` only when `SUPYPOWERS_MAX_CONCURRENCY` is set, so that
+# separate CLI invocations, `serve` and `worker` processes on one machine share an
+# explicit limit; otherwise its limits are per process, and a superpower that itself
+# calls `supypowers run` can never wait on the slot its caller holds. Priority and
+# queue order only apply within a process.
+#
+# Only runner processes are scheduled: the interpreters `docs` inspects scripts in
+# (bounded by its own `jobs`) and a pipeline's stage processes are not.
+
+# How often a call waiting for a slot file held by another process checks again (s).
+_SLOT_POLL_SECONDS = 0.05
+
+
+def function_limit(script_path: Path, function_name: str) -> Optional[int]:
+    """
+    The per-function concurrency limit declared as `@superpower(max_concurrency=N)`, or None.
+    """
+    try:
+        source = script_path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+    limit = superpower_options(source, function_name).get("max_concurrency")
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        return None
+    return limit
+
+
+class _Waiter:
+    def __init__(self, order: Tuple[int, int], key: Hashable, limit: Optional[int], wake: Callable[[], None]) -> None:
+        self.order = order
+        self.key = key
+        self.limit = limit
+        self.wake = wake
+        self.granted = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.order < other.order
+
+
+class Scheduler:
+    """
+    A global concurrency limit plus per-function limits, with a priority/FIFO queue.
+
+    `slot()` (threads) and `slot_async()` (asyncio) are context managers that wait for a
+    slot and yield how long that took, in milliseconds. With `max_queue`, a call that
+    would have to wait while `max_queue` calls are already waiting raises
+    `QueueFullError`; a call still waiting after `timeout` seconds raises
+    `QueueTimeoutError`. With `slot_dir`, the limits are shared with every process using
+    the same directory.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        *,
+        max_queue: Optional[int] = None,
+        slot_dir: Optional[Path] = None,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency or default_jobs())
+        self.max_queue = max_queue
+        self.slot_dir = slot_dir
+        self._lock = threading.Lock()
+        self._running = 0
+        self._per_key: Dict[Hashable, int] = {}
+        self._waiting: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"running": self._running, "waiting": len(self._waiting)}
+
+    def _admissible(self, key: Hashable, limit: Optional[int]) -> bool:
+        return self._running < self.max_concurrency and (limit is None or self._per_key.get(key, 0) < limit)
+
+    def _take(self, key: Hashable) -> None:
+        self._running += 1
+        self._per_key[key] = self._per_key.get(key, 0) + 1
+
+    def _enqueue(self, key: Hashable, limit: Optional[int], priority: int, wake: Callable[[], None]) -> Optional[_Waiter]:
+        # Returns None if the slot was taken right away, else the queued waiter.
+        with self._lock:
+            if self._admissible(key, limit):
+                # Anyone still waiting is blocked by their own function's limit.
+                self._take(key)
+                return None
+            if self.max_queue is not None and len(self._waiting) >= self.max_queue:
+                raise QueueFullError(self.max_queue)
+            waiter = _Waiter((-priority, next(self._seq)), key, limit, wake)
+            bisect.insort(self._waiting, waiter)
+            return waiter
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        # Take a waiter off the queue; False if it was granted a slot in the meantime.
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiting.remove(waiter)
+            return True
+
+    def _release(self, key: Hashable) -> None:
+        with self._lock:
+            self._running -= 1
+            self._per_key[key] -= 1
+            if not self._per_key[key]:
+                del self._per_key[key]
+            for waiter in list(self._waiting):
+                if self._running >= self.max_concurrency:
+                    break
+                if self._admissible(waiter.key, waiter.limit):
+                    self._waiting.remove(waiter)
+                    self._take(waiter.key)
+                    waiter.granted = True
+                    waiter.wake()
+
+    def _try_slot_files(self, key: Hashable, limit: Optional[int]) -> Optional[List[int]]:
+        # Lock a free function slot file (with a limit) and a free global one; None if
+        # either is all taken.
+        assert self.slot_dir is not None
+        self.slot_dir.mkdir(parents=True, exist_ok=True)
+        groups = [("slot", self.max_concurrency)]
+        if limit is not None:
+            digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16]
+            groups.insert(0, (f"fn-{digest}", limit))
+        fds: List[int] = []
+        for prefix, count in groups:
+            for i in range(count):
+                fd = acquire_file_lock(self.slot_dir / f"{prefix}-{i}.lock", blocking=False)
+                if fd is not None:
+                    fds.append(fd)
+                    break
+            else:
+                for fd in fds:
+                    release_file_lock(fd)
+                return None
+        return fds
+
+    def _expired(self, start: float, timeout: Optional[float]) -> bool:
+        return timeout is not None and time.perf_counter() - start >= timeout
+
+    @contextmanager
+    def slot(
+        self,
+        key: Hashable = None,
+        limit: Optional[int] = None,
+        *,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Iterator[float]:
+        """
+        Hold one slot (and one of `limit` slots for `key`) for the duration of the block.
+        """
+        start = time.perf_counter()
+        granted = threading.Event()
+        waiter = self._enqueue(key, limit, priority, granted.set)
+        if waiter is not None and not granted.wait(timeout) and self._withdraw(waiter):
+            raise QueueTimeoutError((time.perf_counter() - start) * 1000)
+        fds: List[int] = []
+        try:
+            while self.slot_dir is not None:
+                taken = self._try_slot_files(key, limit)
+                if taken is not None:
+                    fds = taken
+                    break
+                if self._expired(start, timeout):
+                    raise QueueTimeoutError((time.perf_counter() - start) * 1000)
+                time.sleep(_SLOT_POLL_SECONDS)
+            yield (time.perf_counter() - start) * 1000
+        finally:
+            for fd in fds:
+                release_file_lock(fd)
+            self._release(key)
+
+    @asynccontextmanager
+    async def slot_async(
+        self,
+        key: Hashable = None,
+        limit: Optional[int] = None,
+        *,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[float]:
+        """
+        `slot` for asyncio: waiting for the slot does not block the event loop or a thread.
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enqueue(key, limit, priority, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(granted, timeout)
+            except asyncio.TimeoutError:
+                if self._withdraw(waiter):
+                    raise QueueTimeoutError((time.perf_counter() - start) * 1000) from None
+            except BaseException:
+                # Cancelled while waiting: give the slot back if it was granted meanwhile.
+                if not self._withdraw(waiter):
+                    self._release(key)
+                raise
+        fds: List[int] = []
+        try:
+            while self.slot_dir is not None:
+                taken = self._try_slot_files(key, limit)
+                if taken is not None:
+                    fds = taken
+                    break
+                if self._expired(start, timeout):
+                    raise QueueTimeoutError((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(_SLOT_POLL_SECONDS)
+            yield (time.perf_counter() - start) * 1000
+        finally:
+            for fd in fds:
+                release_file_lock(fd)
+            self._release(key)
+
+_DEFAULT: Optional[Scheduler] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name, "").strip()
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+def default_scheduler() -> Scheduler:
+    """
+    The scheduler shared by `supypowers.run` calls and serve/worker requests in this
+    process. Its limits come from `SUPYPOWERS_MAX_CONCURRENCY` (default: CPU count) and
+    `SUPYPOWERS_MAX_QUEUE` (default: unbounded) when it is first used; an explicit
+    `SUPYPOWERS_MAX_CONCURRENCY` is shared with other processes through slot files under
+    `<cache dir>/slots`.
+    """
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            max_concurrency = _env_int("SUPYPOWERS_MAX_CONCURRENCY")
+            _DEFAULT = Scheduler(
+                max_concurrency,
+                max_queue=_env_int("SUPYPOWERS_MAX_QUEUE"),
+                slot_dir=default_cache_dir() / "slots" if max_concurrency is not None else None,
+            )
+        return _DEFAULT
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from supypowers.envs import uv_environ
+from supypowers.errors import BackpressureError, SupypowersError
+from supypowers.runner import RUNNER_CODE, is_stream_output, render_run_output
+from supypowers.scheduler import Scheduler, default_scheduler, function_limit
+from supypowers.shared_env import SharedEnv
+from supypowers.util import resolve_target
+from supypowers.uv_exec import UVRunError, failure_message, uv_python_command
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+
+
+class RunnerProcess:
+    """
+    One long-lived runner interpreter (`RUNNER_CODE --serve`) for a dependency set.
+
+    Requests are answered one at a time, in order. With `multiplexed` (for a fork server,
+    which answers each request as soon as its child finishes), every request is tagged
+    with an id and several threads may have requests in flight at once; a reader thread
+    hands each response to the request waiting for it.
+    """
+
+    def __init__(self, cmd: list, env: Dict[str, str], *, multiplexed: bool = False) -> None:
+        self._cmd = cmd
+        self._env = env
+        self._multiplexed = multiplexed
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        # Requests in flight on the current process (multiplexed only), by id.
+        self._waiting: Dict[int, Future] = {}
+        self._alive = False
+        self._ids = itertools.count(1)
+
+    @property
+    def cmd(self) -> list:
+        return self._cmd
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None or (self._multiplexed and not self._alive):
+            if self._proc is not None:
+                _close_process(self._proc, self._reader)
+            self._proc = subprocess.Popen(
+                self._cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=self._env,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+            if self._multiplexed:
+                self._waiting = {}
+                self._alive = True
+                self._reader = threading.Thread(
+                    target=self._read_responses, args=(self._proc, self._waiting), daemon=True
+                )
+                self._reader.start()
+        return self._proc
+
+    def request(self, payload: dict) -> Tuple[int, str, str]:
+        """
+        Send one runner payload and return `(returncode, stdout, stderr)` as a one-shot
+        runner would have produced them.
+        """
+        if self._multiplexed:
+            return self._request_tagged(payload)
+        with self._lock:
+            proc = self._ensure_started()
+            try:
+                proc.stdin.write(json.dumps(payload) + "\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline()
+            except (BrokenPipeError, OSError):
+                line = ""
+            if not line:
+                # The worker died (e.g. os._exit or a crash in the script); it is
+                # restarted on the next request.
+                returncode = proc.wait()
+                return returncode or 1, "", "supypowers worker exited unexpectedly"
+            resp = json.loads(line)
+            return int(resp["returncode"]), resp["stdout"], resp["stderr"]
+
+    def _request_tagged(self, payload: dict) -> Tuple[int, str, str]:
+        # The lock only covers sending; the response is awaited without it.
+        future: Future = Future()
+        with self._lock:
+            proc = self._ensure_started()
+            request_id = next(self._ids)
+            self._waiting[request_id] = future
+            try:
+                proc.stdin.write(json.dumps({**payload, "id": request_id}) + "\n")
+                proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                pass  # the reader fails the request once the process is gone
+        return future.result()
+
+    def _read_responses(self, proc: subprocess.Popen, waiting: Dict[int, Future]) -> None:
+        try:
+            for line in proc.stdout:
+                resp = json.loads(line)
+                with self._lock:
+                    future = waiting.pop(resp.get("id"), None)
+                if future is not None:
+                    future.set_result((int(resp["returncode"]), resp["stdout"], resp["stderr"]))
+        except (OSError, ValueError):
+            pass
+        returncode = proc.wait()
+        with self._lock:
+            if self._proc is proc:
+                self._alive = False
+            failed = list(waiting.values())
+            waiting.clear()
+        # The worker died (e.g. a crash in the fork server itself); it is restarted on
+        # the next request.
+        for future in failed:
+            future.set_result((returncode or 1, "", "supypowers worker exited unexpectedly"))
+
+    def close(self) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+            reader, self._reader = self._reader, None
+        if proc is not None:
+            _close_process(proc, reader)
+
+
+def _close_process(proc: subprocess.Popen, reader: Optional[threading.Thread] = None) -> None:
+    # Closing stdin ends the serve loop. Both pipes are closed by the time the process
+    # has been waited for, so none is left for the garbage collector (and a
+    # ResourceWarning); a reader thread is let run into the end of stdout first.
+    pipes = [proc.stdin] if reader is not None else [proc.stdin, proc.stdout]
+    for pipe in pipes:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    if reader is not None:
+        if reader is not threading.current_thread():
+            reader.join(timeout=5)
+        try:
+            proc.stdout.close()
+        except OSError:
+            pass
+
+
+class WorkerPool:
+    """
+    Warm runner interpreters: up to `size` per distinct (normalized) dependency set,
+    started as concurrent requests need them. A request waits for an idle interpreter
+    once all of its set's are busy.
+
+    With `fork`, each worker is a fork server (`RUNNER_CODE --fork-server`): it imports
+    pydantic and the scripts once and runs every request in a freshly forked child, so no
+    state is shared between calls. Children run concurrently, so a single fork server per
+    dependency set takes all of its requests and `size` does not apply. With `shared`, scripts covered by that shared environment
+    all use the interpreters for its merged dependency set.
+    """
+
+    def __init__(
+        self,
+        extra_env: Optional[Dict[str, str]] = None,
+        quiet: bool = True,
+        *,
+        fork: bool = False,
+        shared: Optional[SharedEnv] = None,
+        size: int = 1,
+        scheduler: Optional[Scheduler] = None,
+    ) -> None:
+        if fork and not hasattr(os, "fork"):
+            raise OSError("fork servers need os.fork, which is not available on this platform")
+        self._env = uv_environ(extra_env)
+        self._quiet = quiet
+        self._mode = "--fork-server" if fork else "--serve"
+        self._shared = shared
+        self._size = max(1, size)
+        self._scheduler = scheduler
+        self._cond = threading.Condition()
+        self._commands: Dict[Tuple[str, ...], list] = {}
+        self._workers: Dict[Tuple[str, ...], List[RunnerProcess]] = {}
+        self._idle: Dict[Tuple[str, ...], List[RunnerProcess]] = {}
+
+    def key_for(self, script_path: Path) -> Tuple[str, ...]:
+        """
+        The dependency set whose interpreters run `script_path`.
+        """
+        if self._shared is not None:
+            return tuple(self._shared.dependencies_for(script_path))
+        return tuple(normalize_dependencies(read_uv_script_dependencies(script_path)))
+
+    @contextmanager
+    def _checkout(self, key: Tuple[str, ...]) -> Iterator[RunnerProcess]:
+        cmd = self._commands.get(key)
+        if cmd is None:
+            # Outside the lock: finding the environment may mean building it.
+            cmd = self._commands.setdefault(
+                key, uv_python_command(key, RUNNER_CODE, args=[self._mode], quiet=self._quiet)
+            )
+        with self._cond:
+            if self._mode == "--fork-server":
+                # A fork server takes concurrent requests itself: one per set, shared.
+                started = self._workers.setdefault(key, [])
+                if not started:
+                    started.append(RunnerProcess(cmd, self._env, multiplexed=True))
+                worker = started[0]
+        if self._mode == "--fork-server":
+            yield worker
+            return
+        with self._cond:
+            while True:
+                idle = self._idle.setdefault(key, [])
+                started = self._workers.setdefault(key, [])
+                if idle:
+                    worker = idle.pop()
+                    break
+                if len(started) < self._size:
+                    worker = RunnerProcess(cmd, self._env)
+                    started.append(worker)
+                    break
+                self._cond.wait()
+        try:
+            yield worker
+        finally:
+            with self._cond:
+                if worker in self._workers.get(key, ()):
+                    self._idle[key].append(worker)
+                    self._cond.notify()
+
+    def run(self, script_path: Path, function_name: str, input_data: str) -> Tuple[str, int]:
+        """
+        Run `function_name` from `script_path` and return the output (one line, or a
+        generator's frames) and exit code that `supypowers run` would have produced. The request holds a slot of the pool's
+        scheduler (default: `default_scheduler()`) while it runs and raises
+        `BackpressureError` if the scheduler turns it away.
+        """
+        payload = {
+            "script_path": str(script_path),
+            "function_name": function_name,
+            "input_data": input_data,
+        }
+        scheduler = self._scheduler or default_scheduler()
+        slot = scheduler.slot((str(script_path), function_name), function_limit(script_path, function_name))
+        with slot, self._checkout(self.key_for(script_path)) as worker:
+            returncode, stdout, stderr = worker.request(payload)
+        if is_stream_output(stdout):
+            # A generator's frames, as `run` prints them.
+            return stdout, returncode
+        if returncode != 0:
+            return render_run_output(
+                UVRunError(
+                    message=failure_message(worker.cmd, returncode),
+                    exit_code=returncode,
+                    stdout=stdout,
+                    stderr=stderr,
+                )
+            )
+        return render_run_output(stdout)
+
+    def close(self) -> None:
+        with self._cond:
+            workers = [w for started in self._workers.values() for w in started]
+            self._workers.clear()
+            self._idle.clear()
+            self._cond.notify_all()
+        for worker in workers:
+            worker.close()
+
+
+def handle_request_line(pool: WorkerPool, folder: Path, line: str) -> str:
+    """
+    Answer one serve request: `{"target": "script:function", "input_data": ...}`.
+
+    `input_data` may be a string (as on the `run` command line) or any JSON value.
+    """
+    try:
+        req = json.loads(line)
+        if not isinstance(req, dict):
+            raise ValueError("request must be a JSON object")
+        input_data = req.get("input_data", "{}")
+        if not isinstance(input_data, str):
+            input_data = json.dumps(input_data)
+        # Resolved exactly as `run` resolves it, so errors read the same.
+        script_path, func_name = resolve_target(folder, str(req.get("target", "")))
+    except SupypowersError as e:
+        return json.dumps(e.to_dict())
+    except Exception as e:
+        return json.dumps({"ok": False, "error": str(e)})
+
+    try:
+        out, _ = pool.run(script_path, func_name, input_data)
+    except BackpressureError as e:
+        return json.dumps({"ok": False, "error": str(e)})
+    return out
+
+
+def serve_stream(pool: WorkerPool, folder: Path, reader: TextIO, writer: TextIO) -> None:
+    """
+    JSON-lines loop: one request per input line, one response per output line, in order.
+    """
+    for line in reader:
+        if not line.strip():
+            continue
+        writer.write(handle_request_line(pool, folder, line) + "\n")
+        writer.flush()
+
+
+def serve_unix_socket(pool: WorkerPool, folder: Path, socket_path: Path) -> None:
+    """
+    Serve the JSON-lines protocol on a Unix socket; each connection is handled in its
+    own thread and requests for the same dependency set share the pool's workers for it.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw in self.rfile:
+                line = raw.decode("utf-8", errors="replace")
+                if not line.strip():
+                    continue
+                self.wfile.write((handle_request_line(pool, folder, line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    if socket_path.exists():
+        socket_path.unlink()
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with Server(str(socket_path), Handler) as server:
+        sys.stderr.write(f"supypowers: serving on {socket_path}\n")
+        try:
+            server.serve_forever()
+        finally:
+            socket_path.unlink(missing_ok=True)
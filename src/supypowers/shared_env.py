@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from supypowers.requirements import ParsedRequirement, conflicts, parse_requirement
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+
+# One environment for a whole folder (`--shared-env`).
+#
+# The requirements of the scripts at the top of a folder are merged into one set, taken
+# script by script in path order: a script joins unless one of its requirements cannot be
+# satisfied together with what the scripts before it declared (see
+# `requirements.conflicts`). Joined scripts all run in the environment of the merged set;
+# the others keep their own environment and are listed in `conflicts`. Only declared
+# requirements are compared; conflicts between transitive dependencies surface when uv
+# builds the merged environment.
+
+
+@dataclass(frozen=True)
+class SharedEnv:
+    """
+    The merged requirement set of a folder and the scripts it covers.
+    """
+
+    folder: Path
+    dependencies: Tuple[str, ...]
+    scripts: FrozenSet[Path]
+    conflicts: Tuple[dict, ...] = field(default=())
+
+    def dependencies_for(self, script_path: Path) -> List[str]:
+        """
+        The dependency set `script_path` runs with: the merged set for a member script,
+        else its own.
+        """
+        if script_path.resolve() in self.scripts:
+            return list(self.dependencies)
+        return normalize_dependencies(read_uv_script_dependencies(script_path))
+
+    def to_dict(self) -> dict:
+        return {
+            "folder": str(self.folder),
+            "dependencies": list(self.dependencies),
+            "scripts": sorted(str(p) for p in self.scripts),
+            "conflicts": list(self.conflicts),
+        }
+
+
+def merge_requirements(folder: Path, scripts: List[Path]) -> SharedEnv:
+    """
+    Merge the requirements of `scripts` (in order) into one `SharedEnv`.
+    """
+    merged: Dict[str, List[ParsedRequirement]] = {}
+    dependencies: Set[str] = set()
+    members: Set[Path] = set()
+    clashes = []
+    for script_path in scripts:
+        deps = normalize_dependencies(read_uv_script_dependencies(script_path))
+        parsed = [(dep, parse_requirement(dep)) for dep in deps]
+        clash = None
+        for dep, req in parsed:
+            if req is None:
+                clash = {"requirement": dep, "error": "not a valid requirement"}
+                break
+            others = merged.get(req.name, [])
+            if conflicts(req, others):
+                clash = {"requirement": dep, "conflicts_with": sorted({o.text for o in others})}
+                break
+        if clash is not None:
+            clashes.append({"script": str(script_path), **clash})
+            continue
+        for _, req in parsed:
+            merged.setdefault(req.name, []).append(req)
+        dependencies.update(deps)
+        members.add(script_path.resolve())
+    return SharedEnv(
+        folder=folder,
+        dependencies=tuple(normalize_dependencies(list(dependencies))),
+        scripts=frozenset(members),
+        conflicts=tuple(clashes),
+    )
+
+
+_CACHE: Dict[Path, Tuple[Tuple, SharedEnv]] = {}
+_CACHE_GUARD = threading.Lock()
+
+
+def shared_env(folder: Path) -> SharedEnv:
+    """
+    The `SharedEnv` of the scripts directly in `folder`, recomputed only when one of them
+    is added, removed or edited.
+    """
+    folder = folder.resolve()
+    scripts = sorted(p for p in folder.glob("*.py") if p.is_file())
+    stamps = []
+    for script_path in scripts:
+        try:
+            st = os.stat(script_path)
+        except OSError:
+            continue
+        stamps.append((str(script_path), st.st_mtime_ns, st.st_size))
+    key = tuple(stamps)
+    with _CACHE_GUARD:
+        cached: Optional[Tuple[Tuple, SharedEnv]] = _CACHE.get(folder)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    env = merge_requirements(folder, scripts)
+    with _CACHE_GUARD:
+        _CACHE[folder] = (key, env)
+    return env
@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import ast
+import builtins
+import inspect
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Static (AST-only) docs extraction.
+#
+# Builds the same entries as the runtime inspector (`DOCS_CODE`) for scripts whose
+# supypowers and Pydantic models can be understood without importing them, emitting
+# JSON schemas in the shape Pydantic v2's `model_json_schema()` produces. Anything
+# outside the supported subset raises `_Unresolvable`, and the caller falls back to
+# the runtime inspector for that script.
+
+
+class _Unresolvable(Exception):
+    pass
+
+
+_SCALARS: Dict[str, Dict[str, Any]] = {
+    "builtins.str": {"type": "string"},
+    "builtins.int": {"type": "integer"},
+    "builtins.float": {"type": "number"},
+    "builtins.bool": {"type": "boolean"},
+    "builtins.bytes": {"format": "binary", "type": "string"},
+    "typing.Any": {},
+    "datetime.date": {"format": "date", "type": "string"},
+    "datetime.datetime": {"format": "date-time", "type": "string"},
+    "datetime.time": {"format": "time", "type": "string"},
+    "datetime.timedelta": {"format": "duration", "type": "string"},
+    "uuid.UUID": {"format": "uuid", "type": "string"},
+}
+
+_LISTS = {"builtins.list", "typing.List"}
+_SETS = {"builtins.set", "typing.Set", "builtins.frozenset", "typing.FrozenSet"}
+_DICTS = {"builtins.dict", "typing.Dict"}
+_OPTIONAL = {"typing.Optional", "typing_extensions.Optional"}
+_UNION = {"typing.Union", "typing_extensions.Union"}
+_LITERAL = {"typing.Literal", "typing_extensions.Literal"}
+_CLASSVAR = {"typing.ClassVar"}
+_BASE_MODEL = {"pydantic.BaseModel", "pydantic.main.BaseModel"}
+_FIELD = {"pydantic.Field", "pydantic.fields.Field"}
+
+# Field() keyword -> JSON schema keyword, split by the schema type it applies to.
+_NUMERIC_CONSTRAINTS = {"gt": "exclusiveMinimum", "ge": "minimum", "lt": "exclusiveMaximum", "le": "maximum"}
+_LENGTH_CONSTRAINTS = {
+    "string": {"min_length": "minLength", "max_length": "maxLength"},
+    "array": {"min_length": "minItems", "max_length": "maxItems"},
+}
+
+
+def _sort(value: Any, parent_key: Optional[str] = None) -> Any:
+    # Mirrors Pydantic's key sorting: everything except the order of `properties`
+    # and the contents of `default`.
+    if isinstance(value, dict):
+        keys = value.keys() if parent_key == "properties" else sorted(value)
+        return {k: (value[k] if k == "default" else _sort(value[k], k)) for k in keys}
+    if isinstance(value, list):
+        return [_sort(v) for v in value]
+    return value
+
+
+class _Module:
+    def __init__(self, tree: ast.Module) -> None:
+        self.names: Dict[str, str] = {}
+        self.classes: Dict[str, ast.ClassDef] = {}
+        self.functions: Dict[str, ast.FunctionDef] = {}
+        for node in tree.body:
+            if isinstance(node, (ast.If, ast.Try, ast.With, ast.For, ast.While)):
+                # Definitions that only exist at runtime depending on control flow.
+                if any(isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) for n in ast.walk(node)):
+                    raise _Unresolvable("conditional definitions")
+            elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    for n in ast.walk(target):
+                        if isinstance(n, ast.Name):
+                            if n.id in self.functions or n.id in self.classes:
+                                raise _Unresolvable(f"{n.id} is rebound")
+                            self.names[n.id] = f"__main__.{n.id}"
+            elif isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+                raise _Unresolvable("star import")
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        self.names[alias.asname] = alias.name
+                    else:
+                        top = alias.name.split(".")[0]
+                        self.names[top] = top
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                for alias in node.names:
+                    self.names[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+            elif isinstance(node, ast.ClassDef):
+                self.classes[node.name] = node
+                self.names.pop(node.name, None)
+                self.functions.pop(node.name, None)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions[node.name] = node
+                self.classes.pop(node.name, None)
+                self.names.pop(node.name, None)
+
+    def qualname(self, node: ast.expr) -> Optional[str]:
+        """
+        The dotted name an annotation refers to, or None for non-name expressions.
+        Local classes resolve to their bare name and other module-level names to
+        `__main__.<name>`.
+        """
+        if isinstance(node, ast.Name):
+            if node.id in self.classes:
+                return node.id
+            if node.id in self.names:
+                return self.names[node.id]
+            return f"builtins.{node.id}" if hasattr(builtins, node.id) else f"__main__.{node.id}"
+        if isinstance(node, ast.Attribute):
+            base = self.qualname(node.value)
+            return f"{base}.{node.attr}" if base else None
+        return None
+
+    def is_model(self, name: str, _seen: Tuple[str, ...] = ()) -> bool:
+        cls = self.classes.get(name)
+        if cls is None or name in _seen:
+            return False
+        for base in cls.bases:
+            qn = self.qualname(base)
+            if qn in _BASE_MODEL or (qn in self.classes and self.is_model(qn, _seen + (name,))):
+                return True
+        return False
+
+
+class _SchemaBuilder:
+    def __init__(self, module: _Module) -> None:
+        self.module = module
+        self.defs: Dict[str, dict] = {}
+
+    def _annotation(self, node: ast.expr) -> ast.expr:
+        # String annotations (forward references / `from __future__ import annotations`).
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            try:
+                return ast.parse(node.value, mode="eval").body
+            except SyntaxError:
+                raise _Unresolvable(f"unparseable annotation: {node.value!r}")
+        return node
+
+    def is_direct_model(self, node: ast.expr) -> bool:
+        """
+        Whether the annotation is a model, possibly Optional - Pydantic sets no field
+        title for those.
+        """
+        node = self._annotation(node)
+        members = self._union_members(node)
+        if members is not None:
+            non_null = [m for m in members if not self._is_none(m)]
+            return len(non_null) == 1 and len(members) == 2 and self.is_direct_model(non_null[0])
+        qn = self.module.qualname(node)
+        return qn is not None and self.module.is_model(qn)
+
+    @staticmethod
+    def _is_none(node: ast.expr) -> bool:
+        return isinstance(node, ast.Constant) and node.value is None
+
+    def _union_members(self, node: ast.expr) -> Optional[List[ast.expr]]:
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+            left = self._union_members(node.left) or [node.left]
+            right = self._union_members(node.right) or [node.right]
+            return left + right
+        if isinstance(node, ast.Subscript):
+            qn = self.module.qualname(node.value)
+            args = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice]
+            if qn in _OPTIONAL:
+                return [args[0], ast.Constant(value=None)]
+            if qn in _UNION:
+                return list(args)
+        return None
+
+    def type_schema(self, node: ast.expr) -> dict:
+        node = self._annotation(node)
+        if self._is_none(node):
+            return {"type": "null"}
+
+        members = self._union_members(node)
+        if members is not None:
+            return {"anyOf": [self.type_schema(self._annotation(m)) for m in members]}
+
+        if isinstance(node, ast.Subscript):
+            qn = self.module.qualname(node.value)
+            args = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice]
+            if qn in _LISTS and len(args) == 1:
+                return {"items": self.type_schema(args[0]), "type": "array"}
+            if qn in _SETS and len(args) == 1:
+                return {"items": self.type_schema(args[0]), "type": "array", "uniqueItems": True}
+            if qn in _DICTS and len(args) == 2:
+                key = self.type_schema(args[0])
+                if key != {"type": "string"}:
+                    raise _Unresolvable("dict keys other than str")
+                return {"additionalProperties": self.type_schema(args[1]), "type": "object"}
+            if qn in _LITERAL:
+                return self._literal_schema(args)
+            raise _Unresolvable(f"unsupported generic: {ast.unparse(node)}")
+
+        qn = self.module.qualname(node)
+        if qn is None:
+            raise _Unresolvable(f"unsupported annotation: {ast.unparse(node)}")
+        if qn in _SCALARS:
+            return dict(_SCALARS[qn])
+        if qn in _LISTS:
+            return {"items": {}, "type": "array"}
+        if qn in _SETS:
+            return {"items": {}, "type": "array", "uniqueItems": True}
+        if qn in _DICTS:
+            return {"additionalProperties": True, "type": "object"}
+        if self.module.is_model(qn):
+            if qn not in self.defs:
+                self.defs[qn] = {}  # placeholder, guards recursive models
+                self.defs[qn] = self.model_schema(qn)
+            return {"$ref": f"#/$defs/{qn}"}
+        raise _Unresolvable(f"unsupported type: {qn}")
+
+    @staticmethod
+    def _literal_schema(args: List[ast.expr]) -> dict:
+        values = []
+        for arg in args:
+            if not isinstance(arg, ast.Constant):
+                raise _Unresolvable("non-constant Literal value")
+            values.append(arg.value)
+        kinds = {type(v) for v in values}
+        if kinds == {str}:
+            return {"enum": values, "type": "string"}
+        if kinds == {int}:
+            return {"enum": values, "type": "integer"}
+        raise _Unresolvable("mixed or unsupported Literal values")
+
+    def _is_neutral_decorator(self, dec: ast.expr) -> bool:
+        call = dec if isinstance(dec, ast.Call) else None
+        qn = self.module.qualname(call.func if call else dec)
+        if qn in {"builtins.classmethod", "builtins.staticmethod", "builtins.property"}:
+            return call is None
+        if qn in {"pydantic.field_validator", "pydantic.model_validator"}:
+            # `before`/`plain`/`wrap` validators may replace the field's schema.
+            mode = next((kw.value for kw in call.keywords if kw.arg == "mode"), None) if call else None
+            return mode is None or (isinstance(mode, ast.Constant) and mode.value == "after")
+        return False
+
+    def _fields(self, name: str) -> Dict[str, Tuple[ast.expr, Optional[ast.expr]]]:
+        cls = self.module.classes[name]
+        fields: Dict[str, Tuple[ast.expr, Optional[ast.expr]]] = {}
+        for base in cls.bases:
+            qn = self.module.qualname(base)
+            if qn in self.module.classes:
+                fields.update(self._fields(qn))
+            elif qn not in _BASE_MODEL:
+                raise _Unresolvable(f"unsupported base class: {qn}")
+        if cls.keywords or cls.decorator_list:
+            raise _Unresolvable("class keywords or decorators")
+
+        for i, stmt in enumerate(cls.body):
+            if i == 0 and isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+                continue  # docstring
+            if isinstance(stmt, ast.Pass):
+                continue
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if not all(self._is_neutral_decorator(dec) for dec in stmt.decorator_list):
+                    raise _Unresolvable(f"decorated method {name}.{stmt.name}")
+                continue  # plain methods and after-validators do not change the validation schema
+            if isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name):
+                field_name = stmt.target.id
+                annotation = self._annotation(stmt.annotation)
+                if field_name.startswith("_"):
+                    continue  # private attribute
+                ann_qn = self.module.qualname(
+                    annotation.value if isinstance(annotation, ast.Subscript) else annotation
+                )
+                if ann_qn in _CLASSVAR:
+                    continue
+                fields[field_name] = (annotation, stmt.value)
+                continue
+            raise _Unresolvable(f"unsupported statement in model body: {ast.unparse(stmt)}")
+        return fields
+
+    def _field_schema(self, field_name: str, annotation: ast.expr, value: Optional[ast.expr]) -> Tuple[dict, bool]:
+        schema = self.type_schema(annotation)
+        extra: Dict[str, Any] = {}
+        title = field_name.title().replace("_", " ")
+        required = value is None
+
+        if value is not None and isinstance(value, ast.Call) and self.module.qualname(value.func) in _FIELD:
+            required = True
+            if value.args:
+                if len(value.args) > 1:
+                    raise _Unresolvable("Field() with several positional arguments")
+                default_node: Optional[ast.expr] = value.args[0]
+            else:
+                default_node = None
+            for kw in value.keywords:
+                if kw.arg == "default":
+                    default_node = kw.value
+                elif kw.arg in ("description", "title", "examples"):
+                    extra[kw.arg] = _literal(kw.value)
+                elif kw.arg in _NUMERIC_CONSTRAINTS and schema.get("type") in ("integer", "number"):
+                    extra[_NUMERIC_CONSTRAINTS[kw.arg]] = _literal(kw.value)
+                elif kw.arg in ("min_length", "max_length") and schema.get("type") in _LENGTH_CONSTRAINTS:
+                    extra[_LENGTH_CONSTRAINTS[schema["type"]][kw.arg]] = _literal(kw.value)
+                elif kw.arg == "pattern" and schema.get("type") == "string":
+                    extra["pattern"] = _literal(kw.value)
+                else:
+                    raise _Unresolvable(f"unsupported Field() argument: {kw.arg}")
+            if default_node is not None and not (
+                isinstance(default_node, ast.Constant) and default_node.value is Ellipsis
+            ):
+                required = False
+                extra["default"] = _literal(default_node)
+        elif value is not None:
+            extra["default"] = _literal(value)
+
+        explicit_title = extra.pop("title", None)
+        schema = {**schema, **extra}
+        if explicit_title is not None:
+            schema["title"] = explicit_title
+        elif not self.is_direct_model(annotation):
+            # Pydantic does not give a field a title when its type is (optionally) a model.
+            schema["title"] = title
+        return schema, required
+
+    def model_schema(self, name: str) -> dict:
+        properties: Dict[str, dict] = {}
+        required: List[str] = []
+        for field_name, (annotation, value) in self._fields(name).items():
+            properties[field_name], is_required = self._field_schema(field_name, annotation, value)
+            if is_required:
+                required.append(field_name)
+
+        schema: Dict[str, Any] = {"properties": properties, "title": name, "type": "object"}
+        if required:
+            schema["required"] = required
+        doc = ast.get_docstring(self.module.classes[name], clean=False)
+        if doc:
+            schema["description"] = inspect.cleandoc(doc)
+        return schema
+
+    def root_schema(self, name: str) -> dict:
+        schema = self.model_schema(name)
+        # The root model is emitted inline, only the models it refers to go to $defs.
+        defs = {k: v for k, v in self.defs.items() if k != name}
+        if defs:
+            schema["$defs"] = defs
+        elif name in self.defs:
+            raise _Unresolvable("recursive model")
+        return _sort(schema)
+
+
+def _literal(node: ast.expr) -> Any:
+    try:
+        value = ast.literal_eval(node)
+    except Exception:
+        raise _Unresolvable(f"non-literal value: {ast.unparse(node)}")
+    if isinstance(value, tuple):
+        return list(value)
+    if isinstance(value, (set, frozenset, complex, bytes)):
+        raise _Unresolvable("value has no JSON form")
+    return value
+
+
+def _is_superpower_decorator(dec: ast.expr) -> bool:
+    if isinstance(dec, ast.Call):
+        dec = dec.func  # @superpower(cache=True, ...)
+    if isinstance(dec, ast.Name) and dec.id == "superpower":
+        return True
+    if isinstance(dec, ast.Attribute) and dec.attr == "superpower":
+        return True
+    return False
+
+
+def _model_schema(module: _Module, annotation: Optional[ast.expr]) -> Optional[dict]:
+    """
+    The JSON schema for a model annotation, None if the annotation is not a model.
+    """
+    if annotation is None:
+        return None
+    builder = _SchemaBuilder(module)
+    node = builder._annotation(annotation)
+    qn = module.qualname(node)
+    if qn is not None and module.is_model(qn):
+        return builder.root_schema(qn)
+    if qn is not None and (qn.startswith("builtins.") or qn.startswith("typing.") or qn in _SCALARS):
+        return None
+    if qn is None and isinstance(node, (ast.Constant, ast.Subscript, ast.BinOp)):
+        return None
+    # An imported name could be a model we cannot see.
+    raise _Unresolvable(f"cannot tell whether {ast.unparse(node)} is a model")
+
+
+def inspect_script_static(script_path: Path, *, require_marker: bool) -> Optional[dict]:
+    """
+    Build the docs entry for `script_path` from its source alone.
+
+    Returns None when the script uses something the static extractor does not understand;
+    the caller should then fall back to the runtime inspector.
+    """
+    try:
+        tree = ast.parse(script_path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+    fns = []
+    try:
+        module = _Module(tree)
+        for name, node in sorted(module.functions.items()):
+            if name.startswith("_"):
+                continue
+            args = node.args
+            if args.posonlyargs or args.vararg or args.kwonlyargs or args.kwarg:
+                continue
+            if len(args.args) != 1 or args.args[0].arg != "input":
+                continue
+            if any(not _is_superpower_decorator(dec) for dec in node.decorator_list):
+                raise _Unresolvable("decorator may change the function")
+            if require_marker and not node.decorator_list:
+                continue
+
+            input_schema = _model_schema(module, args.args[0].annotation)
+            if input_schema is None:
+                continue
+            fns.append(
+                {
+                    "name": name,
+                    "description": ast.get_docstring(node) or "",
+                    "input_schema": input_schema,
+                    "output_schema": _model_schema(module, node.returns),
+                }
+            )
+    except _Unresolvable:
+        return None
+
+    return {"script": str(script_path), "functions": fns}
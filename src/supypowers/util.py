@@ -1,20 +1,42 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Tuple
+
+from supypowers.errors import FolderNotFoundError, InvalidTargetError, ScriptNotFoundError
 
 
 def resolve_script_path(folder: Path, script_name: str) -> Path:
     """
-    Resolve a script name (with or without .py) within a folder.
+    Resolve a script name (with or without .py) within a folder. Names that resolve to a
+    path outside the folder (`../x`, absolute paths, symlinks out of it) are not found.
     """
     name = script_name if script_name.endswith(".py") else f"{script_name}.py"
     p = (folder / name).resolve()
+    if not p.is_relative_to(folder.resolve()):
+        raise FileNotFoundError(f"Script not found in {folder}: {name}")
     if not p.exists() or not p.is_file():
         raise FileNotFoundError(f"Script not found: {p}")
     return p
 
 
+def resolve_target(folder: str | Path, target: str) -> Tuple[Path, str]:
+    """
+    Split `script:function` and resolve the script inside `folder`.
+    """
+    folder = Path(folder)
+    if not folder.exists() or not folder.is_dir():
+        raise FolderNotFoundError(folder)
+    script_name, _, func_name = target.partition(":")
+    if not script_name or not func_name:
+        raise InvalidTargetError(target)
+    try:
+        return resolve_script_path(folder, script_name), func_name
+    except FileNotFoundError:
+        name = script_name if script_name.endswith(".py") else f"{script_name}.py"
+        raise ScriptNotFoundError((folder / name).resolve()) from None
+
+
 def _parse_dotenv(text: str) -> Dict[str, str]:
     env: Dict[str, str] = {}
     for line in text.splitlines():
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import os
 import subprocess
+import sys
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
 
+from supypowers.envs import (
+    current_interpreter_satisfies,
+    default_env_pool,
+    env_pool_enabled,
+    interpreter_mode,
+    uv_environ,
+)
 from supypowers.uv_script_metadata import read_uv_script_dependencies
+from supypowers.wire import WIRE_PREFIX
 
 
 @dataclass(frozen=True)
@@ -17,6 +28,66 @@ class UVRunError(Exception):
     stdout: str
     stderr: str
 
+    def __str__(self) -> str:
+        return self.message
+
+
+def uv_python_command(
+    deps: Sequence[str],
+    code: str,
+    *,
+    args: Sequence[str] = (),
+    quiet: bool = True,
+    env_pool: Optional[bool] = None,
+    interpreter: Optional[str] = None,
+) -> List[str]:
+    """
+    Build the `python -c <code> [args]` command for an environment with `deps`.
+
+    With `interpreter` (default `interpreter_mode()`) `"current"`, or `"auto"` and this
+    interpreter already satisfies `deps`, it runs the code itself and uv is not involved.
+    Otherwise the interpreter of a pooled environment is used directly
+    (building it on first use); if the pool is disabled (`env_pool=False`, or
+    `SUPYPOWERS_ENV_POOL=0` by default) or the environment cannot be built, fall back to
+    `uv run --no-project --with ...`.
+    """
+    mode = interpreter or interpreter_mode()
+    if sys.executable and (mode == "current" or (mode == "auto" and current_interpreter_satisfies(deps))):
+        return [sys.executable, "-c", code, *args]
+
+    if env_pool_enabled() if env_pool is None else env_pool:
+        try:
+            python = default_env_pool().ensure(deps, quiet=quiet)
+            return [str(python), "-c", code, *args]
+        except (OSError, subprocess.CalledProcessError):
+            pass
+
+    cmd = ["uv", "run", "--no-project"]
+    if quiet:
+        cmd.extend(["-q", "--no-progress"])
+    for dep in deps:
+        cmd.extend(["--with", dep])
+    cmd.extend(["python", "-c", code, *args])
+    return cmd
+
+
+def launcher_name(cmd: Sequence[str]) -> str:
+    """
+    How a command from `uv_python_command` starts: `uv run`, `env pool` or `current interpreter`.
+    """
+    if cmd[0] == "uv":
+        return "uv run"
+    return "current interpreter" if cmd[0] == sys.executable else "env pool"
+
+
+def failure_message(cmd: Sequence[str], returncode: int) -> str:
+    """
+    The `UVRunError` message for a command from `uv_python_command` that exited with `returncode`.
+
+    The text is the same whichever launcher ran the script; profiles record the launcher.
+    """
+    return f"`uv run` failed with exit code {returncode}"
+
 
 def uv_run_python_code(
     *,
@@ -25,23 +96,21 @@ def uv_run_python_code(
     payload: dict,
     extra_env: Optional[Dict[str, str]] = None,
     quiet: bool = True,
+    deps: Optional[Sequence[str]] = None,
+    env_pool: Optional[bool] = None,
+    interpreter: Optional[str] = None,
 ) -> str:
     """
-    Execute `python -c <code>` in a uv environment built from `script_path` inline dependencies,
-    sending `payload` via stdin and returning stdout.
+    Execute `python -c <code>` in a uv environment built from `script_path` inline dependencies
+    (or from `deps`, when given), sending `payload` via stdin and returning stdout.
+    `env_pool` and `interpreter` are as for `uv_python_command`.
     """
-    env = os.environ.copy()
-    if extra_env:
-        env.update(extra_env)
+    env = uv_environ(extra_env)
 
-    deps = read_uv_script_dependencies(script_path)
+    if deps is None:
+        deps = read_uv_script_dependencies(script_path)
 
-    cmd = ["uv", "run", "--no-project"]
-    if quiet:
-        cmd.extend(["-q", "--no-progress"])
-    for dep in deps:
-        cmd.extend(["--with", dep])
-    cmd.extend(["python", "-c", code])
+    cmd = uv_python_command(deps, code, quiet=quiet, env_pool=env_pool, interpreter=interpreter)
 
     proc = subprocess.run(
         cmd,
@@ -56,7 +125,7 @@ def uv_run_python_code(
 
     if proc.returncode != 0:
         raise UVRunError(
-            message=f"`uv run` failed with exit code {proc.returncode}",
+            message=failure_message(cmd, proc.returncode),
             exit_code=proc.returncode,
             stdout=stdout,
             stderr=stderr,
@@ -64,3 +133,152 @@ def uv_run_python_code(
 
     return stdout
 
+
+async def uv_run_python_code_async(
+    *,
+    script_path: Path,
+    code: str,
+    payload: dict,
+    extra_env: Optional[Dict[str, str]] = None,
+    quiet: bool = True,
+    deps: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Asyncio counterpart of `uv_run_python_code`, using an asyncio subprocess.
+
+    If the awaiting task is cancelled, the child process is killed.
+    """
+    env = uv_environ(extra_env)
+
+    if deps is None:
+        deps = read_uv_script_dependencies(script_path)
+
+    # Building a pooled environment on first use blocks, so keep it off the event loop.
+    cmd = await asyncio.to_thread(uv_python_command, deps, code, quiet=quiet)
+
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    try:
+        out, err = await proc.communicate(json.dumps(payload).encode("utf-8"))
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+
+    stdout = out.decode("utf-8", errors="replace").strip()
+    stderr = err.decode("utf-8", errors="replace").strip()
+
+    if proc.returncode != 0:
+        raise UVRunError(
+            message=failure_message(cmd, proc.returncode),
+            exit_code=proc.returncode,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+    return stdout
+
+
+def uv_stream_python_code(
+    *,
+    script_path: Path,
+    code: str,
+    input_lines: Iterable[str],
+    args: Sequence[str] = (),
+    extra_env: Optional[Dict[str, str]] = None,
+    quiet: bool = True,
+    timings: Optional[Dict[str, Any]] = None,
+    binary_frames: bool = False,
+    deps: Optional[Sequence[str]] = None,
+) -> Iterator[Union[str, bytes]]:
+    """
+    Like `uv_run_python_code`, but feed `input_lines` to stdin as they are produced and
+    yield stdout lines (without the newline) as the child emits them.
+
+    The environment is built from `deps` when given, as for `uv_run_python_code`.
+
+    With `binary_frames`, a `{"wire": ..., "length": N}` line is followed by N raw bytes,
+    which are yielded (undecoded, as `bytes`) right after it.
+
+    With a `timings` dict, record how long finding the environment took
+    (`environment_ms`), which launcher was used, when the child was spawned
+    (`spawned_at`, epoch seconds) and how long it ran (`process_ms`).
+
+    Raises `UVRunError` once stdout is exhausted if the child exited non-zero.
+    """
+    env = uv_environ(extra_env)
+
+    start = time.perf_counter()
+    if deps is None:
+        deps = read_uv_script_dependencies(script_path)
+    cmd = uv_python_command(deps, code, args=args, quiet=quiet)
+    if timings is not None:
+        timings["environment_ms"] = (time.perf_counter() - start) * 1000
+        timings["launcher"] = launcher_name(cmd)
+        timings["spawned_at"] = time.time()
+    start = time.perf_counter()
+
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    stderr_chunks: List[bytes] = []
+
+    def feed() -> None:
+        try:
+            for line in input_lines:
+                if not line.endswith("\n"):
+                    line += "\n"
+                proc.stdin.write(line.encode("utf-8"))
+                proc.stdin.flush()
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            # The child stopped reading (e.g. it failed to resolve the function).
+            pass
+
+    def drain_stderr() -> None:
+        stderr_chunks.append(proc.stderr.read())
+
+    threads = [
+        threading.Thread(target=feed, daemon=True),
+        threading.Thread(target=drain_stderr, daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        for raw in proc.stdout:
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            yield line
+            if binary_frames and line.startswith(WIRE_PREFIX):
+                yield proc.stdout.read(json.loads(line)["length"])
+                proc.stdout.readline()  # the newline closing the frame
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        if timings is not None:
+            timings["process_ms"] = (time.perf_counter() - start) * 1000
+        for t in threads:
+            t.join(timeout=1)
+        for pipe in (proc.stdin, proc.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    if returncode != 0:
+        raise UVRunError(
+            message=failure_message(cmd, returncode),
+            exit_code=returncode,
+            stdout="",
+            stderr=b"".join(stderr_chunks).decode("utf-8", errors="replace").strip(),
+        )
@@ -75,3 +75,10 @@ def read_uv_script_dependencies(script_path: Path) -> List[str]:
 
     return deps
 
+
+def normalize_dependencies(deps: List[str]) -> List[str]:
+    """
+    Canonical form of a dependency list: stripped, de-duplicated and sorted, so two
+    scripts that declare the same set in a different order share one environment.
+    """
+    return sorted({" ".join(d.split()) for d in deps if d.strip()})
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from supypowers.docs import discover_scripts
+
+# Folder watching for `docs --watch`.
+#
+# inotify (Linux) only wakes the watcher up; what changed is always worked out by comparing
+# (mtime, size) snapshots of the scripts, which is also the whole mechanism when inotify is
+# not available and the folder is polled instead.
+
+Snapshot = Dict[Path, Tuple[int, int]]
+
+# IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+# IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_INOTIFY_MASK = 0x2 | 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+
+
+def snapshot(folder: Path, recursive: bool) -> Snapshot:
+    """
+    `(mtime_ns, size)` of every script `docs` would document in `folder`.
+    """
+    snap: Snapshot = {}
+    for path in discover_scripts(folder, recursive):
+        try:
+            st = path.stat()
+        except OSError:
+            continue  # deleted while scanning
+        snap[path] = (st.st_mtime_ns, st.st_size)
+    return snap
+
+
+def diff(old: Snapshot, new: Snapshot) -> Tuple[List[Path], List[Path]]:
+    """
+    The scripts that were added or changed, and the ones that were removed, sorted.
+    """
+    changed = sorted(path for path, stamp in new.items() if old.get(path) != stamp)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """
+    Replace `path` with `text` in one step, so readers never see a partial file.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched: Set[Path] = set()
+
+    def watch(self, directory: Path) -> None:
+        if directory in self._watched:
+            return
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _INOTIFY_MASK) >= 0:
+            self._watched.add(directory)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Report the scripts in `folder` that are added, changed or removed.
+
+    Uses inotify where available (unless `use_inotify` is false) and otherwise polls every
+    `poll_interval` seconds; `method` says which. Bursts of events (an editor saving a
+    file in several steps) are coalesced for `debounce` seconds.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        recursive: bool = False,
+        *,
+        poll_interval: float = 1.0,
+        debounce: float = 0.1,
+        use_inotify: Optional[bool] = None,
+    ) -> None:
+        self.folder = folder
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.snapshot = snapshot(folder, recursive)
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify is not False:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                # No inotify (not Linux, or a libc without it): poll instead.
+                self._inotify = None
+        self.method = "inotify" if self._inotify is not None else "polling"
+        self._watch_dirs()
+
+    def _watch_dirs(self) -> None:
+        if self._inotify is None:
+            return
+        self._inotify.watch(self.folder)
+        if self.recursive:
+            for path in self.folder.rglob("*"):
+                if path.is_dir():
+                    self._inotify.watch(path)
+
+    def poll(self, timeout: Optional[float] = None) -> Tuple[List[Path], List[Path]]:
+        """
+        Wait up to `timeout` seconds (None: until something changes) and return the
+        scripts added or changed and the scripts removed since the last call.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self._inotify is not None:
+                woke = self._inotify.wait(remaining)
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                woke = True
+            if woke:
+                if self._inotify is not None:
+                    time.sleep(self.debounce)
+                    self._inotify.wait(0)
+                    self._watch_dirs()
+                current = snapshot(self.folder, self.recursive)
+                changed, removed = diff(self.snapshot, current)
+                self.snapshot = current
+                if changed or removed:
+                    return changed, removed
+            if deadline is not None and time.monotonic() >= deadline:
+                return [], []
+
+    def __iter__(self) -> Iterator[Tuple[List[Path], List[Path]]]:
+        while True:
+            yield self.poll()
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
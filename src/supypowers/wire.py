@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+import marshal
+from typing import Any, List, Sequence
+
+from supypowers.requirements import parse_requirement
+
+# Wire formats for results sent from the runner to the parent.
+#
+# JSON is always available. With a binary format, a plain function's result travels as
+# one binary frame: a `{"wire": <format>, "length": N}` line followed by N bytes. `msgpack`
+# is negotiated: the parent asks for it only if it can decode it (and then has it
+# installed in the runner's environment), else for `marshal`, the standard library's
+# binary codec, which every runner has. A runner that cannot encode the result in the
+# requested format (a type the codec does not know) answers in JSON. Streamed items and
+# errors are always JSON lines.
+
+WIRE_FORMATS = ("json", "msgpack", "marshal")
+WIRE_PREFIX = '{"wire": '
+# marshal's format version 4 is read by every Python 3.4+, whatever runs the script.
+MARSHAL_VERSION = 4
+
+
+def msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negotiate(requested: str) -> str:
+    """
+    The wire format to request from the runner: `json` or `marshal` as requested, and for
+    `msgpack`, `msgpack` if this process can decode it, else `marshal`.
+    """
+    if requested not in WIRE_FORMATS:
+        raise ValueError(f"unknown wire format: {requested}")
+    if requested == "msgpack" and not msgpack_available():
+        return "marshal"
+    return requested
+
+
+def codec_dependencies(deps: Sequence[str], wire_format: str) -> List[str]:
+    """
+    `deps` plus what the runner needs to answer in `wire_format` (a negotiated format):
+    `msgpack`, unless the script already depends on it.
+    """
+    deps = list(deps)
+    if wire_format == "msgpack" and not any(
+        (req := parse_requirement(dep)) is not None and req.name == "msgpack" for dep in deps
+    ):
+        deps.append("msgpack")
+    return deps
+
+
+def decode_frame(header: str, data: bytes) -> Any:
+    """
+    Decode the binary frame announced by `header` (a `{"wire": ...}` line).
+    """
+    fmt = json.loads(header)["wire"]
+    if fmt == "msgpack":
+        import msgpack
+
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if fmt == "marshal":
+        return marshal.loads(data)
+    raise ValueError(f"unknown wire format: {fmt}")
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import json
+import socketserver
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from supypowers import __version__
+from supypowers.cache import hash_key
+from supypowers.docs import discover_scripts, docs_cache, inspect_scripts
+from supypowers.serve import WorkerPool, handle_request_line
+from supypowers.uv_script_metadata import normalize_dependencies, read_uv_script_dependencies
+
+# The network worker daemon (`supypowers worker`).
+#
+# A worker serves one folder over TCP with the `serve` JSON-lines protocol, answered by
+# its own pool of warm runner interpreters, plus two more requests for dispatchers:
+#
+#   {"op": "health"}  ->  {"ok": true, "version", "in_flight", "scripts": {script: deps hash}}
+#   {"op": "docs", "recursive"?, "require_marker"?, "static"?}  ->  {"ok": true, "docs": [...]}
+#
+# `scripts` maps each script (as a target names it) to a hash of its dependency set, which
+# dispatchers use to send scripts that share an environment to the same worker. With a
+# token, every request must carry `"token": <token>`.
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Split `host:port` (or `[v6 host]:port`) into host and port.
+    """
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"address must be in the form host:port: {address}")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def is_loopback(host: str) -> bool:
+    """
+    Whether `host` only accepts connections from this machine (`localhost` or a loopback
+    address). Other host names count as reachable from the network.
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def dependency_hash(script_path: Path) -> str:
+    """
+    A short hash of a script's normalized dependency set.
+    """
+    return hash_key({"dependencies": normalize_dependencies(read_uv_script_dependencies(script_path))})[:16]
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """
+    Serve `folder` on `address` with the worker protocol; `serve_forever()` runs it.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        pool: WorkerPool,
+        folder: Path,
+        *,
+        extra_env: Optional[Dict[str, str]] = None,
+        token: Optional[str] = None,
+    ) -> None:
+        self.pool = pool
+        self.folder = folder
+        self.extra_env = extra_env
+        self.token = token
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        # Script -> ((mtime_ns, size), dependency hash), so health checks re-read only edited scripts.
+        self._hashes: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        super().__init__(address, _Handler)
+
+    @property
+    def address(self) -> str:
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def health(self) -> dict:
+        scripts = {}
+        for script_path in discover_scripts(self.folder, recursive=True):
+            try:
+                st = script_path.stat()
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            cached = self._hashes.get(script_path)
+            if cached is None or cached[0] != stamp:
+                cached = self._hashes[script_path] = (stamp, dependency_hash(script_path))
+            scripts[script_path.relative_to(self.folder).with_suffix("").as_posix()] = cached[1]
+        with self._lock:
+            in_flight = self.in_flight
+        return {"ok": True, "version": __version__, "in_flight": in_flight, "scripts": scripts}
+
+    def docs(self, req: dict) -> dict:
+        entries = inspect_scripts(
+            discover_scripts(self.folder, bool(req.get("recursive"))),
+            require_marker=bool(req.get("require_marker")),
+            extra_env=self.extra_env,
+            cache=docs_cache(),
+            static=bool(req.get("static")),
+        )
+        return {"ok": True, "docs": entries}
+
+    def handle_line(self, line: str) -> str:
+        """
+        Answer one request line.
+        """
+        try:
+            req = json.loads(line)
+        except ValueError:
+            return json.dumps({"ok": False, "error": "request must be a JSON object"})
+        if not isinstance(req, dict):
+            return json.dumps({"ok": False, "error": "request must be a JSON object"})
+        if self.token is not None and not hmac.compare_digest(str(req.get("token", "")), self.token):
+            return json.dumps({"ok": False, "error": "invalid or missing worker token"})
+        op = req.get("op", "run")
+        if op == "health":
+            return json.dumps(self.health())
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if op == "docs":
+                return json.dumps(self.docs(req), ensure_ascii=False)
+            if op == "run":
+                return handle_request_line(self.pool, self.folder, line)
+            return json.dumps({"ok": False, "error": f"unknown op: {op}"})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: WorkerServer
+
+    def handle(self) -> None:
+        for raw in self.rfile:
+            line = raw.decode("utf-8", errors="replace")
+            if not line.strip():
+                continue
+            self.wfile.write((self.server.handle_line(line) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+def serve_worker(server: WorkerServer) -> None:
+    """
+    Run `server` until interrupted.
+    """
+    sys.stderr.write(f"supypowers: worker listening on {server.address}\n")
+    sys.stderr.flush()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
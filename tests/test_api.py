@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import supypowers
+
+ROOT = Path(__file__).resolve().parents[1]
+EXAMPLES = ROOT / "examples"
+
+
+class TestLibraryAPI(unittest.TestCase):
+    def test_usage_errors_are_raised(self) -> None:
+        with self.assertRaises(supypowers.FolderNotFoundError):
+            supypowers.run(ROOT / "missing", "a:b", {})
+        with self.assertRaises(supypowers.InvalidTargetError):
+            supypowers.run(EXAMPLES, "exponents", {})
+        with self.assertRaises(supypowers.ScriptNotFoundError) as ctx:
+            supypowers.run(EXAMPLES, "nope:f", {})
+        self.assertEqual(ctx.exception.to_dict()["ok"], False)
+        with self.assertRaises(supypowers.ScriptNotFoundError):
+            supypowers.run(EXAMPLES, "../tests/test_api:f", {})
+        with self.assertRaises(supypowers.FolderNotFoundError):
+            supypowers.docs(ROOT / "missing")
+
+    def test_run_returns_typed_results(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            old = os.environ.get("SUPYPOWERS_CACHE_DIR")
+            os.environ["SUPYPOWERS_CACHE_DIR"] = tmp
+            try:
+                ok = supypowers.run(EXAMPLES, "exponents:compute_sqrt", {"x": 16})
+                failed = supypowers.run(EXAMPLES, "exponents:compute_sqrt", '{"x": "four"}')
+                with self.assertRaises(supypowers.RunError) as ctx:
+                    supypowers.run(EXAMPLES, "exponents:compute_sqrt", {"x": "four"}, check=True)
+            finally:
+                if old is None:
+                    os.environ.pop("SUPYPOWERS_CACHE_DIR", None)
+                else:
+                    os.environ["SUPYPOWERS_CACHE_DIR"] = old
+
+        self.assertTrue(ok.ok)
+        self.assertEqual(ok.data, {"result": 4.0})
+        self.assertEqual(ok.exit_code, 0)
+        self.assertFalse(failed.ok)
+        self.assertNotEqual(failed.exit_code, 0)
+        self.assertEqual(ctx.exception.result, failed)
+
+    def test_profile_reports_parent_and_runner_phases(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        result = supypowers.run(EXAMPLES, "exponents:compute_sqrt", {"x": 4}, profile=True)
+        self.assertEqual(result.response, {"ok": True, "data": {"result": 2.0}})
+        phases = result.profile["phases"]
+        for phase in ("resolve_ms", "environment_ms", "startup_ms", "import_ms", "type_hints_ms",
+                      "validation_ms", "function_ms", "serialization_ms"):
+            self.assertGreaterEqual(phases[phase], 0)
+        self.assertGreater(result.profile["child"]["max_rss_bytes"], 0)
+        self.assertIn("user_cpu_ms", result.profile["child"])
+        self.assertIsNone(supypowers.run(EXAMPLES, "exponents:compute_sqrt", {"x": 4}).profile)
+
+    def test_generator_results_stream(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            (folder / "gen.py").write_text(_GENERATOR_SCRIPT, encoding="utf-8")
+            old = os.environ.get("SUPYPOWERS_CACHE_DIR")
+            os.environ["SUPYPOWERS_CACHE_DIR"] = tmp
+            try:
+                lines = supypowers.run_stream(folder, "gen:count", {"n": 3})
+                frames = [json.loads(line) for line in lines]
+                items = list(supypowers.stream(folder, "gen:count", {"n": 2}))
+                collected = supypowers.run(folder, "gen:count", {"n": 2})
+                with self.assertRaises(supypowers.RunError) as ctx:
+                    list(supypowers.stream(folder, "gen:count", {"n": 3, "fail_at": 1}))
+            finally:
+                if old is None:
+                    os.environ.pop("SUPYPOWERS_CACHE_DIR", None)
+                else:
+                    os.environ["SUPYPOWERS_CACHE_DIR"] = old
+
+        self.assertEqual(lines.exit_code, 0)
+        self.assertEqual(frames[0], {"ok": True, "stream": True})
+        self.assertEqual([f["item"] for f in frames[1:-1]], [{"i": 0}, {"i": 1}, {"i": 2}])
+        self.assertEqual(frames[-1], {"ok": True, "done": True, "count": 3})
+        self.assertEqual(items, [{"i": 0}, {"i": 1}])
+        self.assertEqual(collected.data, [{"i": 0}, {"i": 1}])
+        self.assertEqual(ctx.exception.result.response, {"ok": False, "error": "failed at 1"})
+
+    def test_offline_mode_installs_only_from_the_wheel_cache(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        from supypowers.envs import uv_environ
+
+        script = "# /// script\n# dependencies = [\"pydantic\", \"supypowers-never-synced\"]\n# ///\n"
+        script += "from pydantic import BaseModel\nclass I(BaseModel):\n    x: int\ndef f(input: I) -> int:\n    return input.x\n"
+        saved = {name: os.environ.get(name) for name in ("SUPYPOWERS_CACHE_DIR", "SUPYPOWERS_OFFLINE")}
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SUPYPOWERS_CACHE_DIR"] = tmp
+            os.environ["SUPYPOWERS_OFFLINE"] = "1"
+            try:
+                env = uv_environ()
+                (Path(tmp) / "needs.py").write_text(script, encoding="utf-8")
+                result = supypowers.run(tmp, "needs:f", {"x": 1}, use_cache=False)
+            finally:
+                for name, value in saved.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+        self.assertEqual(env["UV_OFFLINE"], "1")
+        self.assertEqual(env["UV_CACHE_DIR"], str(Path(tmp) / "wheels"))
+        # Nothing was synced, so the call fails instead of downloading the dependency.
+        self.assertFalse(result.ok)
+        self.assertIn("network was disabled", result.response.get("uv_stderr", ""))
+
+    def test_input_and_output_files(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            (folder / "gen.py").write_text(_GENERATOR_SCRIPT, encoding="utf-8")
+            (folder / "in.json").write_text('{"n": 3}', encoding="utf-8")
+            old = os.environ.get("SUPYPOWERS_CACHE_DIR")
+            os.environ["SUPYPOWERS_CACHE_DIR"] = tmp
+            try:
+                # `total` prints to stdout; that must not end up in the result.
+                result = supypowers.run(folder, "gen:total", input_file=folder / "in.json")
+                summary = list(
+                    supypowers.run_stream(
+                        folder, "gen:count", input_file=folder / "in.json", output_file=folder / "out.ndjson"
+                    )
+                )
+                failed = list(supypowers.run_stream(folder, "gen:total", {"n": -1}, output_file=folder / "err.json"))
+                frames = (folder / "out.ndjson").read_text(encoding="utf-8").splitlines()
+                error = json.loads((folder / "err.json").read_text(encoding="utf-8"))
+                leftovers = [p.name for p in folder.iterdir() if p.name.endswith(".tmp")]
+                with self.assertRaises(supypowers.InputFileNotFoundError):
+                    supypowers.run(folder, "gen:total", input_file=folder / "missing.json")
+                with self.assertRaises(supypowers.UsageError):
+                    supypowers.run(folder, "gen:total", {"n": 1}, input_file=folder / "in.json")
+            finally:
+                if old is None:
+                    os.environ.pop("SUPYPOWERS_CACHE_DIR", None)
+                else:
+                    os.environ["SUPYPOWERS_CACHE_DIR"] = old
+
+        self.assertEqual(result.response, {"ok": True, "data": 3})
+        self.assertEqual(json.loads(summary[0]), {"ok": True, "output_file": str((folder / "out.ndjson").resolve())})
+        self.assertEqual(json.loads(frames[-1]), {"ok": True, "done": True, "count": 3})
+        self.assertEqual(len(frames), 5)
+        self.assertFalse(json.loads(failed[0])["ok"])
+        self.assertFalse(error["ok"])
+        self.assertIn("negative", error["uv_stdout"])
+        self.assertEqual(leftovers, [])
+
+
+_GENERATOR_SCRIPT = """# /// script
+# dependencies = ["pydantic"]
+# ///
+from typing import Iterator
+from pydantic import BaseModel
+
+class In(BaseModel):
+    n: int
+    fail_at: int = -1
+
+class Item(BaseModel):
+    i: int
+
+def count(input: In) -> Iterator[Item]:
+    for i in range(input.n):
+        if i == input.fail_at:
+            raise ValueError(f"failed at {i}")
+        yield Item(i=i)
+
+def total(input: In) -> int:
+    print("stray output")
+    if input.n < 0:
+        raise ValueError("negative n")
+    return input.n
+"""
+
+
+if __name__ == "__main__":
+    unittest.main()
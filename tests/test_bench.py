@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+
+from supypowers.bench import BenchCase, load_suite, parse_case, percentile, summarize
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class TestBench(unittest.TestCase):
+    def test_percentiles_interpolate(self) -> None:
+        samples = [float(x) for x in range(1, 101)]
+        self.assertAlmostEqual(percentile(samples, 50), 50.5)
+        self.assertAlmostEqual(percentile(samples, 99), 99.01)
+        self.assertEqual(percentile([7.0], 95), 7.0)
+        self.assertEqual(summarize([1.0, 3.0])["mean"], 2.0)
+        self.assertIsNone(summarize([]))
+
+    def test_cases_from_specs_and_default_suite(self) -> None:
+        self.assertEqual(parse_case('a:b={"x": 1}'), BenchCase("a:b", '{"x": 1}'))
+        self.assertEqual(parse_case("a:b"), BenchCase("a:b", "{}"))
+        suite = load_suite(ROOT / "examples" / "bench.json")
+        self.assertIn("exponents:compute_sqrt", [case.target for case in suite])
+
+
+if __name__ == "__main__":
+    unittest.main()
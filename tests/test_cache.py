@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from supypowers.cache import DiskCache
+from supypowers.envs import EnvPool
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "cache"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_hit_miss_and_persisted_stats(self) -> None:
+        cache = DiskCache(self.root, max_bytes=1024 * 1024)
+        self.assertIsNone(cache.get("a" * 64))
+        cache.put("a" * 64, {"functions": []})
+        self.assertEqual(cache.get("a" * 64), {"functions": []})
+        cache.flush_stats()
+
+        stats = DiskCache(self.root, max_bytes=1024 * 1024).stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_concurrent_flushes_are_all_counted(self) -> None:
+        def flush() -> None:
+            # One instance per thread, like separate processes sharing the directory.
+            cache = DiskCache(self.root, max_bytes=1024 * 1024)
+            for _ in range(5):
+                cache.get("f" * 64)
+                cache.flush_stats()
+
+        threads = [threading.Thread(target=flush) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(DiskCache(self.root, max_bytes=1024 * 1024).stats()["misses"], 40)
+
+    def test_evicts_least_recently_used_first(self) -> None:
+        cache = DiskCache(self.root, max_bytes=10_000)
+        payload = "x" * 3000
+        keys = [c * 64 for c in "abcd"]
+        for i, key in enumerate(keys):
+            cache.put(key, payload)
+            # Spread mtimes out; `a` is then read so `b` becomes the oldest entry.
+            past = time.time() - 100 + i
+            os.utime(self.root / key[:2] / f"{key}.json", (past, past))
+        cache.get(keys[0])
+        cache.evict()
+
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[0]), payload)
+        self.assertEqual(cache.get(keys[3]), payload)
+
+    def test_put_json_file_copies_serialized_value(self) -> None:
+        cache = DiskCache(self.root, max_bytes=1024 * 1024)
+        source = Path(self._tmp.name) / "response.json"
+        source.write_text('{"ok": true, "data": [1, 2]}\n', encoding="utf-8")
+        cache.put_json_file("f" * 64, source)
+        self.assertEqual(cache.get("f" * 64), {"ok": True, "data": [1, 2]})
+
+    def test_expired_entries_are_misses(self) -> None:
+        cache = DiskCache(self.root, max_bytes=1024 * 1024)
+        cache.put("e" * 64, 1, ttl=-1)
+        self.assertIsNone(cache.get("e" * 64))
+
+
+class TestEnvPool(unittest.TestCase):
+    def test_prune_keeps_recent_and_locked_environments(self) -> None:
+        if sys.platform == "win32":
+            raise unittest.SkipTest("environment locks need fcntl")
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = EnvPool(Path(tmp), max_bytes=0)
+            for name, age in (("old", 3600), ("busy", 3600), ("recent", 0)):
+                env_dir = pool.root / pool.key([name])
+                (env_dir / "bin").mkdir(parents=True)
+                (env_dir / "bin" / "python").touch()
+                meta = env_dir / "supypowers-env.json"
+                meta.write_text(json.dumps({"dependencies": [name], "bytes": 100}), encoding="utf-8")
+                os.utime(meta, (time.time() - age, time.time() - age))
+            # Another pool using an environment holds its lock, as another process would.
+            other = EnvPool(pool.root)
+            self.assertIsNotNone(other.python_for(["busy"]))
+            os.utime(pool.root / pool.key(["busy"]) / "supypowers-env.json", (time.time() - 3600,) * 2)
+
+            removed = pool.prune(grace=60)
+            self.assertEqual([env["dependencies"] for env in removed], [["old"]])
+            self.assertEqual(sorted(env["dependencies"][0] for env in pool.list()), ["busy", "recent"])
+
+    def test_keys_change_once_environments_reach_max_age(self) -> None:
+        saved = os.environ.get("SUPYPOWERS_ENV_MAX_AGE")
+        try:
+            os.environ["SUPYPOWERS_ENV_MAX_AGE"] = "60"
+            keys = {EnvPool.key(["rich"], now=now) for now in range(0, 600, 60)}
+            self.assertEqual(len(keys), 10)
+            os.environ["SUPYPOWERS_ENV_MAX_AGE"] = "0"
+            self.assertEqual(EnvPool.key(["rich"], now=0), EnvPool.key(["rich"], now=600))
+        finally:
+            if saved is None:
+                os.environ.pop("SUPYPOWERS_ENV_MAX_AGE", None)
+            else:
+                os.environ["SUPYPOWERS_ENV_MAX_AGE"] = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,13 +4,29 @@ import json
 import os
 import shutil
 import subprocess
+import tempfile
+import time
 import unittest
 from pathlib import Path
 
+from supypowers.docs import DocsPlan, discover_scripts
+
 
 ROOT = Path(__file__).resolve().parents[1]
 EXAMPLES = ROOT / "examples"
 
+_CACHE_DIR = tempfile.TemporaryDirectory()
+
+
+def setUpModule() -> None:
+    # Keep the tests away from the user's real supypowers cache.
+    os.environ["SUPYPOWERS_CACHE_DIR"] = _CACHE_DIR.name
+
+
+def tearDownModule() -> None:
+    os.environ.pop("SUPYPOWERS_CACHE_DIR", None)
+    _CACHE_DIR.cleanup()
+
 
 def _run_uv_superpowers(*args: str) -> dict:
     """
@@ -68,6 +84,82 @@ class TestCLI(unittest.TestCase):
         self.assertIn("compute_sqrt", fn_names)
         self.assertIn("compute_different_power", fn_names)
 
+    def test_docs_jobs_preserves_order(self) -> None:
+        serial = _run_uv_superpowers("docs", str(EXAMPLES), "--jobs", "1")
+        parallel = _run_uv_superpowers("docs", str(EXAMPLES), "--jobs", "4")
+        self.assertEqual(serial, parallel)
+        scripts = [item["script"] for item in parallel]
+        self.assertEqual(scripts, sorted(scripts))
+
+    def test_docs_plan_splits_groups_for_jobs(self) -> None:
+        scripts = discover_scripts(EXAMPLES, recursive=False)
+        plan = DocsPlan(scripts, require_marker=False, chunks=3)
+        self.assertEqual(len(plan.groups), 3)
+        self.assertEqual(sorted(p for _, group in plan.groups for p in group), scripts)
+        self.assertEqual(len(DocsPlan(scripts, require_marker=False).groups), 2)  # __init__.py declares no dependencies
+
+    def test_docs_uses_one_process_per_dependency_set_by_default(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            pids = Path(tmp) / "pids"
+            folder = Path(tmp) / "scripts"
+            folder.mkdir()
+            for name in "abcd":
+                # Each script records the process that imported it.
+                (folder / f"{name}.py").write_text(
+                    "# /// script\n"
+                    '# dependencies = ["pydantic"]\n'
+                    "# ///\n"
+                    "import os\n"
+                    f"with open({str(pids)!r}, 'a') as f:\n"
+                    "    f.write(f'{os.getpid()}\\n')\n"
+                    "from pydantic import BaseModel\n"
+                    "class In(BaseModel):\n"
+                    "    x: int\n"
+                    f"def {name}(input: In) -> int:\n"
+                    "    return input.x\n",
+                    encoding="utf-8",
+                )
+            out = _run_uv_superpowers("docs", str(folder), "--no-cache")
+            self.assertEqual(len(out), 4)
+            self.assertEqual(len(set(pids.read_text().split())), 1)
+            # An explicit --jobs splits the set.
+            pids.unlink()
+            _run_uv_superpowers("docs", str(folder), "--no-cache", "--jobs", "2")
+            self.assertEqual(len(set(pids.read_text().split())), 2)
+
+    def test_docs_cache_serves_unchanged_scripts(self) -> None:
+        _run_uv_superpowers("cache", "clear")
+        first = _run_uv_superpowers("docs", str(EXAMPLES))
+        second = _run_uv_superpowers("docs", str(EXAMPLES))
+        uncached = _run_uv_superpowers("docs", str(EXAMPLES), "--no-cache")
+        self.assertEqual(first, second)
+        self.assertEqual(first, uncached)
+        stats = _run_uv_superpowers("cache", "stats")["docs"]
+        self.assertEqual(stats["hits"], len(first))
+        self.assertEqual(stats["misses"], len(first))
+
+    def test_docs_static_matches_runtime_inspection(self) -> None:
+        static = _run_uv_superpowers("docs", str(EXAMPLES), "--static", "--no-cache")
+        runtime = _run_uv_superpowers("docs", str(EXAMPLES), "--no-cache")
+        self.assertEqual(static, runtime)
+
+    def test_docs_isolates_broken_script_in_shared_environment(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            shutil.copy(EXAMPLES / "strings.py", folder / "strings.py")
+            (folder / "broken.py").write_text(
+                '# /// script\n# dependencies = ["pydantic"]\n# ///\nraise RuntimeError("boom")\n',
+                encoding="utf-8",
+            )
+            docs = _run_uv_superpowers("docs", str(folder), "--no-cache")
+        by_script = {Path(item["script"]).name: item for item in docs}
+        self.assertIn("boom", by_script["broken.py"]["error"])
+        self.assertEqual(by_script["broken.py"]["functions"], [])
+        fn_names = {f["name"] for f in by_script["strings.py"]["functions"]}
+        self.assertEqual(fn_names, {"count_vowels", "reverse_string"})
+
     def test_docs_markdown_renders(self) -> None:
         # Just ensure it runs and produces markdown-like output.
         cmd = ["uv", "run", "supypowers", "docs", str(EXAMPLES), "--format", "md"]
@@ -108,6 +200,217 @@ class TestCLI(unittest.TestCase):
         self.assertTrue(out["ok"])
         self.assertEqual(out["data"], "hi")
 
+    def test_run_batch_streams_one_result_per_line(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        records = ['{"s": "abc"}', "{'s': 'xy'}", '{"t": 1}', "", '{"s": ""}']
+        proc = subprocess.run(
+            ["uv", "run", "supypowers", "run", str(EXAMPLES), "strings:reverse_string", "--batch", "-"],
+            cwd=str(ROOT),
+            input="\n".join(records) + "\n",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=os.environ.copy(),
+            text=True,
+        )
+        # One bad record fails the batch exit code but not the other records.
+        self.assertEqual(proc.returncode, 1, msg=f"stderr={proc.stderr}")
+        results = [json.loads(line) for line in proc.stdout.splitlines()]
+        self.assertEqual([r["ok"] for r in results], [True, True, False, False, True])
+        self.assertEqual(results[0]["data"]["result"], "cba")
+        self.assertEqual(results[1]["data"]["result"], "yx")
+        # A blank record keeps its place instead of shifting later results up.
+        self.assertEqual(results[3], {"ok": False, "error": "empty input line"})
+
+    def test_warm_env_list_and_prune(self) -> None:
+        warm = _run_uv_superpowers("warm", str(EXAMPLES))
+        self.assertTrue(warm["ok"])
+        envs = _run_uv_superpowers("env", "list")["environments"]
+        self.assertIn(["pydantic"], [e["dependencies"] for e in envs])
+
+        out = _run_uv_superpowers("run", str(EXAMPLES), "exponents:compute_sqrt", "{'x': 16}")
+        self.assertEqual(out["data"]["result"], 4.0)
+
+        removed = _run_uv_superpowers("env", "prune", "--all")["removed"]
+        self.assertEqual(len(removed), len(envs))
+        self.assertEqual(_run_uv_superpowers("env", "list")["environments"], [])
+
+    def test_docs_watch_patches_changed_entries(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp) / "tools"
+            folder.mkdir()
+            shutil.copy(EXAMPLES / "strings.py", folder / "strings.py")
+            output = Path(tmp) / "docs.json"
+            proc = subprocess.Popen(
+                ["uv", "run", "supypowers", "docs", str(folder), "--output", str(output), "--static", "--watch"],
+                cwd=str(ROOT),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                env=os.environ.copy(),
+                text=True,
+            )
+
+            def wait_for(expected: list) -> list:
+                deadline = time.monotonic() + 30
+                current = None
+                while time.monotonic() < deadline and current != expected:
+                    time.sleep(0.1)
+                    if output.exists():
+                        current = [Path(e["script"]).name for e in json.loads(output.read_text(encoding="utf-8"))]
+                return current
+
+            try:
+                initial = wait_for(["strings.py"])
+                shutil.copy(EXAMPLES / "dates.py", folder / "dates.py")
+                added = wait_for(["dates.py", "strings.py"])
+                (folder / "strings.py").unlink()
+                removed = wait_for(["dates.py"])
+            finally:
+                proc.terminate()
+                _, stderr = proc.communicate(timeout=10)
+
+        self.assertEqual(initial, ["strings.py"])
+        self.assertEqual(added, ["dates.py", "strings.py"])
+        self.assertEqual(removed, ["dates.py"])
+        self.assertIn('"removed": [', stderr)
+
+    def test_bench_reports_each_path(self) -> None:
+        report = _run_uv_superpowers(
+            "bench",
+            str(EXAMPLES),
+            'exponents:compute_sqrt={"x": 4}',
+            "--iterations",
+            "2",
+            "--paths",
+            "run",
+            "serve",
+            "batch",
+        )
+        self.assertTrue(report["ok"])
+        paths = report["results"][0]["paths"]
+        self.assertEqual(set(paths), {"run", "serve", "batch"})
+        for result in paths.values():
+            self.assertEqual(result["errors"], 0)
+            self.assertEqual(set(result["warm_ms"]), {"p50", "p95", "p99", "mean", "min", "max"})
+            self.assertGreater(result["throughput_per_s"], 0)
+
+    def test_serve_matches_run_output(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        requests = [
+            ("exponents:compute_sqrt", "{'x': 9}"),
+            ("strings:reverse_string", "{'s': 'abc'}"),
+            ("exponents:no_such_function", "{}"),
+        ]
+        stdin = "".join(json.dumps({"target": t, "input_data": d}) + "\n" for t, d in requests)
+        proc = subprocess.run(
+            ["uv", "run", "supypowers", "serve", str(EXAMPLES)],
+            cwd=str(ROOT),
+            input=stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=os.environ.copy(),
+            text=True,
+        )
+        self.assertEqual(proc.returncode, 0, msg=f"stderr={proc.stderr}")
+        served = proc.stdout.splitlines()
+        self.assertEqual(len(served), len(requests))
+        for (target, data), line in zip(requests, served):
+            run = subprocess.run(
+                ["uv", "run", "supypowers", "run", str(EXAMPLES), target, data],
+                cwd=str(ROOT),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=os.environ.copy(),
+                text=True,
+            )
+            self.assertEqual(line, run.stdout.strip())
+
+    def test_serve_matches_run_for_generators_and_unknown_targets(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "gen.py").write_text(
+                "# /// script\n"
+                '# dependencies = ["pydantic"]\n'
+                "# ///\n"
+                "from pydantic import BaseModel\n"
+                "class In(BaseModel):\n"
+                "    n: int\n"
+                "def count(input: In):\n"
+                "    for i in range(abs(input.n)):\n"
+                "        yield {'i': i}\n"
+                "    if input.n < 0:\n"
+                "        raise ValueError('negative')\n",
+                encoding="utf-8",
+            )
+            requests = [("gen:count", "{'n': 2}"), ("gen:count", "{'n': -1}"), ("nope:count", "{}"), ("gen", "{}")]
+            stdin = "".join(json.dumps({"target": t, "input_data": d}) + "\n" for t, d in requests)
+            served = subprocess.run(
+                ["uv", "run", "supypowers", "serve", tmp],
+                cwd=str(ROOT),
+                input=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=os.environ.copy(),
+                text=True,
+            )
+            runs = [
+                subprocess.run(
+                    ["uv", "run", "supypowers", "run", tmp, target, data],
+                    cwd=str(ROOT),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env=os.environ.copy(),
+                    text=True,
+                ).stdout
+                for target, data in requests
+            ]
+        self.assertEqual(served.returncode, 0, msg=f"stderr={served.stderr}")
+        self.assertEqual(served.stdout, "".join(runs))
+        self.assertIn('{"ok": true, "done": true, "count": 2}', served.stdout)
+
+    def test_fork_server_isolates_requests(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        if not hasattr(os, "fork"):
+            raise unittest.SkipTest("os.fork is not available")
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "state.py").write_text(
+                "# /// script\n"
+                '# dependencies = ["pydantic"]\n'
+                "# ///\n"
+                "import os\n"
+                "from pydantic import BaseModel\n"
+                "CALLS = []\n"
+                "class In(BaseModel):\n"
+                "    exit: bool = False\n"
+                "def count(input: In) -> int:\n"
+                "    if input.exit:\n"
+                "        os._exit(3)\n"
+                "    CALLS.append(1)\n"
+                "    return len(CALLS)\n",
+                encoding="utf-8",
+            )
+            inputs = [{}, {}, {"exit": True}, {}]
+            stdin = "".join(json.dumps({"target": "state:count", "input_data": d}) + "\n" for d in inputs)
+            proc = subprocess.run(
+                ["uv", "run", "supypowers", "serve", tmp, "--fork"],
+                cwd=str(ROOT),
+                input=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=os.environ.copy(),
+                text=True,
+            )
+        self.assertEqual(proc.returncode, 0, msg=f"stderr={proc.stderr}")
+        served = [json.loads(line) for line in proc.stdout.splitlines()]
+        # Every call starts from the state the worker had before forking.
+        self.assertEqual([r.get("data") for r in served], [1, 1, None, 1])
+        self.assertEqual(served[2]["exit_code"], 3)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from supypowers import AsyncClient, InvalidTargetError
+
+ROOT = Path(__file__).resolve().parents[1]
+EXAMPLES = ROOT / "examples"
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        self._tmp = tempfile.TemporaryDirectory()
+        self._old_cache = os.environ.get("SUPYPOWERS_CACHE_DIR")
+        os.environ["SUPYPOWERS_CACHE_DIR"] = self._tmp.name
+
+    def tearDown(self) -> None:
+        if self._old_cache is None:
+            os.environ.pop("SUPYPOWERS_CACHE_DIR", None)
+        else:
+            os.environ["SUPYPOWERS_CACHE_DIR"] = self._old_cache
+        self._tmp.cleanup()
+
+    def test_concurrent_runs_and_docs(self) -> None:
+        async def main():
+            client = AsyncClient(max_concurrency=2)
+            runs = asyncio.gather(
+                *(client.run(EXAMPLES, "exponents:compute_sqrt", {"x": x}) for x in (4, 9, 16))
+            )
+            return await runs, await client.run(EXAMPLES, "exponents:missing", "{}"), await client.docs(EXAMPLES)
+
+        results, missing, docs = asyncio.run(main())
+        self.assertEqual([r.data["result"] for r in results], [2.0, 3.0, 4.0])
+        self.assertFalse(missing.ok)
+        self.assertIn("function not found", missing.response["uv_stdout"])
+        by_script = {Path(item["script"]).name: item for item in docs}
+        fn_names = {f["name"] for f in by_script["exponents.py"]["functions"]}
+        self.assertIn("compute_sqrt", fn_names)
+
+    def test_rejects_malformed_target(self) -> None:
+        with self.assertRaises(InvalidTargetError):
+            asyncio.run(AsyncClient().run(EXAMPLES, "exponents", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import supypowers
+from supypowers.scheduler import Scheduler
+from supypowers.serve import WorkerPool
+from supypowers.worker import WorkerServer, is_loopback
+
+ROOT = Path(__file__).resolve().parents[1]
+EXAMPLES = ROOT / "examples"
+
+
+def _dead_address() -> str:
+    # A port nothing listens on: bind one, then close it.
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = WorkerPool()
+        self.server = WorkerServer(("127.0.0.1", 0), self.pool, EXAMPLES)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.pool.close()
+
+    def test_health_affinity_and_failover(self) -> None:
+        live, dead = self.server.address, _dead_address()
+        with supypowers.Dispatcher([dead, live], health_interval=0, retries=1) as dispatcher:
+            self.assertEqual(dispatcher.check_health(), {dead: False, live: True})
+            # Scripts with the same dependency set share an affinity key (and so a worker).
+            self.assertEqual(dispatcher.affinity_key("dates:add_days"), dispatcher.affinity_key("exponents:compute_sqrt"))
+            self.assertEqual(dispatcher.ranking("x")[0], live)
+
+            docs = dispatcher.docs(static=True)
+            self.assertIn(str(EXAMPLES / "dates.py"), [entry["script"] for entry in docs])
+
+            if shutil.which("uv") is None:
+                raise unittest.SkipTest("uv not found on PATH")
+            # With the dead worker ranked first, the call fails over to the live one.
+            dispatcher.ranking = lambda key: [dead, live]
+            result = dispatcher.run("exponents:compute_sqrt", {"x": 9})
+            self.assertEqual(result.data, {"result": 3.0})
+            self.assertFalse(dispatcher._healthy[dead])
+
+        with supypowers.Dispatcher([dead], health_interval=0, retries=0) as dispatcher:
+            with self.assertRaises(supypowers.WorkersUnavailableError):
+                dispatcher.run("exponents:compute_sqrt", {"x": 9})
+
+    def test_token(self) -> None:
+        self.server.token = "s3cret"
+        with supypowers.Dispatcher([self.server.address], health_interval=0, token="wrong") as dispatcher:
+            self.assertEqual(dispatcher.check_health(), {self.server.address: False})
+        with supypowers.Dispatcher([self.server.address], health_interval=0, token="s3cret") as dispatcher:
+            self.assertEqual(dispatcher.check_health(), {self.server.address: True})
+
+    def test_targets_stay_inside_the_folder(self) -> None:
+        # The file exists, but outside the served folder.
+        reply = json.loads(self.server.handle_line(json.dumps({"target": "../tests/test_dispatch:x"})))
+        self.assertFalse(reply["ok"])
+        self.assertIn("not found", reply["error"])
+        self.assertEqual([is_loopback(h) for h in ("127.0.0.1", "::1", "localhost")], [True] * 3)
+        self.assertEqual([is_loopback(h) for h in ("0.0.0.0", "10.0.0.5", "node1")], [False] * 3)
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_concurrent_requests_get_separate_workers(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        pool = WorkerPool(size=2)
+        script = EXAMPLES / "exponents.py"
+        barrier = threading.Barrier(2)
+        outputs = []
+
+        def call() -> None:
+            barrier.wait()
+            outputs.append(pool.run(script, "compute_sqrt", '{"x": 9}'))
+
+        try:
+            threads = [threading.Thread(target=call) for _ in range(2)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual([code for _, code in outputs], [0, 0])
+            self.assertLessEqual(len(pool._workers[pool.key_for(script)]), 2)
+            # Further calls reuse the started workers.
+            pool.run(script, "compute_sqrt", '{"x": 4}')
+            self.assertLessEqual(len(pool._workers[pool.key_for(script)]), 2)
+        finally:
+            pool.close()
+
+
+    def test_fork_server_answers_requests_as_they_finish(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        if not hasattr(os, "fork"):
+            raise unittest.SkipTest("os.fork is not available")
+        with tempfile.TemporaryDirectory() as tmp:
+            script = Path(tmp) / "naps.py"
+            script.write_text(
+                "# /// script\n# dependencies = [\"pydantic\"]\n# ///\n"
+                "import time\n"
+                "from pydantic import BaseModel\n\n"
+                "class NapInput(BaseModel):\n    seconds: float\n\n"
+                "def nap(input: NapInput) -> float:\n"
+                "    time.sleep(input.seconds)\n"
+                "    return input.seconds\n",
+                encoding="utf-8",
+            )
+            pool = WorkerPool(fork=True, scheduler=Scheduler(2))
+            finished = []
+
+            def call(seconds: float) -> None:
+                line, code = pool.run(script, "nap", json.dumps({"seconds": seconds}))
+                finished.append((seconds, code, json.loads(line)["data"]))
+
+            try:
+                pool.run(script, "nap", '{"seconds": 0}')  # start the fork server
+                slow = threading.Thread(target=call, args=(3,))
+                slow.start()
+                time.sleep(0.5)
+                call(0)
+                slow.join()
+            finally:
+                pool.close()
+        # The quick call was answered while the slow one was still running.
+        self.assertEqual(finished, [(0, 0, 0), (3, 0, 3)])
+
+if __name__ == "__main__":
+    unittest.main()
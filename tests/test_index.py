@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import supypowers
+from supypowers.index import tokenize
+
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+
+
+class TestFunctionIndex(unittest.TestCase):
+    def test_tokenize(self) -> None:
+        self.assertEqual(tokenize("computeDifferentPower"), ["compute", "different", "power"])
+        self.assertEqual(tokenize("Add (or subtract) a number of days"), ["add", "subtract", "number", "days"])
+
+    def test_build_search_and_refresh(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp) / "scripts"
+            folder.mkdir()
+            for name in ("dates.py", "exponents.py"):
+                shutil.copy(EXAMPLES / name, folder / name)
+            index_path = Path(tmp) / "index.sqlite"
+
+            with self.assertRaises(supypowers.IndexNotFoundError):
+                supypowers.search(folder, "days", index_path=index_path)
+
+            stats = supypowers.build_index(folder, static=True, index_path=index_path)
+            self.assertEqual(len(stats["updated"]), 2)
+            self.assertGreater(stats["functions"], 0)
+
+            results = supypowers.search(folder, "days", index_path=index_path)
+            self.assertEqual(results[0]["target"].split(":")[0], "dates")
+            self.assertIn("schema_hash", results[0])
+            self.assertEqual(supypowers.search(folder, "add_days", index_path=index_path)[0]["target"], "dates:add_days")
+            self.assertEqual(
+                supypowers.search(folder, "pow", index_path=index_path)[0]["target"],
+                "exponents:compute_different_power",
+            )
+
+            # Unchanged scripts are not inspected again; removed scripts drop out.
+            self.assertEqual(supypowers.build_index(folder, static=True, index_path=index_path)["updated"], [])
+            (folder / "exponents.py").unlink()
+            stats = supypowers.build_index(folder, static=True, index_path=index_path)
+            self.assertEqual(stats["updated"], [])
+            self.assertEqual(stats["removed"], [str((folder / "exponents.py").resolve())])
+            self.assertEqual(supypowers.search(folder, "power", index_path=index_path), [])
+
+    def test_schema_of_one_function(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp) / "scripts"
+            folder.mkdir()
+            shutil.copy(EXAMPLES / "dates.py", folder / "dates.py")
+            index_path = Path(tmp) / "index.sqlite"
+
+            schema = supypowers.schema(folder, "dates:add_days", static=True, index_path=index_path)
+            self.assertEqual(schema["source"], "docs")
+            self.assertEqual(schema["input_schema"]["required"], ["d", "days"])
+            self.assertEqual(schema["output_schema"]["title"], "AddDaysOutput")
+            with self.assertRaises(supypowers.FunctionNotFoundError):
+                supypowers.schema(folder, "dates:nope", static=True, index_path=index_path)
+
+            supypowers.build_index(folder, static=True, index_path=index_path)
+            indexed = supypowers.schema(folder, "dates.py:add_days", static=True, index_path=index_path)
+            self.assertEqual(indexed["source"], "index")
+            # An index built with other options is not used.
+            self.assertEqual(supypowers.schema(folder, "dates:add_days", index_path=index_path)["source"], "docs")
+            self.assertEqual(indexed["schema_hash"], schema["schema_hash"])
+
+            # Built from a relative folder, the index still serves lookups from elsewhere.
+            cwd = os.getcwd()
+            try:
+                os.chdir(tmp)
+                supypowers.build_index(Path("scripts"), static=True, index_path=index_path)
+                os.chdir(folder)
+                self.assertEqual(supypowers.schema(".", "dates:add_days", static=True, index_path=index_path)["source"], "index")
+            finally:
+                os.chdir(cwd)
+
+            # A changed script is inspected again instead of served stale from the index.
+            with open(folder / "dates.py", "a", encoding="utf-8") as f:
+                f.write("\n# edited\n")
+            self.assertEqual(
+                supypowers.schema(folder, "dates:add_days", static=True, index_path=index_path)["source"], "docs"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from supypowers.envs import interpreter_mode
+from supypowers.requirements import installed_satisfies, packaging_available
+from supypowers.uv_exec import launcher_name, uv_python_command
+
+
+class TestCurrentInterpreter(unittest.TestCase):
+    def test_installed_requirements(self) -> None:
+        # supypowers itself is installed wherever these tests run.
+        self.assertTrue(installed_satisfies(["supypowers"]))
+        self.assertTrue(installed_satisfies([]))
+        self.assertFalse(installed_satisfies(["supypowers", "supypowers-not-installed"]))
+        self.assertFalse(installed_satisfies(["supypowers @ https://example.com/supypowers.whl"]))
+        if packaging_available():
+            self.assertTrue(installed_satisfies(["supypowers>=0", "not-installed; python_version < '3'"]))
+            self.assertFalse(installed_satisfies(["supypowers<0"]))
+
+    def test_requirements_of_installed_distributions(self) -> None:
+        if not packaging_available():
+            raise unittest.SkipTest("packaging is not installed")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, requires in (
+                ("supypowers_broken", ["supypowers-not-installed"]),
+                ("supypowers_needs_broken", ["supypowers-broken>=1", "not-installed; extra == 'x'"]),
+            ):
+                info = Path(tmp) / f"{name}-1.0.dist-info"
+                info.mkdir()
+                (info / "METADATA").write_text(
+                    "Metadata-Version: 2.1\n"
+                    f"Name: {name}\nVersion: 1.0\n"
+                    + "".join(f"Requires-Dist: {req}\n" for req in requires),
+                    encoding="utf-8",
+                )
+            sys.path.insert(0, tmp)
+            try:
+                # Installed, but what they require (directly or not) is missing.
+                self.assertFalse(installed_satisfies(["supypowers-broken"]))
+                self.assertFalse(installed_satisfies(["supypowers-needs-broken"]))
+            finally:
+                sys.path.remove(tmp)
+
+    def test_command_choice(self) -> None:
+        current = uv_python_command(["supypowers"], "pass", env_pool=False, interpreter="auto")
+        self.assertEqual(current[:2], [sys.executable, "-c"])
+        self.assertEqual(launcher_name(current), "current interpreter")
+
+        missing = uv_python_command(["supypowers-not-installed"], "pass", env_pool=False, interpreter="auto")
+        self.assertEqual(launcher_name(missing), "uv run")
+        forced = uv_python_command(["supypowers-not-installed"], "pass", env_pool=False, interpreter="current")
+        self.assertEqual(forced[0], sys.executable)
+
+        old = os.environ.pop("SUPYPOWERS_INTERPRETER", None)
+        try:
+            # Running on this interpreter is opt-in.
+            self.assertEqual(interpreter_mode(), "uv")
+            self.assertEqual(uv_python_command(["supypowers"], "pass", env_pool=False)[0], "uv")
+            os.environ["SUPYPOWERS_INTERPRETER"] = "auto"
+            self.assertEqual(uv_python_command(["supypowers"], "pass", env_pool=False)[0], sys.executable)
+        finally:
+            if old is None:
+                os.environ.pop("SUPYPOWERS_INTERPRETER", None)
+            else:
+                os.environ["SUPYPOWERS_INTERPRETER"] = old
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import supypowers
+from supypowers.memo import MemoPolicy, canonical_input, memo_for, memo_policy, results_cache
+
+_SCRIPT = '''# /// script
+# dependencies = ["pydantic"]
+# ///
+import time
+from pydantic import BaseModel
+
+def superpower(fn=None, **options):
+    return fn if fn is not None else (lambda f: f)
+
+class In(BaseModel):
+    a: int
+
+class Out(BaseModel):
+    t: float
+
+@superpower(cache=True, ttl=60)
+def stamp(input: In) -> Out:
+    return Out(t=time.time())
+
+@superpower
+def plain(input: In) -> Out:
+    return Out(t=time.time())
+'''
+
+
+class TestMemo(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self._tmp.name)
+        self.script = self.folder / "m.py"
+        self.script.write_text(_SCRIPT, encoding="utf-8")
+        self.cache = results_cache(self.folder / "cache")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_policy_is_read_from_the_marker(self) -> None:
+        self.assertEqual(memo_policy(_SCRIPT, "stamp"), MemoPolicy(ttl=60.0))
+        self.assertIsNone(memo_policy(_SCRIPT, "plain"))
+        self.assertIsNone(memo_policy("@superpower(cache=True, ttl=TTL)\ndef f(input): pass\n", "f"))
+
+    def test_key_ignores_key_order_and_tracks_script_content(self) -> None:
+        self.assertEqual(canonical_input('{"b": 1, "a": 2}'), canonical_input("{'a': 2, 'b': 1}"))
+        self.assertIsNone(canonical_input("[1, 2]"))
+
+        first = memo_for(self.script, "stamp", '{"a": 1}', self.cache)
+        first.put({"ok": True, "data": {"t": 1.0}})
+        self.assertEqual(memo_for(self.script, "stamp", '{ "a":1 }', self.cache).get(), {"ok": True, "data": {"t": 1.0}})
+        # Secrets are part of the key.
+        self.assertIsNone(memo_for(self.script, "stamp", '{"a": 1}', self.cache, extra_env={"TOKEN": "x"}).get())
+        memo_for(self.script, "stamp", '{"a": 2}', self.cache).put({"ok": False, "error": "boom"})
+        self.assertIsNone(memo_for(self.script, "stamp", '{"a": 2}', self.cache).get())
+
+        self.script.write_text(_SCRIPT + "\n# edited\n", encoding="utf-8")
+        self.assertIsNone(memo_for(self.script, "stamp", '{"a": 1}', self.cache).get())
+        self.assertIsNone(memo_for(self.script, "plain", '{"a": 1}', self.cache))
+
+    def test_run_serves_memoized_results(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        old = os.environ.get("SUPYPOWERS_CACHE_DIR")
+        os.environ["SUPYPOWERS_CACHE_DIR"] = str(self.folder / "cache")
+        try:
+            first = supypowers.run(self.folder, "m:stamp", {"a": 1})
+            second = supypowers.run(self.folder, "m:stamp", '{"a": 1}')
+            fresh = supypowers.run(self.folder, "m:stamp", {"a": 1}, use_cache=False)
+        finally:
+            if old is None:
+                os.environ.pop("SUPYPOWERS_CACHE_DIR", None)
+            else:
+                os.environ["SUPYPOWERS_CACHE_DIR"] = old
+        self.assertTrue(first.ok)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first.data, fresh.data)
+        stats = results_cache(self.folder / "cache" / "results").stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import supypowers
+from supypowers.pipeline import parse_pipeline
+
+ROOT = Path(__file__).resolve().parents[1]
+EXAMPLES = ROOT / "examples"
+
+# `Blob` is not JSON-serializable, so `use` only works if `make`'s result reaches it in memory.
+_OBJECTS_SCRIPT = """\
+# /// script
+# dependencies = [
+#   "pydantic",
+# ]
+# ///
+
+from pydantic import BaseModel, ConfigDict
+
+
+class Blob:
+    def __init__(self, n):
+        self.n = n
+
+
+class MakeInput(BaseModel):
+    n: int
+
+
+class MakeOutput(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    blob: Blob
+    n: int
+
+
+def make(input: MakeInput) -> MakeOutput:
+    return MakeOutput(blob=Blob(input.n), n=input.n)
+
+
+class UseInput(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    blob: Blob
+    n: int
+
+
+class UseOutput(BaseModel):
+    total: int
+
+
+def use(input: UseInput) -> UseOutput:
+    return UseOutput(total=input.blob.n + input.n)
+"""
+
+
+class TestPipeline(unittest.TestCase):
+    def test_parse_rejects_bad_specs(self) -> None:
+        ok = {"steps": [{"id": "a", "target": "s:f"}, {"id": "b", "target": "s:g", "map": {"x": "a.y"}}]}
+        self.assertEqual(parse_pipeline(ok).outputs, ("b",))
+        self.assertEqual(parse_pipeline(ok).steps[1].depends_on, ("a",))
+        bad = [
+            {},
+            {"steps": [{"id": "a", "target": "nofunction"}]},
+            {"steps": [{"id": "a", "target": "s:f"}, {"id": "a", "target": "s:f"}]},
+            {"steps": [{"id": "a", "target": "s:f", "map": {"x": "missing.y"}}]},
+            {"steps": [{"id": "a", "target": "s:f", "after": ["b"]}, {"id": "b", "target": "s:f", "after": ["a"]}]},
+            {"steps": [{"id": "a", "target": "s:f"}], "outputs": ["z"]},
+        ]
+        for spec in bad:
+            with self.subTest(spec=spec), self.assertRaises(supypowers.InvalidPipelineError):
+                parse_pipeline(spec)
+
+    def test_chain_and_branches(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            shutil.copy(EXAMPLES / "dates.py", folder / "dates.py")
+            (folder / "objects.py").write_text(_OBJECTS_SCRIPT, encoding="utf-8")
+            spec = {
+                "input": {"start": "2024-01-01"},
+                "steps": [
+                    {"id": "later", "target": "dates:add_days", "input": {"days": 30}, "map": {"d": "$input.start"}},
+                    {"id": "delta", "target": "dates:days_between", "map": {"start": "$input.start", "end": "later.result"}},
+                    {"id": "make", "target": "objects:make", "input": {"n": 2}},
+                    {"id": "use", "target": "objects:use", "map": {"*": "make"}},
+                ],
+                "outputs": ["later", "delta", "use"],
+            }
+            result = supypowers.pipeline(folder, spec, input={"start": "2024-02-01"}, jobs=2)
+
+        self.assertTrue(result["ok"], result)
+        self.assertEqual(
+            result["outputs"], {"later": {"result": "2024-03-02"}, "delta": {"days": 30}, "use": {"total": 4}}
+        )
+        steps = result["steps"]
+        self.assertEqual(steps["later"]["interpreter"], steps["delta"]["interpreter"])
+        self.assertEqual(steps["make"]["interpreter"], steps["use"]["interpreter"])
+        self.assertNotEqual(steps["later"]["interpreter"], steps["make"]["interpreter"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from supypowers import InvalidTargetError, QueueFullError, QueueTimeoutError, Scheduler
+from supypowers import scheduler as scheduler_module
+from supypowers.scheduler import function_limit
+
+
+class TestScheduler(unittest.TestCase):
+    def test_limits_and_priority_order(self) -> None:
+        scheduler = Scheduler(2)
+        started = []
+        peak = {"all": 0, "heavy": 0}
+        running = {"all": 0, "heavy": 0}
+        lock = threading.Lock()
+        hold = threading.Event()
+
+        def call(name: str, key: str, limit: int | None, priority: int) -> None:
+            with scheduler.slot(key, limit, priority=priority):
+                with lock:
+                    started.append(name)
+                    running["all"] += 1
+                    running["heavy"] += key == "heavy"
+                    peak["all"] = max(peak["all"], running["all"])
+                    peak["heavy"] = max(peak["heavy"], running["heavy"])
+                hold.wait()
+                time.sleep(0.01)
+                with lock:
+                    running["all"] -= 1
+                    running["heavy"] -= key == "heavy"
+
+        threads = [threading.Thread(target=call, args=("h0", "heavy", 1, 0))]
+        threads[0].start()
+        while scheduler.stats()["running"] < 1:
+            time.sleep(0.001)
+        # Queued while `h0` holds the only "heavy" slot: `h1` cannot start before it ends,
+        # but the light calls can, in priority order.
+        for name, key, limit, priority in [("h1", "heavy", 1, 5), ("low", "light", None, 0), ("high", "light", None, 9)]:
+            t = threading.Thread(target=call, args=(name, key, limit, priority))
+            t.start()
+            threads.append(t)
+            time.sleep(0.05)
+        hold.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(started[:2], ["h0", "low"])
+        self.assertEqual(sorted(started), ["h0", "h1", "high", "low"])
+        self.assertEqual(peak, {"all": 2, "heavy": 1})
+        self.assertEqual(scheduler.stats(), {"running": 0, "waiting": 0})
+
+    def test_backpressure(self) -> None:
+        scheduler = Scheduler(1, max_queue=1)
+        with scheduler.slot() as waited:
+            self.assertLess(waited, 50)
+            with self.assertRaises(QueueTimeoutError) as ctx:
+                with scheduler.slot(timeout=0.05):
+                    pass
+            self.assertGreaterEqual(ctx.exception.waited_ms, 50)
+            waited_for = []
+
+            def wait() -> None:
+                with scheduler.slot(timeout=5) as ms:
+                    waited_for.append(ms)
+
+            waiter = threading.Thread(target=wait)
+            waiter.start()
+            while scheduler.stats()["waiting"] < 1:
+                time.sleep(0.001)
+            with self.assertRaises(QueueFullError):
+                with scheduler.slot():
+                    pass
+            time.sleep(0.05)
+        waiter.join(5)
+        self.assertGreaterEqual(waited_for[0], 50)
+        self.assertEqual(scheduler.stats(), {"running": 0, "waiting": 0})
+        # The CLI exits with EX_TEMPFAIL rather than the usage-error status.
+        self.assertEqual((ctx.exception.exit_status, InvalidTargetError("x").exit_status), (75, 2))
+
+    def test_async_slots(self) -> None:
+        scheduler = Scheduler(1)
+
+        async def main() -> list:
+            order = []
+
+            async def call(name: str, priority: int) -> float:
+                async with scheduler.slot_async(priority=priority) as waited:
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+                    return waited
+
+            first = asyncio.create_task(call("first", 0))
+            await asyncio.sleep(0)
+            waits = await asyncio.gather(first, call("low", 0), call("high", 1))
+            cancelled = asyncio.create_task(call("cancelled", 0))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            return [order, waits]
+
+        order, waits = asyncio.run(main())
+        self.assertEqual(order[:3], ["first", "high", "low"])
+        self.assertGreater(waits[1], waits[2])
+        self.assertEqual(scheduler.stats(), {"running": 0, "waiting": 0})
+
+    def test_slot_files_are_shared_between_schedulers(self) -> None:
+        if sys.platform == "win32":
+            raise unittest.SkipTest("slot files need fcntl")
+        with tempfile.TemporaryDirectory() as tmp:
+            # Two schedulers on one directory stand in for two processes.
+            one = Scheduler(2, slot_dir=Path(tmp))
+            other = Scheduler(2, slot_dir=Path(tmp))
+            with one.slot("heavy", 1):
+                with self.assertRaises(QueueTimeoutError):
+                    with other.slot("heavy", 1, timeout=0.2):
+                        pass
+                with other.slot("light"):
+                    with self.assertRaises(QueueTimeoutError):
+                        with other.slot("light", timeout=0.2):
+                            pass
+            with other.slot("heavy", 1) as waited:
+                self.assertLess(waited, 50)
+            self.assertEqual(other.stats(), {"running": 0, "waiting": 0})
+
+    def test_default_scheduler_shares_slots_only_with_an_explicit_limit(self) -> None:
+        saved = (scheduler_module._DEFAULT, os.environ.get("SUPYPOWERS_MAX_CONCURRENCY"))
+        try:
+            os.environ.pop("SUPYPOWERS_MAX_CONCURRENCY", None)
+            scheduler_module._DEFAULT = None
+            self.assertIsNone(scheduler_module.default_scheduler().slot_dir)
+            os.environ["SUPYPOWERS_MAX_CONCURRENCY"] = "3"
+            scheduler_module._DEFAULT = None
+            shared = scheduler_module.default_scheduler()
+            self.assertEqual((shared.max_concurrency, shared.slot_dir.name), (3, "slots"))
+        finally:
+            scheduler_module._DEFAULT = saved[0]
+            if saved[1] is None:
+                os.environ.pop("SUPYPOWERS_MAX_CONCURRENCY", None)
+            else:
+                os.environ["SUPYPOWERS_MAX_CONCURRENCY"] = saved[1]
+
+    def test_function_limit_from_marker(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            script = Path(tmp) / "s.py"
+            script.write_text(
+                "@superpower(max_concurrency=2)\ndef heavy(input): pass\n"
+                "@superpower(max_concurrency=LIMIT)\ndef odd(input): pass\n"
+                "def plain(input): pass\n",
+                encoding="utf-8",
+            )
+            self.assertEqual(function_limit(script, "heavy"), 2)
+            self.assertIsNone(function_limit(script, "odd"))
+            self.assertIsNone(function_limit(script, "plain"))
+
+
+if __name__ == "__main__":
+    unittest.main()
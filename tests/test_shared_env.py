@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import supypowers
+from supypowers.docs import docs_cache_key
+from supypowers.requirements import packaging_available, parse_requirement, specifiers_compatible
+from supypowers.serve import WorkerPool
+
+
+def _script(deps: list[str], body: str = "") -> str:
+    listed = ", ".join(f'"{d}"' for d in deps)
+    return f"# /// script\n# dependencies = [{listed}]\n# ///\n{body}"
+
+
+_PREFIX = """from pydantic import BaseModel
+
+class In(BaseModel):
+    x: int
+
+def prefix(input: In) -> str:
+    import sys
+    return sys.prefix
+"""
+
+
+class TestSharedEnv(unittest.TestCase):
+    def test_requirements(self) -> None:
+        req = parse_requirement("Typing_Extensions[a] >= 4 ; python_version >= '3.8'")
+        self.assertEqual(req.name, "typing-extensions")
+        self.assertIsNotNone(req.marker)
+        self.assertIsNone(parse_requirement("not a requirement!"))
+        self.assertTrue(specifiers_compatible(["", ">=2"]))
+        self.assertTrue(specifiers_compatible([">=2", ">=2"]))
+        if not packaging_available():
+            self.assertFalse(specifiers_compatible([">=2", "<3"]))
+            return
+        self.assertTrue(specifiers_compatible([">=2", "<3", "!=2.5"]))
+        self.assertTrue(specifiers_compatible([">1.9,<2", "~=1.9"]))
+        self.assertTrue(specifiers_compatible(["==2.*", ">=2.3"]))
+        self.assertFalse(specifiers_compatible([">=2", "<2"]))
+        self.assertFalse(specifiers_compatible(["==1.4", "!=1.4"]))
+        self.assertFalse(specifiers_compatible(["==2.*", "<2"]))
+
+    def test_merge_and_conflicts(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp).resolve()
+            (folder / "a.py").write_text(_script(["pydantic>=2"]), encoding="utf-8")
+            (folder / "b.py").write_text(_script(["pydantic", "rich"]), encoding="utf-8")
+            clash = "pydantic<1" if packaging_available() else "pydantic==1.0"
+            (folder / "c.py").write_text(_script([clash]), encoding="utf-8")
+            shared = supypowers.shared_environment(folder)
+            own = shared.dependencies_for(folder / "c.py")
+            # Docs inspected in the merged environment are cached apart from the script's own.
+            a = folder / "a.py"
+            self.assertNotEqual(docs_cache_key(a, False), docs_cache_key(a, False, shared.dependencies_for(a)))
+
+        self.assertEqual(shared.dependencies, ("pydantic", "pydantic>=2", "rich"))
+        self.assertEqual(shared.scripts, frozenset({folder / "a.py", folder / "b.py"}))
+        self.assertEqual(shared.dependencies_for(folder / "a.py"), list(shared.dependencies))
+        self.assertEqual([c["script"] for c in shared.conflicts], [str(folder / "c.py")])
+        self.assertEqual(shared.conflicts[0]["conflicts_with"], ["pydantic", "pydantic>=2"])
+        self.assertEqual(len(own), 1)
+
+    def test_scripts_share_one_interpreter(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        old = os.environ.get("SUPYPOWERS_INTERPRETER")
+        # Keep this interpreter out of it, so every script runs in a uv environment.
+        os.environ["SUPYPOWERS_INTERPRETER"] = "uv"
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                folder = Path(tmp)
+                (folder / "a.py").write_text(_script(["pydantic"], _PREFIX), encoding="utf-8")
+                (folder / "b.py").write_text(_script(["pydantic>=2", "annotated-types"], _PREFIX), encoding="utf-8")
+                a = supypowers.run(folder, "a:prefix", {"x": 1}, shared_env=True)
+                b = supypowers.run(folder, "b:prefix", {"x": 1}, shared_env=True)
+                separate = supypowers.run(folder, "a:prefix", {"x": 1})
+                pool = WorkerPool(shared=supypowers.shared_environment(folder))
+                try:
+                    self.assertEqual(pool.key_for(folder / "a.py"), pool.key_for(folder / "b.py"))
+                finally:
+                    pool.close()
+        finally:
+            if old is None:
+                os.environ.pop("SUPYPOWERS_INTERPRETER", None)
+            else:
+                os.environ["SUPYPOWERS_INTERPRETER"] = old
+
+        self.assertTrue(a.ok, a.response)
+        self.assertEqual(a.data, b.data)
+        self.assertNotEqual(a.data, separate.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from supypowers.static_docs import inspect_script_static
+
+
+class TestStaticDocs(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _inspect(self, source: str, *, require_marker: bool = False):
+        path = self.folder / "script.py"
+        path.write_text(source, encoding="utf-8")
+        return inspect_script_static(path, require_marker=require_marker)
+
+    def test_builds_pydantic_style_schemas(self) -> None:
+        entry = self._inspect(
+            "from typing import Optional\n"
+            "from pydantic import BaseModel, Field\n"
+            "class Inner(BaseModel):\n"
+            "    a: int\n"
+            "class In(BaseModel):\n"
+            '    """Input."""\n'
+            '    first_name: str = Field(..., description="Who")\n'
+            "    inner: Optional[Inner] = None\n"
+            "def superpower(fn):\n"
+            "    return fn\n"
+            "@superpower\n"
+            "def greet(input: In) -> dict:\n"
+            '    """Say hi."""\n'
+            "def helper(x: int) -> int:\n"
+            "    return x\n",
+            require_marker=True,
+        )
+        self.assertEqual([f["name"] for f in entry["functions"]], ["greet"])
+        fn = entry["functions"][0]
+        self.assertEqual(fn["description"], "Say hi.")
+        self.assertIsNone(fn["output_schema"])
+        schema = fn["input_schema"]
+        self.assertEqual(schema["description"], "Input.")
+        self.assertEqual(schema["required"], ["first_name"])
+        self.assertEqual(
+            schema["properties"]["first_name"],
+            {"description": "Who", "title": "First Name", "type": "string"},
+        )
+        self.assertEqual(
+            schema["properties"]["inner"],
+            {"anyOf": [{"$ref": "#/$defs/Inner"}, {"type": "null"}], "default": None},
+        )
+        self.assertIn("Inner", schema["$defs"])
+
+    def test_unresolvable_scripts_fall_back(self) -> None:
+        imported = "from models import In\ndef f(input: In):\n    pass\n"
+        configured = (
+            "from pydantic import BaseModel, ConfigDict\n"
+            "class In(BaseModel):\n"
+            "    model_config = ConfigDict(extra='forbid')\n"
+            "    x: int\n"
+            "def f(input: In):\n"
+            "    pass\n"
+        )
+        decorated = (
+            "import functools\n"
+            "from pydantic import BaseModel\n"
+            "class In(BaseModel):\n"
+            "    x: int\n"
+            "@functools.cache\n"
+            "def f(input: In):\n"
+            "    pass\n"
+        )
+        for source in (imported, configured, decorated, "def broken(:\n"):
+            with self.subTest(source=source):
+                self.assertIsNone(self._inspect(source))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from supypowers.watch import FolderWatcher, atomic_write, diff
+
+
+class TestFolderWatcher(unittest.TestCase):
+    def _check(self, use_inotify: bool) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            (folder / "a.py").write_text("A = 1\n", encoding="utf-8")
+            (folder / "b.py").write_text("B = 1\n", encoding="utf-8")
+            watcher = FolderWatcher(folder, poll_interval=0.05, debounce=0.01, use_inotify=use_inotify)
+            try:
+                self.assertEqual(watcher.poll(timeout=0.1), ([], []))
+                (folder / "c.py").write_text("C = 1\n", encoding="utf-8")
+                (folder / "a.py").write_text("A = 2  # longer\n", encoding="utf-8")
+                (folder / "b.py").unlink()
+                (folder / "notes.txt").write_text("not a script", encoding="utf-8")
+                time.sleep(0.05)
+                changed, removed = watcher.poll(timeout=2)
+            finally:
+                watcher.close()
+        self.assertEqual([p.name for p in changed], ["a.py", "c.py"])
+        self.assertEqual([p.name for p in removed], ["b.py"])
+
+    def test_polling(self) -> None:
+        self._check(use_inotify=False)
+
+    def test_inotify_or_fallback(self) -> None:
+        self._check(use_inotify=True)
+
+    def test_diff_and_atomic_write(self) -> None:
+        old = {Path("a.py"): (1, 1), Path("b.py"): (1, 1)}
+        new = {Path("a.py"): (1, 1), Path("b.py"): (2, 1), Path("c.py"): (1, 1)}
+        self.assertEqual(diff(old, new), ([Path("b.py"), Path("c.py")], []))
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "docs.json"
+            atomic_write(target, "[]\n")
+            atomic_write(target, "[1]\n")
+            self.assertEqual(target.read_text(encoding="utf-8"), "[1]\n")
+            self.assertEqual(os.listdir(tmp), ["docs.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
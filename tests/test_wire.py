@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import marshal
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import supypowers
+from supypowers.runner import RUNNER_CODE, is_result_line, render_run_output
+from supypowers.uv_exec import uv_stream_python_code
+from supypowers.wire import codec_dependencies, decode_frame, msgpack_available, negotiate
+
+
+class TestWireFormat(unittest.TestCase):
+    def test_negotiation_falls_back_to_marshal(self) -> None:
+        self.assertEqual(negotiate("json"), "json")
+        self.assertEqual(negotiate("marshal"), "marshal")
+        self.assertEqual(negotiate("msgpack"), "msgpack" if msgpack_available() else "marshal")
+        with self.assertRaises(ValueError):
+            negotiate("xml")
+        with self.assertRaises(supypowers.UsageError):
+            supypowers.run_stream(Path(__file__).parent, "test_wire:f", {}, wire_format="xml")
+        self.assertEqual(codec_dependencies(["pydantic"], "msgpack"), ["pydantic", "msgpack"])
+        self.assertEqual(codec_dependencies(["MsgPack>=1"], "msgpack"), ["MsgPack>=1"])
+        self.assertEqual(codec_dependencies(["pydantic"], "marshal"), ["pydantic"])
+
+    def test_result_lines_pass_through(self) -> None:
+        line = '{"ok": true, "data": {"x": [1.5, "é"]}}'
+        self.assertTrue(is_result_line(line))
+        self.assertEqual(render_run_output(line), (line, 0))
+        self.assertFalse(is_result_line('{"ok": false, "error": "boom"}'))
+        self.assertEqual(render_run_output('{"ok":true}'), ('{"ok": true}', 0))
+
+    def test_binary_frame_on_the_wire(self) -> None:
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        with tempfile.TemporaryDirectory() as tmp:
+            script = Path(tmp) / "nums.py"
+            script.write_text(_SCRIPT, encoding="utf-8")
+            payload = {"script_path": str(script), "function_name": "halves", "input": {"n": 3}}
+            raw = list(
+                uv_stream_python_code(
+                    script_path=script,
+                    code=RUNNER_CODE,
+                    input_lines=[json.dumps({**payload, "wire_format": "marshal"})],
+                    binary_frames=True,
+                )
+            )
+            result = supypowers.run(tmp, "nums:halves", {"n": 4}, wire_format="marshal", use_cache=False)
+            text = supypowers.run(tmp, "nums:halves", {"n": 4}, use_cache=False)
+            # Line consumers always get the JSON line the runner printed.
+            lines = list(supypowers.run_stream(tmp, "nums:halves", {"n": 2}, wire_format="marshal", use_cache=False))
+
+        self.assertEqual(lines, ['{"ok": true, "data": [0.0, 0.5]}'])
+        header, frame = raw[0], raw[1]
+        self.assertEqual(json.loads(header), {"wire": "marshal", "length": len(frame)})
+        self.assertIsInstance(frame, bytes)
+        self.assertEqual(marshal.loads(frame), {"ok": True, "data": [0.0, 0.5, 1.0]})
+        self.assertEqual(decode_frame(header, frame), {"ok": True, "data": [0.0, 0.5, 1.0]})
+        self.assertEqual(result, text)
+
+    def test_msgpack_results(self) -> None:
+        if not msgpack_available():
+            raise unittest.SkipTest("msgpack is not installed")
+        if shutil.which("uv") is None:
+            raise unittest.SkipTest("uv not found on PATH")
+        import msgpack
+
+        header = json.dumps({"wire": "msgpack", "length": 0})
+        self.assertEqual(decode_frame(header, msgpack.packb({"ok": True, "data": [1.5]})), {"ok": True, "data": [1.5]})
+        with tempfile.TemporaryDirectory() as tmp:
+            # The script does not list msgpack; it is added to its environment for the call.
+            (Path(tmp) / "nums.py").write_text(_SCRIPT, encoding="utf-8")
+            binary = supypowers.run(tmp, "nums:halves", {"n": 4}, wire_format="msgpack", use_cache=False)
+            text = supypowers.run(tmp, "nums:halves", {"n": 4}, use_cache=False)
+            lines = list(supypowers.run_stream(tmp, "nums:halves", {"n": 2}, wire_format="msgpack"))
+
+        self.assertEqual(binary, text)
+        self.assertEqual(lines, ['{"ok": true, "data": [0.0, 0.5]}'])
+
+
+_SCRIPT = """# /// script
+# dependencies = ["pydantic"]
+# ///
+from pydantic import BaseModel
+
+class In(BaseModel):
+    n: int
+
+def halves(input: In) -> list[float]:
+    return [i / 2 for i in range(input.n)]
+"""
+
+
+if __name__ == "__main__":
+    unittest.main()